@@ -5,6 +5,7 @@ from sqlalchemy import pool
 
 from alembic import context
 
+from work_journal.core import app_config
 from work_journal.core.db.entities import Base
 
 # this is the Alembic Config object, which provides
@@ -22,6 +23,26 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+# The app hands over a connection of its own when it migrates (see schema.migrate)
+app_connection = config.attributes.get("connection")
+
+# Migrate the app's own journal (see app_config) unless alembic.ini or the caller
+# names a database.  ConfigParser treats % specially, so escape it.
+if app_connection is None and not config.get_main_option("sqlalchemy.url"):
+    app_url = app_config.database_url()
+    app_config.make_sqlite_dir(app_url)
+    config.set_main_option("sqlalchemy.url", app_url.replace("%", "%%"))
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """
+    Keep autogenerate away from objects managed outside the ORM metadata, such as the
+    journal_fts virtual table and its shadow tables.
+    """
+    if type_ == "table" and reflected and compare_to is None:
+        return not name.startswith("journal_fts")
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -46,6 +67,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -59,6 +81,10 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    if app_connection is not None:
+        run_migrations(app_connection)
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
@@ -66,10 +92,18 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        run_migrations(connection)
 
-        with context.begin_transaction():
-            context.run_migrations()
+
+def run_migrations(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
 
 
 if context.is_offline_mode():
@@ -0,0 +1,55 @@
+"""Full text index on journal.log
+
+Revision ID: 71e0f58a2a02
+Revises: 85629e719ce2
+Create Date: 2026-10-18 10:41:07.562910
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '71e0f58a2a02'
+down_revision: Union[str, None] = '85629e719ce2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute(
+        """
+        CREATE VIRTUAL TABLE journal_fts USING fts5(
+            log, content='journal', content_rowid='id', tokenize='porter unicode61'
+        )
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER journal_fts_ad AFTER DELETE ON journal BEGIN
+            INSERT INTO journal_fts(journal_fts, rowid, log) VALUES ('delete', old.id, old.log);
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER journal_fts_au AFTER UPDATE ON journal BEGIN
+            INSERT INTO journal_fts(journal_fts, rowid, log) VALUES ('delete', old.id, old.log);
+            INSERT INTO journal_fts(rowid, log) VALUES (new.id, new.log);
+        END
+        """
+    )
+    # Backfill the index from the existing journal rows
+    op.execute("INSERT INTO journal_fts(journal_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute('DROP TRIGGER IF EXISTS journal_fts_au')
+    op.execute('DROP TRIGGER IF EXISTS journal_fts_ad')
+    op.execute('DROP TABLE IF EXISTS journal_fts')
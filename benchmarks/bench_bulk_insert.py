@@ -0,0 +1,66 @@
+"""
+Benchmark:  ingestion throughput of JournalRepo.create_journal_entries against the one
+entry per transaction JournalRepo.create_journal_entry, on a SQLite file.
+
+    python -m benchmarks.bench_bulk_insert --rows 100000
+
+Exits with status 1 if the bulk path (search index, change log, rollups and all) writes
+fewer than --min-rate rows a second, 0 to only report.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine
+from work_journal.core.db import Base, JournalRepo
+
+MIN_RATE = 50_000
+
+
+def fresh_repo(directory: str, name: str) -> JournalRepo:
+    engine = create_engine(f"sqlite:///{os.path.join(directory, name)}")
+    Base.metadata.create_all(engine)
+    return JournalRepo(engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--single-rows", type=int, default=500)
+    parser.add_argument("--chunk-size", type=int, default=JournalRepo.BULK_CHUNK_SIZE)
+    parser.add_argument("--min-rate", type=int, default=MIN_RATE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = fresh_repo(tmp, "single.db")
+        started = time.perf_counter()
+        for i in range(args.single_rows):
+            repo.create_journal_entry(f"single entry {i}")
+        elapsed = time.perf_counter() - started
+        print(
+            f"create_journal_entry:               {args.single_rows / elapsed:>12,.0f} rows/sec"
+        )
+        repo.engine.dispose()
+
+        slow = False
+        for return_ids in (False, True):
+            repo = fresh_repo(tmp, f"bulk_{return_ids}.db")
+            entries = (f"bulk entry {i}" for i in range(args.rows))
+            started = time.perf_counter()
+            repo.create_journal_entries(
+                entries, chunk_size=args.chunk_size, return_ids=return_ids
+            )
+            elapsed = time.perf_counter() - started
+            label = f"create_journal_entries(ids={return_ids}):"
+            print(f"{label:<36}{args.rows / elapsed:>12,.0f} rows/sec")
+            slow = slow or args.rows / elapsed < args.min_rate
+            repo.engine.dispose()
+
+    if slow:
+        print(f"bulk ingestion is below {args.min_rate:,} rows/sec")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
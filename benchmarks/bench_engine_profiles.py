@@ -0,0 +1,84 @@
+"""
+Benchmark:  insert and read latency of a SQLite journal under each DBManager engine
+profile.
+
+Inserts go through JournalRepo.create_journal_entry, one transaction each, which is the
+path a person typing entries takes and where the fsync per commit shows up.  Reads are
+get_last_n_entries and a one week get_entries_for_range on a pre-populated journal.
+
+    python -m benchmarks.bench_engine_profiles --inserts 500 --rows 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from work_journal.core.db import PROFILES, Base, DBManager, JournalRepo
+
+
+def percentiles(timings: list[float]) -> tuple[float, float]:
+    """
+    (median, p99) in milliseconds
+    """
+    timings = sorted(timings)
+    return (
+        timings[len(timings) // 2] * 1000,
+        timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000,
+    )
+
+
+def timed(action, repeat: int) -> list[float]:
+    timings = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        action(i)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--inserts", type=int, default=500)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+
+    print(
+        f"{'profile':<10}{'insert p50':>12}{'insert p99':>12}"
+        f"{'last n p50':>12}{'week p50':>10}   (ms)"
+    )
+    for profile in PROFILES:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = DBManager(
+                f"sqlite:///{os.path.join(tmp, 'bench.db')}", profile
+            ).engine
+            Base.metadata.create_all(engine)
+            repo = JournalRepo(engine)
+
+            now = datetime.now()
+            step = timedelta(days=365) / args.rows
+            repo.create_journal_entries(
+                (now - step * i, f"history {i}") for i in range(args.rows)
+            )
+
+            inserts = timed(
+                lambda i: repo.create_journal_entry(f"entry {i}"), args.inserts
+            )
+            last_n = timed(lambda i: repo.get_last_n_entries(5), args.reads)
+            week = timed(
+                lambda i: repo.get_entries_for_range(
+                    now - timedelta(days=7 + i % 300), now - timedelta(days=i % 300)
+                ),
+                args.reads // 10,
+            )
+
+            (insert_p50, insert_p99) = percentiles(inserts)
+            print(
+                f"{profile:<10}{insert_p50:>12.3f}{insert_p99:>12.3f}"
+                f"{percentiles(last_n)[0]:>12.3f}{percentiles(week)[0]:>10.3f}"
+            )
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark:  throughput of every registered export format in work_journal.core.export.
+
+Rows are generated up front so that the numbers measure the writers rather than the
+database.  Pass --from-db to stream them out of a SQLite journal through
+JournalRepo.iter_rows_for_range instead, which is what the reports window does.
+
+    python -m benchmarks.bench_export --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from work_journal.core.db import Base, JournalRepo
+from work_journal.core.export import WRITERS, export
+
+
+def synthetic_rows(rows: int) -> list[tuple]:
+    start = datetime.now() - timedelta(days=365)
+    step = timedelta(days=365) / rows
+    return [
+        (start + step * i, f"Synthetic entry {i}, with a comma and a #tag")
+        for i in range(rows)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--from-db", action="store_true")
+    args = parser.parse_args()
+
+    data = synthetic_rows(args.rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = None
+        if args.from_db:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            Base.metadata.create_all(engine)
+            repo = JournalRepo(engine)
+            repo.create_journal_entries(data)
+            (start, end) = (data[0][0], data[-1][0])
+            data = None
+
+        print(f"{'format':<12}{'seconds':>10}{'rows/sec':>14}{'MiB':>10}")
+        for name in WRITERS:
+            filename = os.path.join(tmp, f"report.{name}")
+            rows = repo.iter_rows_for_range(start, end) if repo else iter(data)
+            started = time.perf_counter()
+            export(filename, rows, name)
+            elapsed = time.perf_counter() - started
+            size = os.path.getsize(filename) / (1 << 20)
+            print(
+                f"{name:<12}{elapsed:>10.2f}{args.rows / elapsed:>14,.0f}{size:>10.1f}"
+            )
+            os.remove(filename)
+
+        if repo:
+            repo.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
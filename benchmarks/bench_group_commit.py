@@ -0,0 +1,60 @@
+"""
+Benchmark:  burst logging throughput of BufferedJournalWriter (group commit) against one
+JournalRepo.create_journal_entry transaction per entry, on a SQLite file using the
+"safe" profile so every commit pays a full fsync.
+
+    python -m benchmarks.bench_group_commit --bursts 1 10 100 1000
+"""
+import argparse
+import os
+import tempfile
+import time
+from work_journal.core.db import (
+    PROFILE_SAFE,
+    Base,
+    BufferedJournalWriter,
+    DBManager,
+    JournalRepo,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bursts", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--profile", default=PROFILE_SAFE)
+    args = parser.parse_args()
+
+    print(f"{'burst':>8}{'per entry (rows/s)':>22}{'group commit (rows/s)':>24}")
+    for burst in args.bursts:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = DBManager(
+                f"sqlite:///{os.path.join(tmp, 'bench.db')}", args.profile
+            ).engine
+            Base.metadata.create_all(engine)
+            repo = JournalRepo(engine)
+            rounds = max(1, args.entries // burst)
+
+            # One transaction per entry; only time a slice of it, it is slow
+            single_rounds = max(1, rounds // 10)
+            started = time.perf_counter()
+            for _ in range(single_rounds):
+                for i in range(burst):
+                    repo.create_journal_entry(f"entry {i}")
+            single = single_rounds * burst / (time.perf_counter() - started)
+
+            # A burst is queued, then the caller waits for it to be durable
+            with BufferedJournalWriter(repo, max_delay=0.001) as writer:
+                started = time.perf_counter()
+                for _ in range(rounds):
+                    for i in range(burst):
+                        writer.write(f"entry {i}")
+                    writer.sync()
+                grouped = rounds * burst / (time.perf_counter() - started)
+
+            print(f"{burst:>8}{single:>22,.0f}{grouped:>24,.0f}")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
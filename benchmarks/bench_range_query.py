@@ -0,0 +1,97 @@
+"""
+Benchmark:  range query latency on the journal table with and without the index on
+journal.ts.
+
+Builds a throwaway SQLite journal with N rows spread evenly over the last five years and
+times JournalRepo.get_entries_for_range for a day, a two week and a year long window.
+
+    python -m benchmarks.bench_range_query --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert, text
+from work_journal.core.db import Base, Journal, JournalRepo
+
+SPAN = timedelta(days=5 * 365)
+WINDOWS = {
+    "day": timedelta(days=1),
+    "two weeks": timedelta(days=14),
+    "year": timedelta(days=365),
+}
+
+
+def populate(engine, rows: int, chunk_size: int = 50_000):
+    """
+    Fill the journal table with rows evenly spaced over SPAN, ending now
+    """
+    end = datetime.now()
+    step = SPAN / rows
+    with engine.begin() as conn:
+        for chunk_start in range(0, rows, chunk_size):
+            chunk_end = min(chunk_start + chunk_size, rows)
+            conn.execute(
+                insert(Journal),
+                [
+                    {"ts": end - SPAN + step * i, "log": f"synthetic entry {i}"}
+                    for i in range(chunk_start, chunk_end)
+                ],
+            )
+
+
+def time_windows(repo: JournalRepo, repeat: int) -> dict:
+    """
+    Returns the median latency in milliseconds of each window in WINDOWS
+    """
+    results = {}
+    end = datetime.now()
+    for name, width in WINDOWS.items():
+        timings = []
+        for i in range(repeat):
+            # Walk the window backwards through time so we are not just hitting cache
+            window_end = end - (SPAN - width) * (i / repeat)
+            started = time.perf_counter()
+            repo.get_entries_for_range(window_end - width, window_end)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        results[name] = timings[len(timings) // 2] * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=11)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        repo = JournalRepo(engine)
+
+        print(f"Populating {args.rows:,} rows...")
+        populate(engine, args.rows)
+
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_journal_ts"))
+        without_index = time_windows(repo, args.repeat)
+
+        with engine.begin() as conn:
+            conn.execute(text("CREATE INDEX ix_journal_ts ON journal (ts)"))
+            conn.execute(text("ANALYZE"))
+        with_index = time_windows(repo, args.repeat)
+
+        print(f"{'window':<12}{'no index (ms)':>16}{'index (ms)':>14}{'speedup':>10}")
+        for name in WINDOWS:
+            speedup = without_index[name] / with_index[name]
+            print(
+                f"{name:<12}{without_index[name]:>16.2f}{with_index[name]:>14.2f}"
+                f"{speedup:>9.1f}x"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark:  ORM Journal objects versus read-only JournalRecords for range reads.
+
+Builds a throwaway SQLite journal with N rows spread evenly over the last five years and
+reads all of it through JournalRepo.get_entries_for_range (ORM) and
+get_records_for_range (Core rows into named tuples).  For each path it reports the time
+to build the list and, measured separately with tracemalloc, the memory the list keeps
+alive per row and the peak while building it.
+
+    python -m benchmarks.bench_records --rows 1000000
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from work_journal.core.db import DBManager, JournalRepo
+from .suite import synthetic_entries
+
+SPAN = timedelta(days=5 * 365)
+
+
+def measure(read, repeat: int) -> dict:
+    """
+    Best time of repeat calls to read(), then one more call under tracemalloc for the
+    memory it retains (per row) and its peak
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        rows = read()
+        timings.append(time.perf_counter() - started)
+        count = len(rows)
+        del rows
+
+    gc.collect()
+    tracemalloc.start()
+    rows = read()
+    (retained, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return {
+        "rows": count,
+        "seconds": min(timings),
+        "bytes_per_row": retained / max(count, 1),
+        "peak_mb": peak / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = DBManager(f"sqlite:///{os.path.join(tmp, 'bench.db')}").engine
+        repo = JournalRepo(engine)
+        now = datetime.now()
+        print(f"Populating {args.rows:,} rows...")
+        repo.create_journal_entries(synthetic_entries(args.rows, now))
+        (start, end) = (now - SPAN - timedelta(days=1), now)
+
+        paths = {
+            "ORM (Journal)": lambda: repo.get_entries_for_range(start, end),
+            "JournalRecord": lambda: repo.get_records_for_range(start, end),
+        }
+        results = {name: measure(read, args.repeat) for (name, read) in paths.items()}
+        engine.dispose()
+
+    print(f"{'path':<16}{'rows':>11}{'seconds':>10}{'bytes/row':>11}{'peak MB':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:<16}{result['rows']:>11,}{result['seconds']:>10.2f}"
+            f"{result['bytes_per_row']:>11.0f}{result['peak_mb']:>10.0f}"
+        )
+    (orm, records) = results.values()
+    print(
+        f"\nJournalRecord:  {orm['seconds'] / records['seconds']:.1f}x quicker, "
+        f"{orm['bytes_per_row'] / records['bytes_per_row']:.1f}x less memory per row"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark:  JournalRepo.search (FTS5, bm25 ranked) against the LIKE '%word%' scan it
+replaces, on a synthetic SQLite journal.
+
+Two LIKE baselines are shown:  newest matches with a LIMIT, which can stop early for a
+common word, and all matches, which is what ranking needs.  bm25 has to score every
+match too, so for a word in a large share of the entries the limited LIKE wins; FTS5
+pays off as the word gets rarer.
+
+    python -m benchmarks.bench_search --rows 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from work_journal.core.db import Base, Journal, JournalRepo
+
+VOCABULARY = (
+    "reviewed merged deployed fixed wrote tested paired planned debugged refactored "
+    "release pipeline dashboard migration report standup invoice customer outage "
+    "database schema backlog sprint ticket incident retro onboarding budget"
+).split()
+
+# Common, middling and rare terms
+QUERIES = ["release", "outage", "zyzzyva"]
+
+
+def populate(repo: JournalRepo, rows: int, rng: random.Random):
+    start = datetime.now() - timedelta(days=5 * 365)
+    step = timedelta(days=5 * 365) / rows
+    repo.create_journal_entries(
+        (
+            start + step * i,
+            " ".join(rng.choices(VOCABULARY, k=8))
+            + (" zyzzyva" if i % 100_000 == 0 else ""),
+        )
+        for i in range(rows)
+    )
+
+
+def median_ms(action, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        action()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=JournalRepo.SEARCH_LIMIT)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        repo = JournalRepo(engine)
+        print(f"Populating {args.rows:,} rows...")
+        populate(repo, args.rows, random.Random(42))
+
+        def like(word, limit=None):
+            with Session(engine) as session:
+                return session.scalars(
+                    select(Journal)
+                    .where(Journal.log.like(f"%{word}%"))
+                    .order_by(Journal.id.desc())
+                    .limit(limit)
+                ).all()
+
+        print(
+            f"{'query':<10}{'matches':>10}{'LIKE limit (ms)':>17}"
+            f"{'LIKE all (ms)':>15}{'FTS5 (ms)':>12}"
+        )
+        for word in QUERIES:
+            matches = len(like(word))
+            limited_ms = median_ms(lambda: like(word, args.limit), args.repeat)
+            all_ms = median_ms(lambda: like(word), args.repeat)
+            fts_ms = median_ms(lambda: repo.search(word, limit=args.limit), args.repeat)
+            print(
+                f"{word:<10}{matches:>10,}{limited_ms:>17.2f}"
+                f"{all_ms:>15.2f}{fts_ms:>12.2f}"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
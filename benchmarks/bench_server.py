@@ -0,0 +1,160 @@
+"""
+Benchmark:  load test of the local HTTP service (work_journal serve).  Each scenario
+runs --clients concurrent keep-alive connections, each sending --requests requests,
+and reports requests/sec with the median and p99 latency.
+
+    python -m benchmarks.bench_server --clients 1 8 32
+    python -m benchmarks.bench_server --url http://127.0.0.1:8765 --scenarios last range
+
+Without --url a server is started on a throwaway journal of --entries entries, in a
+process of its own so that it doesn't share the GIL with the clients.  Against a real
+journal, leave out the post scenarios unless the test entries are welcome there.
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+from work_journal.core.db import DBManager, JournalRepo
+
+WORDS = "deploy review standup release bugfix meeting refactor docs oncall".split()
+
+# Posted entries are dated long ago, so they don't change what the reads return
+POSTED_AT = "2000-01-01T00:00:00"
+
+# name:  (method, path, body), the body being called with the request number
+SCENARIOS = {
+    "post": (
+        "POST",
+        "/entries",
+        lambda i: {"log": f"load test {i} #load", "timestamp": POSTED_AT},
+    ),
+    "post-batch": (
+        "POST",
+        "/entries",
+        lambda i: [
+            {"log": f"load test {i}.{j} #load", "timestamp": POSTED_AT}
+            for j in range(10)
+        ],
+    ),
+    "last": ("GET", "/entries?last=20", None),
+    "range": ("GET", "/entries?range=today", None),
+    "search": ("GET", "/search?q=deploy&limit=20", None),
+}
+
+
+def start_server(tmp: str, entries: int):
+    """
+    Fills a journal in tmp and serves it, returns (process, url)
+    """
+    db = os.path.join(tmp, "bench.db")
+    engine = DBManager(f"sqlite:///{db}").engine
+    now = datetime.now()
+    JournalRepo(engine).create_journal_entries(
+        (now - timedelta(minutes=i), f"Entry {i}: {WORDS[i % len(WORDS)]} work")
+        for i in range(entries)
+    )
+    engine.dispose()
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "work_journal", "--db", db, "serve", "--port", "0"],
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    # "Listening on http://127.0.0.1:PORT"
+    line = ""
+    while not line.startswith("Listening on"):
+        line = process.stderr.readline()
+        if not line:
+            raise RuntimeError("The server didn't start")
+    url = line.split()[-1]
+    # Drain the rest (slow query warnings under load), so the pipe never fills up
+    threading.Thread(target=process.stderr.read, daemon=True).start()
+    return (process, url)
+
+
+def client(url: str, scenario: str, requests: int, offset: int, latencies: list):
+    (method, path, body) = SCENARIOS[scenario]
+    address = urlsplit(url)
+    conn = http.client.HTTPConnection(address.hostname, address.port, timeout=30)
+    try:
+        for i in range(requests):
+            payload = None if body is None else json.dumps(body(offset + i))
+            started = time.perf_counter()
+            conn.request(method, path, body=payload)
+            response = conn.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - started)
+            if response.status >= 400:
+                raise RuntimeError(f"{method} {path}: HTTP {response.status}")
+    finally:
+        conn.close()
+
+
+def run(url: str, scenario: str, clients: int, requests: int) -> tuple:
+    """
+    (requests/sec, median ms, p99 ms) for clients connections sending requests each
+    """
+    latencies = []
+    threads = [
+        threading.Thread(
+            target=client, args=(url, scenario, requests, n * requests, latencies)
+        )
+        for n in range(clients)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if len(latencies) < clients * requests:
+        raise RuntimeError(f"{scenario}: some requests failed")
+    latencies.sort()
+    return (
+        len(latencies) / elapsed,
+        latencies[len(latencies) // 2] * 1000,
+        latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="a running server, instead of starting one")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="per client")
+    parser.add_argument("--entries", type=int, default=10_000)
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS)
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        process = None
+        url = args.url
+        if url is None:
+            (process, url) = start_server(tmp, args.entries)
+        try:
+            print(
+                f"{'scenario':<12}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+            )
+            for scenario in args.scenarios:
+                for clients in args.clients:
+                    (rate, p50, p99) = run(url, scenario, clients, args.requests)
+                    print(
+                        f"{scenario:<12}{clients:>8}{rate:>10,.0f}{p50:>10.2f}{p99:>10.2f}"
+                    )
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+
+if __name__ == "__main__":
+    main()
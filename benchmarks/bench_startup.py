@@ -0,0 +1,96 @@
+"""
+Benchmark:  cold start cost, i.e. everything that happens before the main window can
+paint, and then what opening the database costs on the worker.
+
+Import times come from `python -X importtime` in a fresh interpreter per run, so they
+include everything a real launch imports.  The window only needs work_journal.ui
+.main_window; work_journal.core.db (and SQLAlchemy) is imported on the worker afterwards.
+Database open is timed for a new file (schema created, config seeded) and an existing
+one (schema version read from PRAGMA user_version, nothing written).
+
+    python -m benchmarks.bench_startup --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODULES = ("work_journal.ui.main_window", "work_journal.core.db")
+
+
+def import_time(module: str) -> tuple[float, bool]:
+    """
+    (cumulative import time of module in ms, whether SQLAlchemy got imported) in a
+    fresh interpreter
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = 0
+    sqlalchemy = False
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        (_, total, name) = line[len("import time:") :].split("|")
+        if not total.strip().isdigit():
+            continue
+        if name.strip() == "sqlalchemy":
+            sqlalchemy = True
+        if name.strip() == module:
+            cumulative = int(total)
+    return (cumulative / 1000, sqlalchemy)
+
+
+def open_database(path: str) -> float:
+    """
+    Milliseconds to open the journal the way work_journal.open_database does
+    """
+    from work_journal.core.db import ConfigRepo, DBManager, JournalRepo
+
+    started = time.perf_counter()
+    engine = DBManager(f"sqlite:///{path}").engine
+    JournalRepo(engine)
+    ConfigRepo(engine).seed_defaults()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    return elapsed * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'import':<32}{'median ms':>10}{'max ms':>10}  sqlalchemy")
+    for module in MODULES:
+        runs = [import_time(module) for _ in range(args.runs)]
+        timings = [timing for (timing, _) in runs]
+        print(
+            f"{module:<32}{statistics.median(timings):>10.1f}{max(timings):>10.1f}"
+            f"  {'yes' if runs[0][1] else 'no'}"
+        )
+
+    # Import outside the timings, the subprocess runs above already cover imports
+    import work_journal.core.db  # noqa: F401
+
+    cold = []
+    warm = []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            cold.append(open_database(path))
+            warm.append(open_database(path))
+    print()
+    print(f"{'open database':<32}{'median ms':>10}{'max ms':>10}")
+    print(f"{'first run':<32}{statistics.median(cold):>10.1f}{max(cold):>10.1f}")
+    print(f"{'existing journal':<32}{statistics.median(warm):>10.1f}{max(warm):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
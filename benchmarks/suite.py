@@ -0,0 +1,245 @@
+"""
+Benchmark suite:  times the repositories and exporters against synthetic journals of
+several sizes and saves the results as JSON, so that runs of two versions can be
+compared to catch regressions.
+
+For every size a throwaway SQLite journal (the app's default engine profile) is filled
+with entries spread over the last five years, then each benchmark runs a number of
+times.  Results are reported as min / median / p99 milliseconds per call.
+
+    python -m benchmarks.suite --sizes 10000 100000 1000000 --output before.json
+    python -m benchmarks.suite --output after.json --compare before.json
+
+With --compare the run exits with status 1 if any benchmark's best time is more than
+--threshold times slower than in the baseline.  Best rather than median, since it is
+the least disturbed by whatever else the machine is doing.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+import sqlalchemy
+from work_journal.core.db import ConfigRepo, DBManager, GRANULARITY_WEEK, JournalRepo
+from work_journal.core.export import WRITERS, export
+
+SIZES = (10_000, 100_000, 1_000_000)
+SPAN = timedelta(days=5 * 365)
+WORDS = "deploy review standup release bugfix meeting refactor docs oncall".split()
+
+# How many times each kind of benchmark runs per size
+REPEAT = 200
+REPEAT_SLOW = 10
+# Slowdowns smaller than this are timer noise, whatever the ratio
+NOISE_FLOOR_MS = 0.05
+
+
+def synthetic_entries(rows: int, now: datetime):
+    """
+    rows (timestamp, log) pairs, oldest first, evenly spread over SPAN up to now
+    """
+    step = SPAN / rows
+    start = now - SPAN
+    for i in range(rows):
+        yield (start + step * i, f"Entry {i}: {WORDS[i % len(WORDS)]} work, item {i}")
+
+
+def timed(action: Callable[[int], object], repeat: int) -> dict:
+    """
+    Runs action(i) repeat times.  Returns timings in ms, and how many rows the last
+    call returned if it returned something countable.
+    """
+    timings = []
+    rows = None
+    for i in range(repeat):
+        started = time.perf_counter()
+        result = action(i)
+        timings.append((time.perf_counter() - started) * 1000)
+        if isinstance(result, (int, list)):
+            rows = result if isinstance(result, int) else len(result)
+    timings.sort()
+    return {
+        "repeat": repeat,
+        "min_ms": timings[0],
+        "median_ms": timings[len(timings) // 2],
+        "p99_ms": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+        "rows": rows,
+    }
+
+
+def run_size(rows: int, tmp: str) -> dict:
+    """
+    All benchmarks against a journal of rows entries
+    """
+    engine = DBManager(f"sqlite:///{os.path.join(tmp, f'bench_{rows}.db')}").engine
+    repo = JournalRepo(engine)
+    config_repo = ConfigRepo(engine)
+    config_repo.seed_defaults()
+    now = datetime.now()
+    results = {}
+
+    started = time.perf_counter()
+    repo.create_journal_entries(synthetic_entries(rows, now))
+    elapsed = time.perf_counter() - started
+    results["create_journal_entries"] = {
+        "repeat": 1,
+        "min_ms": elapsed * 1000,
+        "median_ms": elapsed * 1000,
+        "p99_ms": elapsed * 1000,
+        "rows": rows,
+        "rows_per_sec": rows / elapsed,
+    }
+
+    results["create_journal_entry"] = timed(
+        lambda i: repo.create_journal_entry(f"single entry {i}"), REPEAT
+    )
+    results["get_last_n_entries"] = timed(lambda i: repo.get_last_n_entries(5), REPEAT)
+    results["get_entries_before"] = timed(
+        lambda i: repo.get_entries_before(rows // 2, 50), REPEAT
+    )
+
+    results["get_today_entries"] = timed(lambda i: repo.get_today_entries(), REPEAT)
+    results["get_yesterday_entries"] = timed(
+        lambda i: repo.get_yesterday_entries(), REPEAT
+    )
+    results["get_last_two_week_entries"] = timed(
+        lambda i: repo.get_last_two_week_entries(), REPEAT
+    )
+    year = (now - timedelta(days=365), now)
+    results["iter_rows_for_range_year"] = timed(
+        lambda i: sum(1 for _ in repo.iter_rows_for_range(*year)), REPEAT_SLOW
+    )
+    results["get_records_for_range_year"] = timed(
+        lambda i: repo.get_records_for_range(*year), REPEAT_SLOW
+    )
+    results["get_summary_week_year"] = timed(
+        lambda i: repo.get_summary(GRANULARITY_WEEK, *year), REPEAT
+    )
+    results["search"] = timed(lambda i: repo.search(WORDS[i % len(WORDS)]), REPEAT)
+
+    # Repeated reads through the result cache, as the GUI makes them
+    cached_repo = JournalRepo(engine, cache_size=JournalRepo.CACHE_SIZE)
+    results["cached_last_two_week_entries"] = timed(
+        lambda i: cached_repo.get_last_two_week_entries(), REPEAT
+    )
+    results["cached_records_for_range_year"] = timed(
+        lambda i: cached_repo.get_records_for_range(*year), REPEAT
+    )
+    cached_repo.cache.close()
+
+    results["config_get"] = timed(
+        lambda i: config_repo.get(ConfigRepo.CONFIG_HISTORY_LEN), REPEAT
+    )
+    results["config_retrieve_by_key"] = timed(
+        lambda i: config_repo.retrieve_by_key(ConfigRepo.CONFIG_GEOMETRY), REPEAT
+    )
+    results["config_update"] = timed(
+        lambda i: config_repo.update(ConfigRepo.CONFIG_HISTORY_LEN, i % 10 + 1), REPEAT
+    )
+
+    for name in WRITERS:
+        filename = os.path.join(tmp, f"report.{name}")
+        results[f"export_{name}_year"] = timed(
+            lambda i: export(filename, repo.iter_rows_for_range(*year), name),
+            REPEAT_SLOW,
+        )
+        os.remove(filename)
+
+    engine.dispose()
+    return results
+
+
+def environment() -> dict:
+    """
+    What the numbers were measured on, saved alongside them
+    """
+    try:
+        revision = subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "revision": revision,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "sqlalchemy": sqlalchemy.__version__,
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Prints the best time of every benchmark against the baseline, returns the names of
+    those that got more than threshold times slower (and by more than NOISE_FLOOR_MS)
+    """
+    regressions = []
+    print(f"\n{'size':>9}  {'benchmark':<32}{'base ms':>10}{'now ms':>10}{'ratio':>8}")
+    for size, benchmarks in results["results"].items():
+        for name, result in benchmarks.items():
+            base = baseline["results"].get(size, {}).get(name)
+            if base is None:
+                continue
+            ratio = result["min_ms"] / max(base["min_ms"], 1e-9)
+            flag = ""
+            slower_by = result["min_ms"] - base["min_ms"]
+            if ratio > threshold and slower_by > NOISE_FLOOR_MS:
+                flag = "  REGRESSION"
+                regressions.append(f"{size}/{name}")
+            print(
+                f"{size:>9}  {name:<32}{base['min_ms']:>10.3f}"
+                f"{result['min_ms']:>10.3f}{ratio:>7.2f}x{flag}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file from an earlier run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.5,
+        help="slowdown that counts as a regression (default 1.5)",
+    )
+    args = parser.parse_args()
+
+    results = {"environment": environment(), "results": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            print(f"{size:,} rows...", flush=True)
+            benchmarks = run_size(size, tmp)
+            results["results"][str(size)] = benchmarks
+            for name, result in benchmarks.items():
+                print(
+                    f"  {name:<32}{result['min_ms']:>10.3f}{result['median_ms']:>10.3f}"
+                    f"{result['p99_ms']:>10.3f} ms"
+                )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s):  {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import os
+import pytest
+from work_journal.core import app_config
+from work_journal.core.db import DBManager
+
+
+@pytest.fixture(autouse=True)
+def clean_config(monkeypatch, tmp_path):
+    monkeypatch.delenv(app_config.ENV_DB_URL, raising=False)
+    monkeypatch.delenv(app_config.ENV_DATA_DIR, raising=False)
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "xdg"))
+    yield
+    app_config.configure(None)
+    DBManager.dispose_all()
+
+
+def test_to_url():
+    assert app_config.to_url("postgresql://me@host/journal") == (
+        "postgresql://me@host/journal"
+    )
+    assert app_config.to_url(":memory:") == "sqlite://"
+    assert app_config.to_url("journal.db") == (
+        f"sqlite:///{os.path.abspath('journal.db')}"
+    )
+
+
+@pytest.mark.skipif(os.name == "nt", reason="Windows keeps c:\\data")
+def test_default_is_xdg_data_dir(tmp_path):
+    expected = tmp_path / "xdg" / "work_journal" / "work_journal.db"
+
+    assert app_config.database_url() == f"sqlite:///{expected}"
+
+
+def test_precedence(monkeypatch, tmp_path):
+    monkeypatch.setenv(app_config.ENV_DATA_DIR, str(tmp_path / "data"))
+    assert app_config.database_url() == (
+        f"sqlite:///{tmp_path / 'data' / 'work_journal.db'}"
+    )
+
+    monkeypatch.setenv(app_config.ENV_DB_URL, "sqlite://")
+    assert app_config.database_url() == "sqlite://"
+
+    app_config.configure(str(tmp_path / "cli.db"))
+    assert app_config.database_url() == f"sqlite:///{tmp_path / 'cli.db'}"
+
+
+def test_get_db_creates_directory_and_reuses_engine(monkeypatch, tmp_path):
+    monkeypatch.setenv(app_config.ENV_DATA_DIR, str(tmp_path / "new" / "dir"))
+
+    db = app_config.get_db()
+
+    assert (tmp_path / "new" / "dir").is_dir()
+    assert app_config.db is db
+    assert app_config.get_db(str(tmp_path / "new" / "dir" / "work_journal.db")) is db
+    # A second journal side by side gets its own engine
+    other = app_config.get_db(str(tmp_path / "other.db"))
+    assert other.engine is not db.engine
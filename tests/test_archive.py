@@ -0,0 +1,181 @@
+import sqlite3
+from datetime import datetime
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from work_journal.core.db import (
+    AsyncJournalRepo,
+    DBManager,
+    Journal,
+    JournalArchive,
+    JournalRepo,
+)
+from work_journal.core.db import journal_repo
+from work_journal.core.db.archive import MAX_ATTACHED, attached
+from .test_db import blocking
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = DBManager(f"sqlite:///{tmp_path / 'journal.db'}").engine
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(params=[JournalRepo, AsyncJournalRepo])
+def repo(request, engine):
+    if request.param is AsyncJournalRepo:
+        with blocking(AsyncJournalRepo, engine) as repo:
+            yield repo
+    else:
+        yield JournalRepo(engine)
+
+
+@pytest.fixture
+def entries(repo: JournalRepo):
+    repo.create_journal_entries(
+        [
+            (datetime(2021, 6, 1), "2021"),
+            (datetime(2022, 3, 1), "early 2022"),
+            (datetime(2022, 9, 1), "late 2022"),
+            (datetime(2023, 1, 2), "2023"),
+        ]
+    )
+
+
+def test_archive_before(repo: JournalRepo, engine, entries, tmp_path):
+    moved = repo.archive_before(datetime(2022, 6, 1))
+
+    assert moved == 2
+    assert repo.archive_dir == str(tmp_path / "journal_archive")
+    assert sorted(p.name for p in (tmp_path / "journal_archive").iterdir()) == [
+        "journal_2021.db",
+        "journal_2022.db",
+    ]
+    assert [entry.log for entry in repo.get_last_n_entries(10)] == [
+        "2023",
+        "late 2022",
+    ]
+    with Session(engine) as session:
+        archives = session.scalars(select(JournalArchive)).all()
+    assert [(archive.year, archive.entry_count) for archive in archives] == [
+        (2021, 1),
+        (2022, 1),
+    ]
+    # Nothing left to move, running again is harmless
+    assert repo.archive_before(datetime(2022, 6, 1)) == 0
+
+
+def test_archive_interrupted_after_the_copy(engine, tmp_path, monkeypatch):
+    repo = JournalRepo(engine)
+    repo.create_journal_entries(
+        [(datetime(2021, 6, 1), "2021"), (datetime(2023, 1, 2), "2023")]
+    )
+
+    def interrupted(*args):
+        raise RuntimeError("interrupted")
+
+    monkeypatch.setattr(journal_repo, "delete", interrupted)
+    with pytest.raises(RuntimeError):
+        repo.archive_before(datetime(2022, 1, 1))
+    monkeypatch.undo()
+
+    # The copy was committed on its own, the next run finishes the move
+    archive = sqlite3.connect(tmp_path / "journal_archive" / "journal_2021.db")
+    assert archive.execute("SELECT log FROM journal").fetchall() == [("2021",)]
+    archive.close()
+    assert repo.archive_before(datetime(2022, 1, 1)) == 1
+    records = repo.get_records_for_range(datetime(2021, 1, 1), datetime(2024, 1, 1))
+    assert [record.log for record in records] == ["2021", "2023"]
+
+
+def test_range_queries_span_archive(repo: JournalRepo, entries):
+    repo.archive_before(datetime(2022, 6, 1))
+    start = datetime(2021, 1, 1)
+    end = datetime(2023, 12, 31)
+    expected = ["2021", "early 2022", "late 2022", "2023"]
+
+    assert [entry.log for entry in repo.get_entries_for_range(start, end)] == expected
+    assert [entry.log for entry in repo.iter_entries_for_range(start, end)] == expected
+    assert [log for (_, log) in repo.iter_rows_for_range(start, end)] == expected
+    assert [record.log for record in repo.get_records_for_range(start, end)] == expected
+    # Only the years asked for
+    assert [
+        entry.log for entry in repo.get_entries_for_range(datetime(2022, 1, 1), end)
+    ] == expected[1:]
+
+
+def test_archives_detached_after_query(repo: JournalRepo, engine, entries):
+    repo.archive_before(datetime(2022, 6, 1))
+    rows = repo.iter_rows_for_range(datetime(2021, 1, 1), datetime(2023, 12, 31))
+    next(rows)
+    rows.close()
+
+    with engine.connect() as conn:
+        databases = [row.name for row in conn.exec_driver_sql("PRAGMA database_list")]
+    assert not [name for name in databases if name.startswith("archive_")]
+
+
+def test_range_queries_span_more_archives_than_attach_limit(repo: JournalRepo):
+    years = range(2000, 2000 + 2 * MAX_ATTACHED + 3)
+    repo.create_journal_entries(
+        [(datetime(year, 6, 1), f"{year} #yearly") for year in years]
+        + [(datetime(2030, 1, 1), "newest")]
+    )
+    repo.archive_before(datetime(2029, 1, 1))
+    (start, end) = (datetime(1999, 1, 1), datetime(2031, 1, 1))
+    expected = [f"{year} #yearly" for year in years] + ["newest"]
+
+    assert [entry.log for entry in repo.get_entries_for_range(start, end)] == expected
+    assert [entry.log for entry in repo.iter_entries_for_range(start, end)] == expected
+    assert [log for (_, log) in repo.iter_rows_for_range(start, end)] == expected
+    assert [record.log for record in repo.get_records_for_range(start, end)] == expected
+    assert [tuple(row) for row in repo.get_tag_counts(start, end)] == [
+        ("yearly", len(years))
+    ]
+
+
+def test_failed_attach_detaches_the_others(engine, tmp_path):
+    with engine.connect() as conn:
+        with pytest.raises(Exception):
+            # The second ATTACH of the same schema fails
+            with attached(conn, str(tmp_path), [2021, 2021]):
+                pass
+        databases = [row.name for row in conn.exec_driver_sql("PRAGMA database_list")]
+    assert databases == ["main"]
+
+
+def test_newest_entry_is_never_archived(repo: JournalRepo, entries):
+    assert repo.archive_before(datetime(2030, 1, 1)) == 3
+    assert [entry.log for entry in repo.get_last_n_entries(10)] == ["2023"]
+
+    new_entry = repo.create_journal_entry("new")
+    archived = repo.get_entries_for_range(datetime(2021, 1, 1), datetime(2022, 12, 31))
+    assert new_entry.id not in [entry.id for entry in archived]
+
+
+def test_in_memory_journal_cannot_be_archived():
+    repo = JournalRepo(DBManager("sqlite://").engine)
+
+    with pytest.raises(ValueError):
+        repo.archive_before(datetime(2022, 1, 1))
+
+
+def test_tags_span_archive(repo: JournalRepo):
+    repo.create_journal_entries(
+        [
+            (datetime(2021, 6, 1), "old #release"),
+            (datetime(2023, 1, 2), "new #release"),
+            (datetime(2023, 1, 3), "untagged"),
+        ]
+    )
+    repo.archive_before(datetime(2022, 1, 1))
+    (start, end) = (datetime(2021, 1, 1), datetime(2024, 1, 1))
+
+    assert [
+        entry.log for entry in repo.get_entries_for_range(start, end, tags=["release"])
+    ] == ["old #release", "new #release"]
+    assert [tuple(row) for row in repo.get_tag_counts(start, end)] == [("release", 2)]
+    assert [tuple(row) for row in repo.get_tag_counts(datetime(2023, 1, 1), end)] == [
+        ("release", 1)
+    ]
@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import create_engine
+from work_journal.core.db import Base, ChangeMonitor, JournalRepo
+
+
+@pytest.fixture
+def db_url(tmp_path) -> str:
+    url = f"sqlite:///{tmp_path / 'journal.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def engine(db_url):
+    engine = create_engine(db_url)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def monitor(engine):
+    monitor = ChangeMonitor(engine)
+    yield monitor
+    monitor.close()
+
+
+def test_no_change(monitor: ChangeMonitor):
+    assert not monitor.has_changed()
+
+
+def test_external_change(db_url, monitor: ChangeMonitor):
+    # A second engine stands in for another process
+    other = create_engine(db_url)
+    JournalRepo(other).create_journal_entry("written elsewhere")
+    other.dispose()
+
+    assert monitor.has_changed()
+    # Only reported once
+    assert not monitor.has_changed()
+
+
+def test_changes_are_counted_for_every_caller(db_url, monitor: ChangeMonitor):
+    other = create_engine(db_url)
+    JournalRepo(other).create_journal_entry("written elsewhere")
+    other.dispose()
+
+    assert monitor.changes() == 1
+    # Seen by changes(), still news to has_changed()
+    assert monitor.has_changed()
+    assert monitor.changes() == 1
+
+
+def test_mark_seen(engine, monitor: ChangeMonitor):
+    JournalRepo(engine).create_journal_entry("written by us")
+    monitor.mark_seen()
+
+    assert not monitor.has_changed()
+
+
+def test_watched_repo_writes_are_not_changes(db_url, engine):
+    repo = JournalRepo(engine)
+    monitor = repo.watch()
+    repo.create_journal_entry("written by us")
+    repo.create_journal_entries(["and", "more"])
+    assert not monitor.has_changed()
+
+    other = create_engine(db_url)
+    JournalRepo(other).create_journal_entry("written elsewhere")
+    other.dispose()
+    repo.create_journal_entry("written by us again")
+
+    # Our own later write doesn't hide the other one
+    assert monitor.has_changed()
+    assert len(repo.get_last_n_entries(10)) == 5
+    monitor.close()
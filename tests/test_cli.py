@@ -0,0 +1,141 @@
+import io
+import json
+import subprocess
+import sys
+from datetime import datetime
+import pytest
+from work_journal import cli
+from work_journal.core.db import DBManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    yield str(tmp_path / "journal.db")
+    DBManager.dispose_all()
+
+
+def run(db, capsys, *argv, stdin=None, monkeypatch=None):
+    if stdin is not None:
+        monkeypatch.setattr("sys.stdin", io.StringIO(stdin))
+    assert cli.main(["--db", db, *argv]) == 0
+    return capsys.readouterr()
+
+
+def test_add_and_report(db, capsys, monkeypatch):
+    run(db, capsys, "add", "Fixed", "the", "build")
+    result = run(
+        db, capsys, "add", stdin="one\n\ntwo, with a comma\n", monkeypatch=monkeypatch
+    )
+    assert result.err == "Added 2 entries\n"
+
+    report = run(db, capsys, "report", "--format", "jsonl")
+
+    logs = [json.loads(line)["log"] for line in report.out.splitlines()]
+    assert logs == ["Fixed the build", "one", "two, with a comma"]
+
+
+def test_report_explicit_range(db, capsys):
+    run(db, capsys, "add", "today")
+    today = datetime.now().date().isoformat()
+
+    assert "today" in run(db, capsys, "report", "--start", today, "--end", today).out
+    assert run(db, capsys, "report", "--end", "2000-01-01").out == (
+        "timestamp,log_entry\r\n"
+    )
+
+
+def test_search(db, capsys):
+    run(db, capsys, "add", "Deployed the release")
+    run(db, capsys, "add", "Reviewed a PR")
+
+    result = run(db, capsys, "search", "deploy")
+
+    assert result.out.endswith(": Deployed the release\n")
+    assert len(result.out.splitlines()) == 1
+
+
+@pytest.mark.parametrize("limit", ["0", "-1", "1001", "ten"])
+def test_search_limit_is_bounded(db, capsys, limit):
+    with pytest.raises(SystemExit) as raised:
+        cli.main(["--db", db, "search", "deploy", "--limit", limit])
+
+    assert raised.value.code == 2
+    assert "--limit" in capsys.readouterr().err
+
+
+def test_search_limit_matches_server():
+    from work_journal import server
+
+    assert cli.MAX_LIMIT == server.MAX_PAGE
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["search", '"unbalanced'],
+        ["search", "deploy", "--start", "yesterday"],
+        ["report", "--start", "2024-13-01"],
+        ["report", "--start", "2024-02-01", "--end", "2024-01-01"],
+    ],
+)
+def test_invalid_input_is_an_error(db, capsys, argv):
+    assert cli.main(["--db", db, *argv]) == 2
+    result = capsys.readouterr()
+    assert result.err.startswith("error: ")
+    assert "Traceback" not in result.err
+
+
+def test_archive(db, capsys, monkeypatch):
+    run(
+        db,
+        capsys,
+        "add",
+        stdin="old entry\nnewest entry\n",
+        monkeypatch=monkeypatch,
+    )
+
+    result = run(db, capsys, "archive", "--older-than", "-1")
+
+    # Everything is older than tomorrow, but the newest entry always stays
+    assert result.err.startswith("Archived 1 entries to ")
+    report = run(db, capsys, "report", "--format", "jsonl")
+    assert [json.loads(line)["log"] for line in report.out.splitlines()] == [
+        "old entry",
+        "newest entry",
+    ]
+
+
+def test_report_preset_range(db, capsys):
+    run(db, capsys, "add", "this week")
+
+    for name in ("today", "week", "month", "quarter", "year", "past-year"):
+        assert "this week" in run(db, capsys, "report", "--range", name).out
+    assert "this week" not in run(db, capsys, "report", "--range", "yesterday").out
+
+
+def test_tags(db, capsys):
+    run(db, capsys, "add", "paged for #oncall")
+    run(db, capsys, "add", "#OnCall handover, then #deploy")
+    run(db, capsys, "add", "untagged")
+
+    assert run(db, capsys, "tags").out == "       2  #oncall\n       1  #deploy\n"
+    assert run(db, capsys, "tags", "--range", "yesterday").out == ""
+    report = run(db, capsys, "report", "--tag", "deploy", "--tag", "#nope").out
+    assert len(report.splitlines()) == 2
+    assert "#OnCall handover, then #deploy" in report
+
+
+def test_sync(tmp_path, capsys):
+    (laptop, desktop) = (str(tmp_path / "laptop.db"), str(tmp_path / "desktop.db"))
+    shared = str(tmp_path / "shared")
+    run(laptop, capsys, "add", "written on the laptop")
+
+    assert run(laptop, capsys, "sync", shared).err == "Sent 1 entries, merged 0\n"
+    assert run(desktop, capsys, "sync", shared).err == "Sent 0 entries, merged 1\n"
+    assert "written on the laptop" in run(desktop, capsys, "report").out
+    DBManager.dispose_all()
+
+
+def test_no_tkinter():
+    code = "import sys, work_journal.cli; sys.exit('tkinter' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
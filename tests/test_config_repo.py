@@ -1,18 +1,30 @@
 import pytest
-from sqlalchemy import select, insert, update, delete
+from sqlalchemy import select, insert, update, delete, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from work_journal.core.db import ConfigRepo, Config
-from .test_db import get_clean_db
+from work_journal.core.db import AsyncConfigRepo, ConfigRepo, Config
+from .test_db import blocking, get_clean_db, get_clean_file_db
+
+
+@pytest.fixture(params=[ConfigRepo, AsyncConfigRepo])
+def repo_class(request):
+    return request.param
 
 
 @pytest.fixture
-def engine():
+def engine(repo_class, tmp_path):
+    if repo_class is AsyncConfigRepo:
+        return get_clean_file_db(tmp_path)
     return get_clean_db()
 
 
 @pytest.fixture
-def repo(engine) -> ConfigRepo:
-    return ConfigRepo(engine)
+def repo(repo_class, engine) -> ConfigRepo:
+    if repo_class is AsyncConfigRepo:
+        with blocking(repo_class, engine) as repo:
+            yield repo
+    else:
+        yield ConfigRepo(engine)
 
 
 @pytest.fixture
@@ -92,3 +104,75 @@ def test_delete_success(repo: ConfigRepo, test_data):
 
     actual = repo.retrieve_by_key(expected.key)
     assert actual is None
+
+
+def test_update_refreshes_cache(repo: ConfigRepo, engine, test_data):
+    repo.update("key1", "changed")
+
+    assert repo.config["key1"] == "changed"
+    # And a fresh repo reads the same value back from the database
+    assert ConfigRepo(engine).config["key1"] == "changed"
+
+
+def test_delete_refreshes_cache(repo: ConfigRepo, test_data):
+    repo.delete("key1")
+
+    assert "key1" not in repo.config
+
+
+def test_typed_values(repo: ConfigRepo, engine):
+    repo.create_config(ConfigRepo.CONFIG_HISTORY_LEN, 5)
+    assert repo.config[ConfigRepo.CONFIG_HISTORY_LEN] == 5
+
+    repo.update(ConfigRepo.CONFIG_HISTORY_LEN, 7)
+    assert ConfigRepo(engine).get(ConfigRepo.CONFIG_HISTORY_LEN) == 7
+    assert repo.retrieve_by_key(ConfigRepo.CONFIG_HISTORY_LEN).value == "7"
+
+
+def test_malformed_value_falls_back_to_default(repo: ConfigRepo, engine, caplog):
+    repo.create_config(ConfigRepo.CONFIG_HISTORY_LEN, "lots")
+
+    assert repo.config[ConfigRepo.CONFIG_HISTORY_LEN] == 5
+    # Nor does it keep the repo from loading
+    assert ConfigRepo(engine).get(ConfigRepo.CONFIG_HISTORY_LEN) == 5
+    assert "HISTORY_LEN='lots'" in caplog.text
+
+
+def test_set_many(repo: ConfigRepo, engine, test_data):
+    repo.set_many({"key1": "new value", "key4": "value4"})
+
+    assert repo.config["key1"] == "new value"
+    assert repo.config["key4"] == "value4"
+    with Session(engine) as session:
+        stored = dict(session.execute(select(Config.key, Config.value)).all())
+    assert stored == {
+        "key1": "new value",
+        "key2": "value2",
+        "key3": "value3",
+        "key4": "value4",
+    }
+
+
+def test_key_is_unique(repo: ConfigRepo, engine, test_data):
+    with pytest.raises(IntegrityError):
+        repo.create_config("key1", "duplicate")
+
+    with Session(engine) as session:
+        plan = session.execute(
+            text("EXPLAIN QUERY PLAN SELECT * FROM config WHERE key = :key"),
+            {"key": "key1"},
+        ).all()
+    assert any("ix_config_key" in row.detail for row in plan)
+
+
+def test_seed_defaults(repo: ConfigRepo, engine):
+    repo.create_config(ConfigRepo.CONFIG_GEOMETRY, "1024x768")
+
+    repo.seed_defaults()
+
+    # Missing defaults are written, existing values are left alone
+    assert ConfigRepo(engine).config == {
+        ConfigRepo.CONFIG_INIT: "True",
+        ConfigRepo.CONFIG_HISTORY_LEN: 5,
+        ConfigRepo.CONFIG_GEOMETRY: "1024x768",
+    }
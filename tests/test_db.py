@@ -1,5 +1,10 @@
+import asyncio
+import functools
+import inspect
+from contextlib import contextmanager
+import pytest
 from sqlalchemy import create_engine
-from work_journal.core.db import Base
+from work_journal.core.db import Base, DBManager
 
 
 def create_new_test_engine():
@@ -15,3 +20,67 @@ def get_clean_db():
     engine = create_new_test_engine()
     create_new_test_db(engine)
     return engine
+
+
+def get_clean_file_db(path):
+    # The async engine has its own connections, which only a file can be shared with
+    engine = DBManager(f"sqlite:///{path / 'journal.db'}").engine
+    create_new_test_db(engine)
+    return engine
+
+
+class BlockingRepo:
+    """
+    Drives an async repository from the synchronous tests:  its coroutines are run to
+    completion and its async generators become generators, so the same test cases
+    cover AsyncJournalRepo and AsyncConfigRepo
+    """
+
+    def __init__(self, repo, loop: asyncio.AbstractEventLoop) -> None:
+        self.repo = repo
+        self.loop = loop
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self.repo, name)
+        if inspect.iscoroutinefunction(attribute):
+
+            @functools.wraps(attribute)
+            def run(*args, **kwargs):
+                return self.loop.run_until_complete(attribute(*args, **kwargs))
+
+            return run
+        if inspect.isasyncgenfunction(attribute):
+
+            @functools.wraps(attribute)
+            def iterate(*args, **kwargs):
+                iterator = attribute(*args, **kwargs)
+                try:
+                    while True:
+                        try:
+                            yield self.loop.run_until_complete(iterator.__anext__())
+                        except StopAsyncIteration:
+                            return
+                finally:
+                    self.loop.run_until_complete(iterator.aclose())
+
+            return iterate
+        return attribute
+
+
+@contextmanager
+def blocking(repo_class, engine):
+    """
+    A BlockingRepo for repo_class (AsyncJournalRepo or AsyncConfigRepo), on an async
+    engine for the same database as engine
+    """
+    pytest.importorskip("aiosqlite")
+    manager = DBManager(engine.url.render_as_string(hide_password=False))
+    loop = asyncio.new_event_loop()
+    try:
+        yield BlockingRepo(
+            loop.run_until_complete(repo_class.open(manager.async_engine)), loop
+        )
+    finally:
+        loop.run_until_complete(manager.async_engine.dispose())
+        manager.engine.dispose()
+        loop.close()
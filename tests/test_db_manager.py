@@ -0,0 +1,70 @@
+import threading
+import pytest
+from sqlalchemy import text
+from work_journal.core.db import (
+    Base,
+    DBManager,
+    JournalRepo,
+    PROFILE_BALANCED,
+    PROFILE_SAFE,
+)
+
+
+def pragma(engine, name: str):
+    with engine.connect() as conn:
+        return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_balanced_profile(tmp_path):
+    engine = DBManager(f"sqlite:///{tmp_path / 'journal.db'}", PROFILE_BALANCED).engine
+
+    assert pragma(engine, "journal_mode") == "wal"
+    # NORMAL
+    assert pragma(engine, "synchronous") == 1
+    assert pragma(engine, "temp_store") == 2
+    engine.dispose()
+
+
+def test_safe_profile(tmp_path):
+    engine = DBManager(f"sqlite:///{tmp_path / 'journal.db'}", PROFILE_SAFE).engine
+
+    assert pragma(engine, "journal_mode") == "delete"
+    # FULL
+    assert pragma(engine, "synchronous") == 2
+    engine.dispose()
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        DBManager("sqlite://", "turbo")
+
+
+def test_memory_database_shared_between_threads():
+    engine = DBManager("sqlite://").engine
+    Base.metadata.create_all(engine)
+    repo = JournalRepo(engine)
+
+    thread = threading.Thread(target=repo.create_journal_entry, args=("from a worker",))
+    thread.start()
+    thread.join()
+
+    assert [entry.log for entry in repo.get_last_n_entries(1)] == ["from a worker"]
+
+
+def test_memory_database_used_one_thread_at_a_time():
+    engine = DBManager("sqlite://").engine
+    order = []
+
+    def other():
+        with engine.connect():
+            order.append("other")
+
+    with engine.connect():
+        thread = threading.Thread(target=other)
+        thread.start()
+        # Waits for the connection rather than sharing it
+        thread.join(0.1)
+        order.append("first")
+    thread.join()
+
+    assert order == ["first", "other"]
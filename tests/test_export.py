@@ -0,0 +1,104 @@
+import csv
+import json
+import threading
+from datetime import datetime
+import pytest
+from work_journal.core import export
+from work_journal.core.db import JournalRepo
+from .test_db import get_clean_db
+
+
+@pytest.fixture
+def rows() -> [tuple]:
+    return [
+        (datetime(2023, 8, 21, 9, 30), "Plain entry"),
+        (datetime(2023, 8, 21, 10, 15), 'Commas, "quotes" | pipes'),
+    ]
+
+
+def test_export_csv_quotes(tmp_path, rows):
+    filename = tmp_path / "report.csv"
+
+    export.export(filename, iter(rows), export.EXPORT_CSV)
+
+    with open(filename, newline="") as fh:
+        actual = list(csv.reader(fh))
+    assert actual[0] == ["timestamp", "log_entry"]
+    assert actual[1:] == [[str(ts), log] for (ts, log) in rows]
+
+
+def test_export_md_escapes_pipes(tmp_path, rows):
+    filename = tmp_path / "report.md"
+
+    export.export(filename, iter(rows), export.EXPORT_MARKDOWN)
+
+    lines = filename.read_text().splitlines()
+    assert lines[:3] == [
+        "# Journal Entries",
+        "| Timestamp | Log Entry |",
+        "| --- | --- |",
+    ]
+    assert lines[4] == '|2023-08-21 10:15:00|Commas, "quotes" \\| pipes|'
+
+
+def test_export_jsonl(tmp_path, rows):
+    filename = tmp_path / "report.jsonl"
+
+    export.export(filename, iter(rows), export.EXPORT_JSONL)
+
+    actual = [json.loads(line) for line in filename.read_text().splitlines()]
+    assert actual == [{"timestamp": ts.isoformat(), "log": log} for (ts, log) in rows]
+
+
+def test_export_parquet(tmp_path, rows):
+    pq = pytest.importorskip("pyarrow.parquet")
+    filename = tmp_path / "report.parquet"
+
+    export.export(filename, iter(rows), export.EXPORT_PARQUET)
+
+    table = pq.read_table(filename)
+    assert table.column("log").to_pylist() == [log for (_, log) in rows]
+
+
+def test_export_unknown_format(tmp_path, rows):
+    with pytest.raises(ValueError):
+        export.export(tmp_path / "report.xyz", rows, "xyz")
+
+
+def test_export_from_repo_rows(tmp_path, rows):
+    repo = JournalRepo(get_clean_db())
+    repo.create_journal_entries(rows)
+    filename = tmp_path / "report.csv"
+
+    export.export(
+        filename,
+        repo.iter_rows_for_range(datetime(2023, 8, 21), datetime(2023, 8, 22)),
+        export.EXPORT_CSV,
+    )
+
+    with open(filename, newline="") as fh:
+        assert list(csv.reader(fh))[1:] == [[str(ts), log] for (ts, log) in rows]
+
+
+def test_export_progress(tmp_path, monkeypatch, rows):
+    monkeypatch.setattr(export, "PROGRESS_INTERVAL", 1)
+    reported = []
+
+    actual = export.export(
+        tmp_path / "report.csv", iter(rows), export.EXPORT_CSV, progress=reported.append
+    )
+
+    assert actual == 2
+    assert reported == [1, 2, 2]
+
+
+def test_export_cancel(tmp_path, monkeypatch, rows):
+    monkeypatch.setattr(export, "PROGRESS_INTERVAL", 1)
+    cancel = threading.Event()
+    cancel.set()
+    filename = tmp_path / "report.csv"
+
+    with pytest.raises(export.ExportCancelled):
+        export.export(filename, iter(rows), export.EXPORT_CSV, cancel=cancel)
+    # No partial file left behind
+    assert not filename.exists()
@@ -0,0 +1,95 @@
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, text
+from work_journal.core.db import (
+    AsyncJournalRepo,
+    Base,
+    DBManager,
+    JournalRepo,
+    stats_for,
+)
+from .test_db import blocking, get_clean_file_db
+
+
+def test_operation_stats():
+    db = DBManager("sqlite://")
+    repo = JournalRepo(db.engine)
+    repo.create_journal_entries(f"entry {i}" for i in range(10))
+
+    repo.get_last_n_entries(5)
+    now = datetime.now()
+    rows = list(repo.iter_rows_for_range(now - timedelta(days=1), now))
+
+    operations = db.stats.snapshot()["operations"]
+    last_n = operations["JournalRepo.get_last_n_entries"]
+    assert (last_n["calls"], last_n["rows"]) == (1, 5)
+    assert last_n["queries"] == 1
+    assert last_n["sessions"] == 1
+    assert sum(last_n["histogram"].values()) == 1
+    assert operations["JournalRepo.create_journal_entries"]["rows"] == 10
+    assert operations["JournalRepo.iter_rows_for_range"]["rows"] == len(rows) == 10
+    assert stats_for(db.engine) is db.stats
+
+
+def test_generator_operation_is_only_set_while_it_runs(tmp_path):
+    db = DBManager(f"sqlite:///{tmp_path / 'journal.db'}")
+    repo = JournalRepo(db.engine)
+    repo.create_journal_entries(f"entry {i}" for i in range(10))
+    db.stats.reset()
+
+    now = datetime.now()
+    rows = repo.iter_rows_for_range(now - timedelta(days=1), now)
+    next(rows)
+    # The consumer's own work between rows isn't the generator's
+    with db.engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    rows.close()
+
+    operations = db.stats.snapshot()["operations"]
+    assert operations["other"]["queries"] == 1
+    assert operations["JournalRepo.iter_rows_for_range"]["rows"] == 1
+    assert db.engine.pool.checkedout() == 0
+    db.engine.dispose()
+
+
+def test_async_operation_stats(tmp_path):
+    engine = get_clean_file_db(tmp_path)
+    with blocking(AsyncJournalRepo, engine) as repo:
+        repo.create_journal_entries(f"entry {i}" for i in range(10))
+        repo.get_last_n_entries(5)
+        now = datetime.now()
+        rows = repo.iter_rows_for_range(now - timedelta(days=1), now)
+        next(rows)
+        rows.close()
+        operations = stats_for(repo.engine).snapshot()["operations"]
+
+    last_n = operations["AsyncJournalRepo.get_entries_before"]
+    assert (last_n["calls"], last_n["rows"], last_n["queries"]) == (1, 5, 1)
+    assert operations["AsyncJournalRepo.create_journal_entries"]["rows"] == 10
+    # Charged when the stream is closed, not only once it is exhausted
+    assert operations["AsyncJournalRepo.iter_rows_for_range"]["rows"] == 1
+
+
+def test_slow_query_log(caplog):
+    db = DBManager("sqlite://", slow_query_ms=0)
+    repo = JournalRepo(db.engine)
+    db.stats.reset()
+
+    with caplog.at_level(logging.WARNING, logger="work_journal.sql"):
+        repo.get_last_n_entries(5)
+
+    (slow,) = db.stats.snapshot()["slow_queries"]
+    assert slow["operation"] == "JournalRepo.get_last_n_entries"
+    assert "FROM journal" in slow["statement"]
+    assert "slow query" in caplog.text
+
+
+def test_uninstrumented_engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    repo = JournalRepo(engine)
+
+    repo.create_journal_entry("entry")
+
+    assert stats_for(engine) is None
+    assert len(repo.get_last_n_entries(5)) == 1
@@ -1,9 +1,18 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import pytest
-from work_journal.core.db import Journal, JournalRepo
+from work_journal.core.db import (
+    AsyncJournalRepo,
+    GRANULARITY_DAY,
+    GRANULARITY_MONTH,
+    GRANULARITY_WEEK,
+    Journal,
+    JournalChange,
+    JournalRecord,
+    JournalRepo,
+)
 from sqlalchemy.orm import Session
-from sqlalchemy import select
-from .test_db import get_clean_db
+from sqlalchemy import delete, select, text
+from .test_db import blocking, get_clean_db, get_clean_file_db
 
 
 @pytest.fixture
@@ -16,14 +25,25 @@ def yesterday(today: datetime) -> datetime:
     return today + timedelta(days=-1)
 
 
+@pytest.fixture(params=[JournalRepo, AsyncJournalRepo])
+def repo_class(request):
+    return request.param
+
+
 @pytest.fixture
-def engine():
+def engine(repo_class, tmp_path):
+    if repo_class is AsyncJournalRepo:
+        return get_clean_file_db(tmp_path)
     return get_clean_db()
 
 
 @pytest.fixture
-def repo(engine) -> JournalRepo:
-    return JournalRepo(engine)
+def repo(repo_class, engine) -> JournalRepo:
+    if repo_class is AsyncJournalRepo:
+        with blocking(repo_class, engine) as repo:
+            yield repo
+    else:
+        yield JournalRepo(engine)
 
 
 def test_create(engine, repo):
@@ -100,3 +120,322 @@ def test_get_last_two_week_entries(engine, repo: JournalRepo, today, yesterday):
         assert entry_one in actual
         assert entry_two in actual
         assert entry_three not in actual
+
+
+def test_get_entries_for_range_uses_ts_index(engine, repo: JournalRepo, today):
+    with Session(engine) as session:
+        # Arrange
+        entry_one = Journal(log="one", ts=today + timedelta(hours=-1))
+        entry_two = Journal(log="two", ts=today + timedelta(hours=-2))
+        entry_three = Journal(log="SHOULD NOT SEE", ts=today + timedelta(days=-3))
+
+        session.add_all([entry_one, entry_two, entry_three])
+        session.commit()
+        # Act
+        start = today + timedelta(days=-1)
+        actual = repo.get_entries_for_range(start, today)
+        # The plan of the statement get_entries_for_range actually runs
+        statement = repo._range_statement(start, today, years=[]).compile(
+            dialect=engine.dialect, compile_kwargs={"literal_binds": True}
+        )
+        plan = session.execute(text(f"EXPLAIN QUERY PLAN {statement}")).all()
+        # Assert
+        assert actual == [entry_two, entry_one]
+        assert any("ix_journal_ts" in row.detail for row in plan)
+
+
+def test_ranges_are_half_open(repo: JournalRepo):
+    midnight = datetime(2024, 3, 13)
+    repo.create_journal_entries(
+        [
+            (midnight - timedelta(microseconds=1), "last moment of the 12th"),
+            (midnight, "13th"),
+            (midnight + timedelta(days=1), "14th"),
+        ]
+    )
+    (start, end) = (midnight, midnight + timedelta(days=1))
+
+    assert [entry.log for entry in repo.get_entries_for_range(start, end)] == ["13th"]
+    assert [log for (_, log) in repo.iter_rows_for_range(start, end)] == ["13th"]
+    assert [
+        record.log
+        for record in repo.get_records_for_range(start - timedelta(days=1), start)
+    ] == ["last moment of the 12th"]
+
+
+def test_create_journal_entries(engine, repo: JournalRepo, yesterday):
+    entries = ["one", (yesterday, "two"), "three"]
+
+    actual = repo.create_journal_entries(entries, chunk_size=2, return_ids=True)
+
+    with Session(engine) as session:
+        expected = session.scalars(select(Journal).order_by(Journal.id)).all()
+        assert actual == [entry.id for entry in expected]
+        assert [entry.log for entry in expected] == ["one", "two", "three"]
+        assert expected[1].ts == yesterday
+
+
+def test_create_journal_entries_after_deleting_newest(engine, repo: JournalRepo):
+    old = repo.create_journal_entries(["old 1", "old 2", "old 3"], return_ids=True)
+    with Session(engine) as session:
+        session.execute(delete(Journal).where(Journal.id > old[0]))
+        session.commit()
+
+    actual = repo.create_journal_entries(["new 1", "new 2"], return_ids=True)
+
+    with Session(engine) as session:
+        logs = dict(session.execute(select(Journal.id, Journal.log)).all())
+        assert [logs[entry_id] for entry_id in actual] == ["new 1", "new 2"]
+    assert sorted(found.id for found in repo.search("new")) == actual
+    assert [found.id for found in repo.search("old")] == old[:1]
+
+
+def test_create_journal_entries_returns_count(repo: JournalRepo):
+    actual = repo.create_journal_entries(f"entry {i}" for i in range(25))
+
+    assert actual == 25
+    assert len(repo.get_last_n_entries(100)) == 25
+
+
+def test_iter_entries_for_range(repo: JournalRepo, today, yesterday):
+    last_year = timedelta(days=-365)
+    repo.create_journal_entries(
+        [(yesterday, "one"), (today, "two"), (yesterday + last_year, "SHOULD NOT SEE")]
+    )
+
+    actual = repo.iter_entries_for_range(
+        yesterday, today + timedelta(seconds=1), batch_size=1
+    )
+
+    # A generator, not a list
+    assert iter(actual) is actual
+    assert [entry.log for entry in actual] == ["one", "two"]
+
+
+def test_search(repo: JournalRepo):
+    weak = repo.create_journal_entry("Deployed the release, then reviewed a PR")
+    strong = repo.create_journal_entry("Release notes for the release")
+    repo.create_journal_entry("SHOULD NOT SEE")
+
+    actual = repo.search("release")
+
+    # Ranked by bm25, the entry mentioning release twice comes first
+    assert actual == [strong, weak]
+    # Stemmed, so deploy matches Deployed
+    assert repo.search("deploy") == [weak]
+
+
+def test_search_range_and_limit(repo: JournalRepo, today, yesterday):
+    repo.create_journal_entries([(yesterday, "standup"), (today, "standup")])
+
+    actual = repo.search("standup", start=today + timedelta(seconds=-1))
+
+    assert [entry.ts for entry in actual] == [today]
+    assert len(repo.search("standup", limit=1)) == 1
+
+
+def test_search_punctuated_words(repo: JournalRepo):
+    entry = repo.create_journal_entry("Fixed the foo-bar build for v1.2, don't ask")
+
+    for query in (
+        "foo-bar",
+        "v1.2",
+        "don't",
+        "(foo-bar OR nothing) NOT v1.3",
+        "foo-ba*",
+    ):
+        assert [found.id for found in repo.search(query)] == [entry.id]
+
+
+@pytest.mark.parametrize("query", ['"unbalanced', "foo:bar", "deploy AND", "(release"])
+def test_search_invalid_query(repo: JournalRepo, query):
+    with pytest.raises(ValueError, match="Invalid search"):
+        repo.search(query)
+
+
+def test_search_indexes_bulk_then_single_entries(repo: JournalRepo):
+    bulk = repo.create_journal_entries(["bulk standup", "bulk retro"], return_ids=True)
+    single = repo.create_journal_entry("single standup")
+
+    assert sorted(found.id for found in repo.search("standup")) == [bulk[0], single.id]
+    assert [found.id for found in repo.search("retro")] == [bulk[1]]
+
+
+def test_search_index_follows_updates_and_deletes(engine, repo: JournalRepo):
+    entry = repo.create_journal_entry("typo entry")
+
+    with Session(engine) as session:
+        journal = session.get(Journal, entry.id)
+        journal.log = "fixed entry"
+        session.commit()
+        assert repo.search("typo") == []
+        assert [found.id for found in repo.search("fixed")] == [entry.id]
+
+        session.delete(journal)
+        session.commit()
+        assert repo.search("fixed") == []
+
+
+def test_get_entries_before(repo: JournalRepo):
+    ids = repo.create_journal_entries([f"entry {i}" for i in range(5)], return_ids=True)
+
+    first_page = repo.get_entries_before(None, 2)
+    second_page = repo.get_entries_before(first_page[-1].id, 2)
+    last_page = repo.get_entries_before(second_page[-1].id, 2)
+
+    assert [entry.id for entry in first_page] == [ids[4], ids[3]]
+    assert [entry.id for entry in second_page] == [ids[2], ids[1]]
+    assert [entry.id for entry in last_page] == [ids[0]]
+    assert repo.get_entries_before(ids[0], 2) == []
+
+
+def test_get_records_before(repo: JournalRepo):
+    ids = repo.create_journal_entries([f"entry {i}" for i in range(5)], return_ids=True)
+
+    first_page = repo.get_records_before(None, 2)
+    second_page = repo.get_records_before(first_page[-1].id, 3)
+
+    assert all(isinstance(record, JournalRecord) for record in first_page)
+    assert [record.id for record in first_page] == [ids[4], ids[3]]
+    assert [record.log for record in second_page] == ["entry 2", "entry 1", "entry 0"]
+    assert repo.get_last_n_records(2) == first_page
+
+
+def test_get_records_after(repo: JournalRepo):
+    ids = repo.create_journal_entries([f"entry {i}" for i in range(5)], return_ids=True)
+
+    assert [record.id for record in repo.get_records_after(ids[1], 2)] == ids[2:4]
+    assert [record.log for record in repo.get_records_after(ids[3], 5)] == ["entry 4"]
+    assert repo.get_records_after(ids[4], 5) == []
+
+
+def test_get_records_for_range(repo: JournalRepo, today, yesterday):
+    last_year = timedelta(days=-365)
+    repo.create_journal_entries(
+        [(today, "two"), (yesterday, "one"), (yesterday + last_year, "SHOULD NOT SEE")]
+    )
+
+    end = today + timedelta(seconds=1)
+
+    records = repo.get_records_for_range(yesterday, end)
+
+    assert records == [
+        (entry.id, entry.ts, entry.log)
+        for entry in repo.get_entries_for_range(yesterday, end)
+    ]
+    assert [(record.ts, record.log) for record in records] == [
+        (yesterday, "one"),
+        (today, "two"),
+    ]
+
+
+def test_get_summary(repo: JournalRepo):
+    # Monday 2023-08-14 through Friday 2023-09-01
+    repo.create_journal_entries(
+        [
+            (datetime(2023, 8, 14, 9), "week one"),
+            (datetime(2023, 8, 14, 17), "week one"),
+            (datetime(2023, 8, 20, 12), "week one, sunday"),
+            (datetime(2023, 8, 21, 9), "week two"),
+            (datetime(2023, 9, 1, 9), "september"),
+        ]
+    )
+    start = datetime(2023, 8, 16)
+    end = datetime(2023, 9, 30)
+
+    days = repo.get_summary(GRANULARITY_DAY, start, end)
+    weeks = repo.get_summary(GRANULARITY_WEEK, start, end)
+    months = repo.get_summary(GRANULARITY_MONTH, start, end)
+
+    assert [(day.period_start, day.entry_count) for day in days] == [
+        (date(2023, 8, 20), 1),
+        (date(2023, 8, 21), 1),
+        (date(2023, 9, 1), 1),
+    ]
+    assert [(week.period_start, week.entry_count) for week in weeks] == [
+        (date(2023, 8, 14), 3),
+        (date(2023, 8, 21), 1),
+        (date(2023, 8, 28), 1),
+    ]
+    assert weeks[0].first_ts == datetime(2023, 8, 14, 9)
+    assert weeks[0].last_ts == datetime(2023, 8, 20, 12)
+    assert [(month.period_start, month.entry_count) for month in months] == [
+        (date(2023, 8, 1), 4),
+        (date(2023, 9, 1), 1),
+    ]
+
+
+def test_get_summary_unknown_granularity(repo: JournalRepo, today):
+    with pytest.raises(ValueError):
+        repo.get_summary("fortnight", today, today)
+
+
+def test_change_log(engine, repo: JournalRepo):
+    single = repo.create_journal_entry("single")
+    repo.create_journal_entries(["bulk 1", "bulk 2"])
+
+    with Session(engine) as session:
+        changes = session.scalars(select(JournalChange).order_by(JournalChange.seq))
+        entries = session.scalars(select(Journal).order_by(Journal.id)).all()
+        assert [(change.uuid, change.origin) for change in changes] == [
+            (entry.uuid, None) for entry in entries
+        ]
+    assert single.uuid == entries[0].uuid
+    assert len({entry.uuid for entry in entries}) == 3
+
+
+def test_merge_entries(engine, repo: JournalRepo, today):
+    existing = repo.create_journal_entry("already here")
+    entries = [
+        ("a" * 32, today, "merged deploy"),
+        ("a" * 32, today, "merged deploy"),
+        (existing.uuid, today, "already here"),
+        ("b" * 32, today, "merged review"),
+    ]
+
+    assert repo.merge_entries(entries, origin="peer", chunk_size=2) == 2
+    assert repo.merge_entries(entries, origin="peer") == 0
+
+    assert sorted(entry.log for entry in repo.search("merged")) == [
+        "merged deploy",
+        "merged review",
+    ]
+    assert repo.get_summary(GRANULARITY_DAY, today, today)[0].entry_count == 3
+    with Session(engine) as session:
+        origins = session.execute(
+            select(JournalChange.uuid, JournalChange.origin).order_by(JournalChange.seq)
+        ).all()
+    assert origins == [(existing.uuid, None), ("a" * 32, "peer"), ("b" * 32, "peer")]
+
+
+def test_tags(engine, repo: JournalRepo, today):
+    single = repo.create_journal_entry("deployed #Project-X")
+    repo.create_journal_entries(
+        [
+            (today, "reviewed #project-x for #oncall"),
+            (today, "no tags"),
+            (today, "paged #OnCall"),
+        ],
+        chunk_size=2,
+    )
+    repo.merge_entries([("c" * 32, today, "merged #oncall")], origin="peer")
+    (start, end) = (today - timedelta(days=1), today + timedelta(days=1))
+
+    tagged = repo.get_entries_for_range(start, end, tags=["#project-x"])
+    assert [entry.log for entry in tagged] == [
+        "reviewed #project-x for #oncall",
+        "deployed #Project-X",
+    ]
+    assert tagged[1].id == single.id
+    assert sorted(
+        record.log
+        for record in repo.get_records_for_range(start, end, tags=["ONCALL", "nope"])
+    ) == ["merged #oncall", "paged #OnCall", "reviewed #project-x for #oncall"]
+    assert [log for (_, log) in repo.iter_rows_for_range(start, end, tags=[])] == []
+    assert len(list(repo.iter_entries_for_range(start, end, tags=["oncall"]))) == 3
+
+    assert [tuple(row) for row in repo.get_tag_counts()] == [
+        ("oncall", 3),
+        ("project-x", 2),
+    ]
+    assert repo.get_tag_counts(end, end + timedelta(days=1)) == []
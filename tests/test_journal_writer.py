@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import event
+from work_journal.core.db import BufferedJournalWriter, DBManager, JournalRepo
+from .test_db import create_new_test_db
+
+
+@pytest.fixture
+def engine():
+    # In memory, but one connection shared with the writer's thread like the app's own
+    engine = DBManager("sqlite://").engine
+    create_new_test_db(engine)
+    return engine
+
+
+@pytest.fixture
+def commits(engine) -> [int]:
+    # Counts transactions committed on the engine
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+    return commits
+
+
+@pytest.fixture
+def repo(engine) -> JournalRepo:
+    return JournalRepo(engine)
+
+
+def test_group_commit_on_size(repo: JournalRepo, commits):
+    # A long delay, so only the size threshold can trigger a flush
+    with BufferedJournalWriter(repo, max_entries=10, max_delay=60) as writer:
+        entries = []
+        for burst in range(2):
+            entries.extend(writer.write(f"entry {burst} {i}") for i in range(10))
+            assert writer.sync(timeout=5)
+
+    assert len(commits) == 2
+    assert [entry.id for entry in entries] == sorted(entry.id for entry in entries)
+    assert len(repo.get_last_n_entries(100)) == 20
+
+
+def test_group_commit_on_delay(repo: JournalRepo, commits):
+    with BufferedJournalWriter(repo, max_entries=1000, max_delay=0.05) as writer:
+        entry = writer.write("lonely entry")
+        assert writer.sync(timeout=5)
+
+        assert entry.id is not None
+        assert len(commits) == 1
+
+
+def test_close_flushes(repo: JournalRepo):
+    writer = BufferedJournalWriter(repo, max_entries=1000, max_delay=60)
+    writer.write("must not be lost")
+    writer.close()
+
+    assert [entry.log for entry in repo.get_last_n_entries(1)] == ["must not be lost"]
+    with pytest.raises(RuntimeError):
+        writer.write("too late")
+
+
+def test_on_flush_reports_committed_ids(repo: JournalRepo):
+    flushed = []
+    with BufferedJournalWriter(
+        repo, max_entries=2, max_delay=60, on_flush=lambda *batch: flushed.append(batch)
+    ) as writer:
+        entries = [writer.write(f"entry {i}") for i in range(2)]
+        assert writer.sync(timeout=5)
+        entries.append(writer.write("entry 2"))
+
+    assert [[journal.log for journal in batch] for (batch, _) in flushed] == [
+        ["entry 0", "entry 1"],
+        ["entry 2"],
+    ]
+    assert [new_id for (_, ids) in flushed for new_id in ids] == [
+        entry.id for entry in entries
+    ]
+    assert [entry.id for entry in repo.get_last_n_entries(3)] == [
+        entry.id for entry in reversed(entries)
+    ]
@@ -0,0 +1,134 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine
+from work_journal.core.db import GRANULARITY_WEEK, DBManager, JournalRepo
+
+DAY_BEFORE = datetime(2024, 3, 12, 9)
+DAY = datetime(2024, 3, 13, 9)
+RANGE_BEFORE = (datetime(2024, 3, 12), datetime(2024, 3, 13))
+RANGE = (datetime(2024, 3, 13), datetime(2024, 3, 14))
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def db_url(tmp_path) -> str:
+    return f"sqlite:///{tmp_path / 'journal.db'}"
+
+
+@pytest.fixture
+def repo(db_url):
+    engine = DBManager(db_url).engine
+    repo = JournalRepo(engine, cache_size=4)
+    repo.create_journal_entries([(DAY_BEFORE, "before"), (DAY, "day")])
+    yield repo
+    repo.cache.close()
+    engine.dispose()
+
+
+def counts(repo: JournalRepo) -> tuple:
+    snapshot = repo.cache.snapshot()
+    return (snapshot["hits"], snapshot["misses"])
+
+
+def test_not_cached_by_default():
+    assert JournalRepo(DBManager("sqlite://").engine).cache is None
+
+
+def test_hits_and_misses(repo: JournalRepo):
+    first = repo.get_records_for_range(*RANGE)
+    first.append("changed by the caller")
+
+    assert [record.log for record in repo.get_records_for_range(*RANGE)] == ["day"]
+    assert counts(repo) == (1, 1)
+    assert repo.cache.snapshot()["hit_rate"] == 0.5
+    # Same arguments, however they are passed
+    repo.get_records_for_range(start=RANGE[0], end=RANGE[1], tags=None)
+    assert counts(repo) == (2, 1)
+
+
+def test_write_evicts_only_ranges_containing_it(repo: JournalRepo):
+    repo.get_records_for_range(*RANGE_BEFORE)
+    repo.get_records_for_range(*RANGE)
+    repo.get_summary(GRANULARITY_WEEK, *RANGE)
+
+    repo.create_journal_entries([(datetime(2024, 3, 12, 17), "late")])
+
+    assert [r.log for r in repo.get_records_for_range(*RANGE_BEFORE)] == [
+        "before",
+        "late",
+    ]
+    assert [r.log for r in repo.get_records_for_range(*RANGE)] == ["day"]
+    # Outside the range, but in the same week
+    assert repo.get_summary(GRANULARITY_WEEK, *RANGE)[0].entry_count == 3
+    assert counts(repo) == (1, 5)
+    assert repo.cache.snapshot()["invalidated"] == 2
+
+
+def test_history_pages(repo: JournalRepo):
+    newest = repo.get_records_before(None, 1)
+    older = repo.get_records_before(newest[0].id, 1)
+
+    repo.create_journal_entries([(datetime(2000, 1, 1), "imported")])
+
+    assert repo.get_last_n_records(1)[0].log == "imported"
+    assert repo.get_records_before(newest[0].id, 1) == older
+    assert counts(repo) == (1, 3)
+
+
+def test_other_writers_clear_the_cache(repo: JournalRepo, db_url):
+    repo.get_records_for_range(*RANGE_BEFORE)
+    # A second engine stands in for another process
+    other = create_engine(db_url)
+    JournalRepo(other).create_journal_entries([(DAY, "elsewhere")])
+    other.dispose()
+
+    assert [r.log for r in repo.get_records_for_range(*RANGE)] == ["day", "elsewhere"]
+    repo.get_records_for_range(*RANGE_BEFORE)
+    assert counts(repo) == (0, 3)
+
+
+def test_own_writes_dont_hide_other_writers(repo: JournalRepo, db_url):
+    repo.get_records_for_range(*RANGE_BEFORE)
+    other = create_engine(db_url)
+    JournalRepo(other).create_journal_entries([(DAY_BEFORE, "elsewhere")])
+    other.dispose()
+    # Evicts nothing itself, but must not pass the other write off as ours
+    repo.create_journal_entries([(datetime(2000, 1, 1), "imported")])
+
+    assert [r.log for r in repo.get_records_for_range(*RANGE_BEFORE)] == [
+        "before",
+        "elsewhere",
+    ]
+    assert repo.cache.snapshot()["invalidated"] == 1
+
+
+def test_ttl_and_size(repo: JournalRepo):
+    repo.cache.clock = clock = Clock()
+    repo.get_tag_counts()
+    clock.now = repo.CACHE_TTL - 1
+    repo.get_tag_counts()
+    clock.now = repo.CACHE_TTL
+    repo.get_tag_counts()
+    assert counts(repo) == (1, 2)
+    assert repo.cache.snapshot()["expired"] == 1
+
+    for limit in range(1, 6):
+        repo.search("day", limit=limit)
+    assert repo.cache.snapshot()["entries"] == 4
+    assert repo.cache.snapshot()["evicted"] == 2
+
+
+def test_archive_clears_the_cache(repo: JournalRepo):
+    repo.get_last_n_records(5)
+
+    repo.archive_before(datetime(2024, 3, 13))
+
+    assert [record.log for record in repo.get_last_n_records(5)] == ["day"]
+    assert counts(repo) == (0, 2)
@@ -0,0 +1,111 @@
+import pytest
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+from work_journal.core.db import (
+    SCHEMA_VERSION,
+    ConfigRepo,
+    DBManager,
+    JournalRepo,
+    SchemaOutOfDate,
+    ensure_schema,
+    migrate,
+)
+from work_journal.core.db.schema import MIGRATIONS_DIR
+
+
+def test_ensure_schema_records_version(tmp_path):
+    engine = DBManager(f"sqlite:///{tmp_path / 'journal.db'}").engine
+
+    ensure_schema(engine)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA user_version")).scalar() == SCHEMA_VERSION
+    assert {"journal", "config", "journal_rollup"} <= set(
+        inspect(engine).get_table_names()
+    )
+    engine.dispose()
+
+
+def test_ensure_schema_trusts_version(tmp_path):
+    url = f"sqlite:///{tmp_path / 'journal.db'}"
+    engine = DBManager(url).engine
+    ensure_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE journal_rollup"))
+    engine.dispose()
+
+    # A database already at SCHEMA_VERSION is not inspected again
+    engine = DBManager(url).engine
+    JournalRepo(engine)
+    ConfigRepo(engine)
+    assert "journal_rollup" not in inspect(engine).get_table_names()
+    engine.dispose()
+
+
+def test_ensure_schema_refuses_unmigrated_database(tmp_path):
+    engine = DBManager(f"sqlite:///{tmp_path / 'journal.db'}").engine
+    # The schema before there were any migrations
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE journal (id INTEGER PRIMARY KEY, ts, log)"))
+        conn.execute(text("CREATE TABLE config (id INTEGER PRIMARY KEY, key, value)"))
+
+    with pytest.raises(SchemaOutOfDate, match="journal.uuid.*alembic stamp"):
+        JournalRepo(engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA user_version")).scalar() == 0
+    engine.dispose()
+
+
+def test_ensure_schema_refuses_missing_search_index(tmp_path):
+    url = f"sqlite:///{tmp_path / 'journal.db'}"
+    engine = DBManager(url).engine
+    ensure_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE journal_fts"))
+        conn.execute(text("CREATE TABLE alembic_version (version_num)"))
+        conn.execute(text("PRAGMA user_version = 0"))
+    engine.dispose()
+
+    engine = DBManager(url).engine
+    with pytest.raises(SchemaOutOfDate, match="journal_fts.*`alembic upgrade head`"):
+        JournalRepo(engine)
+    engine.dispose()
+
+
+def test_migrate_unmigrated_database(tmp_path):
+    engine = DBManager(f"sqlite:///{tmp_path / 'journal.db'}").engine
+    with engine.begin() as conn:
+        conn.execute(
+            text("CREATE TABLE journal (id INTEGER PRIMARY KEY, ts DATETIME, log)")
+        )
+        conn.execute(text("CREATE TABLE config (id INTEGER PRIMARY KEY, key, value)"))
+        conn.execute(
+            text("INSERT INTO journal (ts, log) VALUES ('2024-05-01 09:30:00', 'old')")
+        )
+
+    migrate(engine)
+
+    repo = JournalRepo(engine)
+    new = repo.create_journal_entry("new")
+    assert [entry.log for entry in repo.search("old OR new")] == ["old", "new"]
+    assert new.uuid != repo.search("old")[0].uuid
+    engine.dispose()
+
+
+def test_migrate_stamps_database_built_by_create_all(tmp_path):
+    engine = DBManager(f"sqlite:///{tmp_path / 'journal.db'}").engine
+    ensure_schema(engine)
+
+    migrate(engine)
+
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    script = ScriptDirectory.from_config(config)
+    assert len(list(script.walk_revisions())) == SCHEMA_VERSION
+    with engine.connect() as conn:
+        assert MigrationContext.configure(conn).get_current_revision() == (
+            script.get_current_head()
+        )
+    engine.dispose()
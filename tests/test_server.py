@@ -0,0 +1,184 @@
+import http.client
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+from work_journal.core.db import JournalRepo
+from work_journal.server import JournalServer
+from .test_db import get_clean_file_db
+
+
+@pytest.fixture
+def repo(tmp_path) -> JournalRepo:
+    # A file, which the server's threads can each have their own connection to
+    repo = JournalRepo(get_clean_file_db(tmp_path))
+    yield repo
+    repo.engine.dispose()
+
+
+@pytest.fixture
+def server(repo: JournalRepo):
+    server = JournalServer(repo, ("127.0.0.1", 0))
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def client(server: JournalServer):
+    client = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+    yield client
+    client.close()
+
+
+def request(client, method: str, path: str, body=None):
+    """
+    (status, response body), over the same keep-alive connection every time
+    """
+    client.request(method, path, body=None if body is None else json.dumps(body))
+    response = client.getresponse()
+    return (response.status, response.read().decode("utf-8"))
+
+
+def lines(body: str) -> list:
+    return [json.loads(line) for line in body.splitlines()]
+
+
+def test_post_single_and_batch(client, repo: JournalRepo):
+    (status, body) = request(client, "POST", "/entries", {"log": "single"})
+    assert status == 201
+    (single_id,) = json.loads(body)["ids"]
+
+    (status, body) = request(
+        client,
+        "POST",
+        "/entries",
+        [{"log": "one"}, {"log": "two", "timestamp": "2024-03-01T09:00:00"}],
+    )
+    assert status == 201
+    assert json.loads(body)["ids"] == [single_id + 1, single_id + 2]
+
+    entries = repo.get_last_n_entries(10)
+    assert [entry.log for entry in entries] == ["two", "one", "single"]
+    assert entries[0].ts == datetime(2024, 3, 1, 9)
+
+
+def test_concurrent_posts_share_commits(server: JournalServer, repo: JournalRepo):
+    def post(i):
+        client = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+        for j in range(5):
+            assert request(client, "POST", "/entries", {"log": f"{i}.{j}"})[0] == 201
+        client.close()
+
+    threads = [threading.Thread(target=post, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert server.writer.committed == 40
+    assert len(repo.get_last_n_records(100)) == 40
+
+
+def test_get_last_and_before(client, repo: JournalRepo):
+    ids = repo.create_journal_entries([f"entry {i}" for i in range(5)], return_ids=True)
+
+    (status, body) = request(client, "GET", "/entries?last=2")
+    assert status == 200
+    assert [entry["id"] for entry in lines(body)] == [ids[4], ids[3]]
+
+    (_, body) = request(client, "GET", f"/entries?last=10&before={ids[3]}")
+    assert [entry["log"] for entry in lines(body)] == ["entry 2", "entry 1", "entry 0"]
+
+
+def test_get_range_streams(client, repo: JournalRepo, monkeypatch):
+    monkeypatch.setattr("work_journal.server.STREAM_CHUNK_SIZE", 10)
+    today = datetime.now()
+    repo.create_journal_entries(
+        [
+            (today - timedelta(days=400), "SHOULD NOT SEE #oncall"),
+            (today, "paged #oncall"),
+            (today, "quiet day"),
+        ]
+    )
+
+    client.request("GET", "/entries?range=today")
+    response = client.getresponse()
+    assert response.getheader("Transfer-Encoding") == "chunked"
+    assert [entry["log"] for entry in lines(response.read().decode())] == [
+        "paged #oncall",
+        "quiet day",
+    ]
+
+    (_, body) = request(client, "GET", "/entries?range=past-year&tag=oncall")
+    assert [entry["log"] for entry in lines(body)] == ["paged #oncall"]
+    (status, body) = request(client, "GET", "/entries?start=2000-01-01&end=2000-01-31")
+    assert (status, body) == (200, "")
+
+
+def test_search(client, repo: JournalRepo):
+    repo.create_journal_entry("Deployed the release")
+    repo.create_journal_entry("Reviewed a PR")
+
+    (status, body) = request(client, "GET", "/search?q=deploy")
+
+    assert status == 200
+    assert [entry["log"] for entry in lines(body)] == ["Deployed the release"]
+
+
+@pytest.mark.parametrize(
+    "method, path, body, status",
+    [
+        ("POST", "/entries", {"text": "no log"}, 400),
+        ("POST", "/entries", [], 400),
+        ("POST", "/entries", {"log": "x", "timestamp": "yesterday"}, 400),
+        ("GET", "/entries?last=many", None, 400),
+        ("GET", "/entries?last=0", None, 400),
+        ("GET", "/entries?range=fortnight", None, 400),
+        ("GET", "/search", None, 400),
+        ("GET", '/search?q="unbalanced', None, 400),
+        ("GET", "/search?q=deploy&limit=0", None, 400),
+        ("GET", "/search?q=deploy&limit=1001", None, 400),
+        ("GET", "/nowhere", None, 404),
+        ("POST", "/nowhere", {"log": "x"}, 404),
+    ],
+)
+def test_bad_requests(client, method, path, body, status):
+    assert request(client, method, path, body)[0] == status
+    # And the connection is still good for the next request
+    assert request(client, "GET", "/entries?last=1")[0] == 200
+
+
+def test_negative_content_length(client):
+    client.putrequest("POST", "/entries")
+    client.putheader("Content-Length", "-1")
+    client.endheaders()
+
+    assert client.getresponse().status == 400
+
+
+def test_failed_commit_is_accepted_once(client, server, repo, monkeypatch):
+    create = repo.create_journal_entries
+    failing = True
+
+    def flaky(*args, **kwargs):
+        if failing:
+            raise RuntimeError("database is locked")
+        return create(*args, **kwargs)
+
+    monkeypatch.setattr(repo, "create_journal_entries", flaky)
+    (status, body) = request(client, "POST", "/entries", {"log": "only once"})
+    assert (status, json.loads(body)) == (202, {"queued": 1})
+
+    # The writer retries the batch by itself
+    failing = False
+    deadline = time.monotonic() + 5
+    while server.writer.committed < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [entry.log for entry in repo.get_last_n_entries(5)] == ["only once"]
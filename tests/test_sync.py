@@ -0,0 +1,98 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from work_journal.core.db import DBManager, JournalRepo, JournalSync, SyncPeer
+
+
+@pytest.fixture
+def shared(tmp_path):
+    return str(tmp_path / "shared")
+
+
+@pytest.fixture
+def laptop(tmp_path, shared):
+    engine = DBManager(f"sqlite:///{tmp_path / 'laptop.db'}").engine
+    yield JournalSync(JournalRepo(engine), shared)
+    engine.dispose()
+
+
+@pytest.fixture
+def desktop(tmp_path, shared):
+    engine = DBManager(f"sqlite:///{tmp_path / 'desktop.db'}").engine
+    yield JournalSync(JournalRepo(engine), shared)
+    engine.dispose()
+
+
+def logs(node: JournalSync) -> list[str]:
+    return [
+        record.log
+        for record in node.repo.get_records_for_range(datetime.min, datetime.max)
+    ]
+
+
+def test_sync_both_ways(laptop: JournalSync, desktop: JournalSync):
+    laptop.repo.create_journal_entries(
+        [(datetime(2024, 3, 1, 9), "laptop 1"), (datetime(2024, 3, 1, 11), "laptop 2")]
+    )
+    desktop.repo.create_journal_entry("desktop 1")
+
+    assert laptop.sync() == (2, 0)
+    assert desktop.sync() == (1, 2)
+    assert laptop.sync() == (0, 1)
+
+    assert logs(laptop) == logs(desktop) == ["laptop 1", "laptop 2", "desktop 1"]
+    assert laptop.node_id != desktop.node_id
+
+
+def test_only_new_entries_are_exported(laptop: JournalSync, desktop: JournalSync):
+    laptop.repo.create_journal_entry("first")
+    laptop.sync()
+    desktop.sync()
+
+    laptop.repo.create_journal_entry("second")
+
+    assert laptop.export() == 1
+    assert laptop.export() == 0
+    # Entries merged from a peer are not sent back out
+    assert desktop.export() == 0
+    assert desktop.merge() == 1
+    assert logs(desktop) == ["first", "second"]
+
+
+def test_merge_is_idempotent(laptop: JournalSync, desktop: JournalSync):
+    laptop.repo.create_journal_entries(["one", "two"])
+    laptop.sync()
+    desktop.sync()
+
+    # As if the high-water mark had never been saved
+    with Session(desktop.engine) as session:
+        session.execute(delete(SyncPeer))
+        session.commit()
+
+    assert desktop.merge() == 0
+    assert logs(desktop) == ["one", "two"]
+    with Session(desktop.engine) as session:
+        peer = session.scalars(select(SyncPeer)).one()
+    assert peer.node_id == laptop.node_id
+
+
+def test_archived_entries_are_not_merged_again(
+    laptop: JournalSync, desktop: JournalSync
+):
+    laptop.repo.create_journal_entries(
+        [(datetime(2020, 1, 1), "old"), (datetime(2024, 1, 1), "new")]
+    )
+    laptop.sync()
+    desktop.sync()
+    desktop.repo.archive_before(datetime(2023, 1, 1))
+    with Session(desktop.engine) as session:
+        session.execute(delete(SyncPeer))
+        session.commit()
+
+    assert desktop.merge() == 0
+    assert logs(desktop) == ["old", "new"]
+
+
+def test_node_id_is_kept(laptop: JournalSync, shared):
+    assert JournalSync(laptop.repo, shared).node_id == laptop.node_id
@@ -0,0 +1,25 @@
+import pytest
+from work_journal.core.db.tags import extract_tags, normalize_tags
+
+
+@pytest.mark.parametrize(
+    "log, tags",
+    [
+        ("no tags here", set()),
+        ("#Deploy of #project-x", {"deploy", "project-x"}),
+        ("reviewed #oncall, then #ONCALL again", {"oncall"}),
+        ("trailing hyphen #release-", {"release"}),
+        ("ticket #123 and ##double", set()),
+        ("C# and https://example.com/#anchor and &#39;", set()),
+        ("#snake_case_tag.", {"snake_case_tag"}),
+    ],
+)
+def test_extract_tags(log, tags):
+    assert extract_tags(log) == tags
+
+
+def test_normalize_tags():
+    assert normalize_tags(["#Deploy", " deploy ", "oncall", "#", ""]) == [
+        "deploy",
+        "oncall",
+    ]
@@ -0,0 +1,80 @@
+from datetime import date, datetime, timedelta, timezone
+import pytest
+from work_journal.core import timeframes
+from work_journal.core.timeframes import Timeframe
+
+NOW = datetime(2024, 3, 13, 15, 30)  # a Wednesday
+
+
+@pytest.mark.parametrize(
+    "name, start, end",
+    [
+        (timeframes.TIMEFRAME_TODAY, datetime(2024, 3, 13), datetime(2024, 3, 14)),
+        (timeframes.TIMEFRAME_YESTERDAY, datetime(2024, 3, 12), datetime(2024, 3, 13)),
+        (timeframes.TIMEFRAME_WEEK, datetime(2024, 3, 11), datetime(2024, 3, 18)),
+        (timeframes.TIMEFRAME_TWO_WEEKS, datetime(2024, 3, 4), datetime(2024, 3, 18)),
+        (timeframes.TIMEFRAME_MONTH, datetime(2024, 3, 1), datetime(2024, 4, 1)),
+        (timeframes.TIMEFRAME_QUARTER, datetime(2024, 1, 1), datetime(2024, 4, 1)),
+        (timeframes.TIMEFRAME_YEAR, datetime(2024, 1, 1), datetime(2025, 1, 1)),
+        (timeframes.TIMEFRAME_PAST_YEAR, datetime(2023, 3, 14), datetime(2024, 3, 14)),
+    ],
+)
+def test_presets(name, start, end):
+    assert timeframes.preset(name, NOW) == Timeframe(start, end)
+
+
+def test_presets_cross_year_end():
+    december = datetime(2024, 12, 31, 23, 59, 59, 999999)
+
+    assert timeframes.preset(timeframes.TIMEFRAME_MONTH, december).end == datetime(
+        2025, 1, 1
+    )
+    assert timeframes.preset(timeframes.TIMEFRAME_QUARTER, december) == Timeframe(
+        datetime(2024, 10, 1), datetime(2025, 1, 1)
+    )
+
+
+def test_unknown_preset():
+    with pytest.raises(ValueError):
+        timeframes.preset(timeframes.TIMEFRAME_CUSTOM, NOW)
+
+
+def test_half_open():
+    today = timeframes.preset(timeframes.TIMEFRAME_TODAY, NOW)
+    tomorrow = timeframes.preset(timeframes.TIMEFRAME_TODAY, NOW + timedelta(days=1))
+
+    last_moment = datetime(2024, 3, 13, 23, 59, 59, 999999)
+    assert today.contains(last_moment)
+    assert not today.contains(today.end)
+    assert tomorrow.contains(today.end)
+    assert today.end == tomorrow.start
+
+
+def test_aware_now():
+    # Midnight in UTC+14 is still the previous afternoon in UTC
+    kiribati = timezone(timedelta(hours=14))
+    now = datetime(2024, 3, 13, 1, 0, tzinfo=kiribati)
+
+    today = timeframes.preset(timeframes.TIMEFRAME_TODAY, now)
+
+    assert today.start.tzinfo is None
+    expected = datetime(2024, 3, 13, tzinfo=kiribati).astimezone().replace(tzinfo=None)
+    assert today == Timeframe(expected, expected + timedelta(days=1))
+
+
+def test_custom():
+    assert timeframes.custom("2024-03-01", "2024-03-31") == Timeframe(
+        datetime(2024, 3, 1), datetime(2024, 4, 1)
+    )
+    assert timeframes.custom(date(2024, 3, 1), datetime(2024, 3, 2, 12)) == Timeframe(
+        datetime(2024, 3, 1), datetime(2024, 3, 2, 12)
+    )
+    assert timeframes.custom() == Timeframe(datetime.min, datetime.max)
+    with pytest.raises(ValueError):
+        timeframes.custom("2024-03-03", "2024-03-01")
+
+
+def test_custom_ending_on_the_last_day():
+    assert timeframes.custom("2024-03-01", "9999-12-31") == Timeframe(
+        datetime(2024, 3, 1), datetime.max
+    )
@@ -1,18 +1,41 @@
-from work_journal.core.db import ConfigRepo, JournalRepo
-from work_journal.ui.main_window import MainWindow
+import argparse
 from work_journal.core import app_config
+from work_journal.ui.main_window import MainWindow
+
+
+def open_database():
+    """
+    Runs on the background worker once the window is up:  imports the database layer,
+    opens the journal (migrating it if it is out of date) and seeds the config on first
+    run
+    """
+    from work_journal.core.db import ConfigRepo, JournalRepo, SchemaOutOfDate, migrate
 
+    engine = app_config.db.engine
+    try:
+        # The history and reports ask the same questions again and again
+        journal_repo = JournalRepo(engine, cache_size=JournalRepo.CACHE_SIZE)
+    except SchemaOutOfDate:
+        # Nobody running the packaged app has alembic at hand, so migrate here
+        migrate(engine)
+        journal_repo = JournalRepo(engine, cache_size=JournalRepo.CACHE_SIZE)
+    config_repo = ConfigRepo(engine)
+    config_repo.seed_defaults()
+    return (journal_repo, config_repo)
 
-def main():
-    journal_repo = JournalRepo(app_config.db.engine)
-    config_repo = ConfigRepo(app_config.db.engine)
 
-    if "INIT" not in config_repo.config:
-        config_repo.create_config(ConfigRepo.CONFIG_INIT, "True")
-        config_repo.create_config(ConfigRepo.CONFIG_HISTORY_LEN, 5)
-        config_repo.create_config(ConfigRepo.CONFIG_GEOMETRY, "800x220")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Work Journal")
+    parser.add_argument(
+        "--db",
+        help="journal database:  a SQLite file path or a SQLAlchemy URL "
+        f"(defaults to ${app_config.ENV_DB_URL}, then {app_config.DB_FILENAME} in "
+        f"${app_config.ENV_DATA_DIR} or {app_config.data_dir()})",
+    )
+    args = parser.parse_args(argv)
+    app_config.configure(args.db)
 
-    app = MainWindow(journal_repo, config_repo)
+    app = MainWindow(open_database)
     app.mainloop()
 
 
@@ -8,7 +8,8 @@ a = Analysis(
     ['work_journal.py'],
     pathex=['.\\.venv\\Lib\\site-packages\\'],
     binaries=[],
-    datas=[],
+    # The migrations, which the app runs itself (see schema.migrate)
+    datas=[('alembic', 'alembic')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
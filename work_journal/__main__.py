@@ -0,0 +1,4 @@
+import sys
+from work_journal.cli import main
+
+sys.exit(main())
@@ -0,0 +1,259 @@
+"""
+Headless command line interface, for logging from scripts and cron and for producing
+reports without the GUI.
+
+    work_journal add "Fixed the flaky build"
+    git log --format=%s | work_journal add
+    work_journal report --range yesterday --format md > yesterday.md
+    work_journal report --range month --tag oncall > oncall.csv
+    work_journal search "deploy*"
+    work_journal tags --range quarter
+    work_journal archive --older-than 365
+    work_journal sync ~/Dropbox/work_journal
+    work_journal serve --port 8765
+
+Nothing here imports tkinter, and the database layer is only imported once a command
+actually runs, so `work_journal --help` stays quick.
+"""
+import argparse
+import io
+import sys
+from datetime import timedelta
+from work_journal.core import timeframes
+
+# Most search results shown at once, the same bound as the server's MAX_PAGE
+MAX_LIMIT = 1_000
+
+
+def cmd_add(repo, args) -> int:
+    """
+    Logs the entry given on the command line, or every non-blank line of stdin in a
+    single transaction
+    """
+    if args.entry:
+        repo.create_journal_entry(" ".join(args.entry))
+        return 0
+    count = repo.create_journal_entries(
+        line.rstrip("\r\n") for line in sys.stdin if line.strip()
+    )
+    print(f"Added {count} entries", file=sys.stderr)
+    return 0
+
+
+def cmd_report(repo, args) -> int:
+    """
+    Streams a report to stdout
+    """
+    from work_journal.core.export import export_to, get_format
+
+    export_format = get_format(args.format)
+    timeframe = _timeframe(args)
+
+    rows = repo.iter_rows_for_range(*timeframe, tags=args.tag)
+    if export_format.binary:
+        export_to(sys.stdout.buffer, rows, args.format)
+        sys.stdout.buffer.flush()
+        return 0
+    # Our own wrapper, so the writers control newlines (csv needs newline="")
+    stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", newline="")
+    try:
+        export_to(stdout, rows, args.format)
+        stdout.flush()
+    finally:
+        stdout.detach()
+    return 0
+
+
+def cmd_search(repo, args) -> int:
+    """
+    Full text search, best matches first
+    """
+    (start, end) = timeframes.custom(args.start, args.end)
+    limit = repo.SEARCH_LIMIT if args.limit is None else args.limit
+    for entry in repo.search(args.query, start=start, end=end, limit=limit):
+        print(f"{entry.ts.strftime('%Y-%m-%d %H:%M')}: {entry.log}")
+    return 0
+
+
+def cmd_tags(repo, args) -> int:
+    """
+    Lists the tags in use, most used first, with how many entries carry each
+    """
+    if args.range or args.start or args.end:
+        timeframe = _timeframe(args)
+        tag_counts = repo.get_tag_counts(*timeframe)
+    else:
+        tag_counts = repo.get_tag_counts()
+    for tag, count in tag_counts:
+        print(f"{count:>8}  #{tag}")
+    return 0
+
+
+def cmd_archive(repo, args) -> int:
+    """
+    Moves entries older than the given number of days into the yearly archive files
+    """
+    today = timeframes.preset(timeframes.TIMEFRAME_TODAY)
+    cutoff = today.start - timedelta(days=args.older_than)
+    moved = repo.archive_before(cutoff)
+    print(f"Archived {moved} entries to {repo.archive_dir}", file=sys.stderr)
+    return 0
+
+
+def cmd_sync(repo, args) -> int:
+    """
+    Swaps new entries with the journals on other machines through a shared directory
+    """
+    from work_journal.core.db import JournalSync
+
+    (sent, merged) = JournalSync(repo, args.directory).sync()
+    print(f"Sent {sent} entries, merged {merged}", file=sys.stderr)
+    return 0
+
+
+def cmd_serve(repo, args) -> int:
+    """
+    Serves the journal over HTTP until interrupted, see work_journal.server
+    """
+    from work_journal.server import serve
+
+    serve(
+        repo,
+        args.host,
+        args.port,
+        ready=lambda server: print(
+            f"Listening on {server.url}", file=sys.stderr, flush=True
+        ),
+    )
+    return 0
+
+
+def _timeframe(args) -> timeframes.Timeframe:
+    """
+    The timeframe given by --start/--end, or else by --range
+    """
+    if args.start or args.end:
+        return timeframes.custom(args.start, args.end)
+    return timeframes.preset(args.range or timeframes.TIMEFRAME_TODAY)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from work_journal.core.export import EXPORT_CSV, WRITERS
+
+    parser = argparse.ArgumentParser(
+        prog="work_journal", description="Work Journal, without the GUI"
+    )
+    parser.add_argument(
+        "--db", help="journal database:  a SQLite file path or a SQLAlchemy URL"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser(
+        "add", help="log an entry, or one entry per line of stdin"
+    )
+    add.add_argument("entry", nargs="*", help="the entry, read from stdin if left out")
+    add.set_defaults(handler=cmd_add)
+
+    report = commands.add_parser("report", help="write a report to stdout")
+    report.add_argument(
+        "--range", choices=list(timeframes.PRESETS), default=timeframes.TIMEFRAME_TODAY
+    )
+    report.add_argument("--start", help="ISO date or datetime, overrides --range")
+    report.add_argument(
+        "--end",
+        help="ISO date (included) or datetime (excluded), overrides --range",
+    )
+    report.add_argument(
+        "--tag",
+        action="append",
+        help="only entries with this tag, may be given more than once",
+    )
+    report.add_argument("--format", choices=sorted(WRITERS), default=EXPORT_CSV)
+    report.set_defaults(handler=cmd_report)
+
+    search = commands.add_parser("search", help="full text search")
+    search.add_argument("query", help="FTS5 query, e.g. 'deploy*' or 'bug NOT flaky'")
+    search.add_argument("--start", help="ISO date or datetime")
+    search.add_argument("--end", help="ISO date (included) or datetime (excluded)")
+    search.add_argument(
+        "--limit",
+        type=_limit,
+        help=f"most results to show, up to {MAX_LIMIT} (default 50)",
+    )
+    search.set_defaults(handler=cmd_search)
+
+    tags = commands.add_parser("tags", help="list the tags in use, most used first")
+    tags.add_argument("--range", choices=list(timeframes.PRESETS))
+    tags.add_argument("--start", help="ISO date or datetime, overrides --range")
+    tags.add_argument(
+        "--end",
+        help="ISO date (included) or datetime (excluded), overrides --range",
+    )
+    tags.set_defaults(handler=cmd_tags)
+
+    archive = commands.add_parser(
+        "archive", help="move old entries out of the journal into yearly archive files"
+    )
+    archive.add_argument(
+        "--older-than",
+        type=int,
+        default=365,
+        metavar="DAYS",
+        help="archive entries older than this many days (default 365)",
+    )
+    archive.set_defaults(handler=cmd_archive)
+
+    sync = commands.add_parser(
+        "sync", help="swap new entries with other machines through a shared directory"
+    )
+    sync.add_argument("directory", help="directory shared by all the machines")
+    sync.set_defaults(handler=cmd_sync)
+
+    serve = commands.add_parser(
+        "serve", help="log and query entries over HTTP/JSON, e.g. from git hooks"
+    )
+    serve.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="address to listen on (default 127.0.0.1, there is no authentication)",
+    )
+    serve.add_argument(
+        "--port", type=int, default=8765, help="port to listen on, 0 for any free one"
+    )
+    serve.set_defaults(handler=cmd_serve)
+    return parser
+
+
+def _limit(value: str) -> int:
+    """
+    argparse type of search --limit:  a whole number from 1 to MAX_LIMIT
+    """
+    limit = int(value)
+    if not 0 < limit <= MAX_LIMIT:
+        raise argparse.ArgumentTypeError(f"must be between 1 and {MAX_LIMIT}")
+    return limit
+
+
+def main(argv=None) -> int:
+    """
+    Runs the command in argv, returning the exit status:  2 for a usage error, including
+    an invalid search query or date, or a database that needs migrating
+    """
+    args = build_parser().parse_args(argv)
+
+    from sqlalchemy.exc import OperationalError
+    from work_journal.core import app_config
+    from work_journal.core.db import JournalRepo, SchemaOutOfDate
+
+    app_config.configure(args.db)
+    try:
+        repo = JournalRepo(app_config.db.engine)
+        return args.handler(repo, args)
+    except (ValueError, OperationalError, SchemaOutOfDate) as error:
+        # An OperationalError's own message repeats the SQL, the driver's is enough
+        print(f"error: {getattr(error, 'orig', error)}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
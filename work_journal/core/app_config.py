@@ -1,13 +1,105 @@
+"""
+Application wide configuration.  Nothing here touches the disk or builds an engine until
+the database is first asked for, so importing this module is free.
+
+Where the journal lives, first match wins:
+1. the --db argument of work_journal.py, handed to configure()
+2. the WORK_JOURNAL_DB_URL environment variable
+3. work_journal.db in the directory named by WORK_JOURNAL_DATA_DIR
+4. work_journal.db in the platform data directory:  c:\\data on Windows, where the
+   journal has always lived, otherwise $XDG_DATA_HOME/work_journal (by default
+   ~/.local/share/work_journal)
+
+1 and 2 take either a SQLAlchemy URL, e.g. postgresql://user@host/journal or sqlite://
+for a throwaway in-memory journal, or the path of a SQLite file.
+"""
 import os
-from .db import DBManager
+from typing import Optional
+
+ENV_DB_URL = "WORK_JOURNAL_DB_URL"
+ENV_DATA_DIR = "WORK_JOURNAL_DATA_DIR"
+
+WINDOWS_DATA_DIR = r"c:\data"
+DB_FILENAME = "work_journal.db"
+
+# Set from the command line, overrides the environment
+_database: Optional[str] = None
+
+
+def configure(database: Optional[str]) -> None:
+    """
+    Points the app at a database before it is first opened
+    database:  SQLAlchemy URL or SQLite file path, None to go back to the defaults
+    """
+    global _database
+    _database = database
+
+
+def data_dir() -> str:
+    """
+    Directory for the default SQLite journal
+    """
+    if os.environ.get(ENV_DATA_DIR):
+        return os.environ[ENV_DATA_DIR]
+    if os.name == "nt":
+        return WINDOWS_DATA_DIR
+    xdg_data_home = os.environ.get("XDG_DATA_HOME") or os.path.join(
+        os.path.expanduser("~"), ".local", "share"
+    )
+    return os.path.join(xdg_data_home, "work_journal")
+
+
+def to_url(database: str) -> str:
+    """
+    A SQLAlchemy URL is returned as is, anything else is taken as a SQLite file path
+    """
+    if "://" in database:
+        return database
+    if database == ":memory:":
+        return "sqlite://"
+    return f"sqlite:///{os.path.abspath(os.path.expanduser(database))}"
+
+
+def database_url() -> str:
+    """
+    URL of the configured journal database, see the module docstring
+    """
+    database = _database or os.environ.get(ENV_DB_URL)
+    if database:
+        return to_url(database)
+    return to_url(os.path.join(data_dir(), DB_FILENAME))
+
+
+def get_db(database: Optional[str] = None):
+    """
+    The DBManager for a journal, from the DBManager registry so that asking twice gives
+    the same engine.  Creates the directory of a SQLite file if need be.
+    database:  SQLAlchemy URL or SQLite file path, defaults to the configured journal
+    """
+    from .db import DBManager
+
+    url = to_url(database) if database else database_url()
+    make_sqlite_dir(url)
+    return DBManager.get(url)
+
 
-DATA_DIR = r"c:\data"
+def make_sqlite_dir(url: str) -> None:
+    """
+    Creates the directory a SQLite file URL points into, if it is missing
+    """
+    from sqlalchemy.engine import make_url
 
-DIALECT = "sqlite"
-HOST = ""
-PATH = DATA_DIR + r"\work_journal.db"
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database not in (
+        None,
+        "",
+        ":memory:",
+    ):
+        os.makedirs(os.path.dirname(parsed.database), exist_ok=True)
 
-if not os.path.exists(DATA_DIR):
-    os.mkdir(DATA_DIR)
 
-db = DBManager(f"{DIALECT}://{HOST}/{PATH}")
+def __getattr__(name):
+    # app_config.db keeps working, but is only built when someone reads it
+    if name == "db":
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,4 +1,29 @@
-from .db_manager import DBManager
-from .entities import Base, Journal, Config
+from .instrumentation import QueryStats, instrumented, stats_for
+from .db_manager import (
+    DBManager,
+    PROFILES,
+    PROFILE_SAFE,
+    PROFILE_BALANCED,
+    PROFILE_BULK,
+)
+from .entities import (
+    Base,
+    Journal,
+    JournalRecord,
+    JournalTag,
+    JournalRollup,
+    JournalArchive,
+    JournalChange,
+    SyncPeer,
+    Config,
+)
+from .rollup import GRANULARITY_DAY, GRANULARITY_WEEK, GRANULARITY_MONTH
+from .schema import SCHEMA_VERSION, SchemaOutOfDate, ensure_schema, migrate
 from .journal_repo import JournalRepo
 from .config_repo import ConfigRepo
+from .async_journal_repo import AsyncJournalRepo
+from .async_config_repo import AsyncConfigRepo
+from .change_monitor import ChangeMonitor
+from .result_cache import ResultCache
+from .journal_writer import BufferedJournalWriter
+from .sync import JournalSync
@@ -0,0 +1,131 @@
+"""
+This module holds the plumbing for the journal archive:  old entries moved out of the
+journal table into one SQLite file per year, so that the hot table (and its indexes)
+only holds recent history.  See JournalRepo.archive_before.
+
+An archive file is a plain SQLite database with a single journal(id, ts, log) table,
+indexed on ts.  Files are only ATTACHed to a connection for the duration of a query
+that actually reaches into their year, which journal_archive in the main database
+records, and are DETACHed again before the connection goes back to the pool.
+
+SQLite only lets MAX_ATTACHED databases be attached to a connection at once, so a
+range reaching into more years than that is read in consecutive windows, see
+year_batches.
+"""
+import os
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+from functools import lru_cache
+from typing import AsyncIterator, Iterable, Iterator, Tuple
+from sqlalchemy import Column, Connection, DateTime, Integer, MetaData, String, Table
+
+ARCHIVE_FILE = "journal_{year}.db"
+ARCHIVE_SCHEMA = "archive_{year}"
+# SQLite's default SQLITE_MAX_ATTACHED
+MAX_ATTACHED = 10
+
+
+@lru_cache(maxsize=None)
+def archive_table(year: int) -> Table:
+    """
+    The journal table of the archive for year, as seen through its ATTACH schema
+    """
+    return Table(
+        "journal",
+        MetaData(),
+        Column("id", Integer, primary_key=True, autoincrement=False),
+        Column("ts", DateTime, nullable=False, index=True),
+        Column("log", String, nullable=False),
+        schema=ARCHIVE_SCHEMA.format(year=year),
+    )
+
+
+def archive_path(directory: str, year: int) -> str:
+    return os.path.join(directory, ARCHIVE_FILE.format(year=year))
+
+
+def year_batches(
+    start: datetime, end: datetime, years: Iterable[int]
+) -> Iterator[Tuple[datetime, datetime, list[int]]]:
+    """
+    Splits the range start..end into consecutive windows, as (start, end, years), each
+    reaching into at most MAX_ATTACHED of the archived years.  An archive only holds
+    its own year's entries, so reading the windows one after the other, each from the
+    journal table plus its years, still returns the whole range in order.
+    years:  the archived years overlapping the range, in order
+    """
+    years = list(years)
+    for i in range(0, max(len(years), 1), MAX_ATTACHED):
+        batch = years[i : i + MAX_ATTACHED]
+        if i + MAX_ATTACHED < len(years):
+            batch_end = datetime(years[i + MAX_ATTACHED], 1, 1)
+        else:
+            batch_end = end
+        yield (start, batch_end, batch)
+        start = batch_end
+
+
+def _check_years(years: list[int]) -> None:
+    if len(years) > MAX_ATTACHED:
+        raise ValueError(
+            f"Can't attach more than {MAX_ATTACHED} archives at once, see year_batches"
+        )
+
+
+@contextmanager
+def attached(conn: Connection, directory: str, years: Iterable[int]) -> Iterator[None]:
+    """
+    ATTACHes the archives for years (at most MAX_ATTACHED) to conn for the duration of
+    the block.  SQLite refuses to ATTACH or DETACH inside a transaction, so whatever
+    conn has open is ended on the way in and out:  call this before writing anything.
+    """
+    years = list(years)
+    if not years:
+        yield
+        return
+    _check_years(years)
+    conn.commit()
+    schemas = []
+    try:
+        for year in years:
+            schema = ARCHIVE_SCHEMA.format(year=year)
+            conn.exec_driver_sql(
+                f"ATTACH DATABASE ? AS {schema}", (archive_path(directory, year),)
+            )
+            schemas.append(schema)
+        yield
+    finally:
+        # Also when an ATTACH failed, so the pooled connection doesn't keep the others
+        conn.rollback()
+        for schema in schemas:
+            conn.exec_driver_sql(f"DETACH DATABASE {schema}")
+        conn.commit()
+
+
+@asynccontextmanager
+async def attached_async(
+    conn, directory: str, years: Iterable[int]
+) -> AsyncIterator[None]:
+    """
+    attached for an AsyncConnection
+    """
+    years = list(years)
+    if not years:
+        yield
+        return
+    _check_years(years)
+    await conn.commit()
+    schemas = []
+    try:
+        for year in years:
+            schema = ARCHIVE_SCHEMA.format(year=year)
+            await conn.exec_driver_sql(
+                f"ATTACH DATABASE ? AS {schema}", (archive_path(directory, year),)
+            )
+            schemas.append(schema)
+        yield
+    finally:
+        await conn.rollback()
+        for schema in schemas:
+            await conn.exec_driver_sql(f"DETACH DATABASE {schema}")
+        await conn.commit()
@@ -0,0 +1,81 @@
+from typing import Any, Mapping
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from . import Config
+from .config_repo import ConfigRepoBase
+from .instrumentation import instrumented
+from .schema import ensure_schema_async
+
+
+class AsyncConfigRepo(ConfigRepoBase):
+    """
+    Config Repository for asyncio, see ConfigRepo for what each method does.  Build one
+    with open(), which fills the cache, so get() stays a plain method.
+    """
+
+    @classmethod
+    async def open(cls, engine: AsyncEngine) -> "AsyncConfigRepo":
+        await ensure_schema_async(engine)
+        repo = cls(engine)
+        for config in await repo.retrieve_all():
+            repo.config[config.key] = repo._load(config.key, config.value)
+        return repo
+
+    @instrumented
+    async def create_config(self, key: str, value: Any) -> Config:
+        result = Config(key=key, value=self._dump(value))
+        async with AsyncSession(self.engine, expire_on_commit=False) as session:
+            session.add(result)
+            await session.commit()
+        self.config[key] = self._load(key, result.value)
+        return result
+
+    @instrumented
+    async def retrieve_all(self) -> [Config]:
+        async with AsyncSession(self.engine) as session:
+            return (await session.scalars(select(Config))).all()
+
+    @instrumented
+    async def retrieve_by_key(self, key: str):
+        async with AsyncSession(self.engine) as session:
+            return await session.scalar(select(Config).filter(Config.key == key))
+
+    @instrumented
+    async def update(self, key: str, value: Any) -> Config:
+        async with AsyncSession(self.engine, expire_on_commit=False) as session:
+            config = await session.scalar(self._update_statement(key, value))
+            if config is None:
+                raise KeyError(f"{key} not found.")
+            await session.commit()
+        self.config[key] = self._load(key, config.value)
+        return config
+
+    async def set(self, key: str, value: Any) -> None:
+        await self.set_many({key: value})
+
+    @instrumented
+    async def set_many(self, values: Mapping[str, Any]) -> None:
+        if not values:
+            return
+        rows = [
+            {"key": key, "value": self._dump(value)} for (key, value) in values.items()
+        ]
+        async with AsyncSession(self.engine) as session:
+            await session.run_sync(self._set_rows, rows)
+            await session.commit()
+        for row in rows:
+            self.config[row["key"]] = self._load(row["key"], row["value"])
+
+    async def seed_defaults(self) -> None:
+        await self.set_many(self._missing_defaults())
+
+    @instrumented
+    async def delete(self, key: str) -> Config:
+        statement = delete(Config).where(Config.key == key).returning(Config)
+        async with AsyncSession(self.engine, expire_on_commit=False) as session:
+            config = await session.scalar(statement)
+            if config is None:
+                raise KeyError(f"{key} not found.")
+            await session.commit()
+        self.config.pop(key, None)
+        return config
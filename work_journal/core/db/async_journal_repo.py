@@ -0,0 +1,268 @@
+"""
+This module holds AsyncJournalRepo, JournalRepo for asyncio programs (a chat bot, a
+local daemon) that can't have the event loop wait on the database.
+
+It runs the same statements as JournalRepo, on an AsyncEngine (DBManager.async_engine),
+and has the same methods as coroutines, apart from the range iterators, which are async
+generators streaming through AsyncSession.stream.  Writes made of several steps on one
+connection (tags, search index, rollups, archiving) reuse JournalRepo's own steps
+through run_sync, so both write exactly the same rows.  There is no result cache.
+
+    repo = await AsyncJournalRepo.open(DBManager.get(url).async_engine)
+    await repo.create_journal_entry("Deployed the release")
+    async for entry in repo.iter_entries_for_range(start, end):
+        ...
+"""
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Optional, Union
+from sqlalchemy import Row
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from work_journal.core import timeframes
+from . import Journal, JournalRecord, JournalRollup
+from . import fts
+from .archive import attached_async
+from .instrumentation import instrumented
+from .journal_repo import (
+    BulkEntry,
+    JournalRepoBase,
+    MergeEntry,
+    _bulk_rows,
+    _chunks,
+    _records,
+)
+from .schema import ensure_schema_async
+
+
+class AsyncJournalRepo(JournalRepoBase):
+    """
+    Journal Repository for asyncio, see JournalRepo for what each method does.  Build
+    one with open().
+    """
+
+    @classmethod
+    async def open(
+        cls, engine: AsyncEngine, archive_dir: Optional[str] = None
+    ) -> "AsyncJournalRepo":
+        """
+        A repo for the journal behind engine, once its schema is in place
+        engine:  AsyncEngine for the journal database
+        archive_dir:  as for JournalRepo
+        """
+        await ensure_schema_async(engine)
+        return cls(engine, archive_dir)
+
+    @instrumented
+    async def create_journal_entry(self, entry: str) -> Journal:
+        async with AsyncSession(self.engine, expire_on_commit=False) as session:
+            journal = await session.run_sync(self._add_entry, entry)
+            await session.commit()
+        return journal
+
+    @instrumented
+    async def create_journal_entries(
+        self,
+        entries: Iterable[BulkEntry],
+        chunk_size: int = JournalRepoBase.BULK_CHUNK_SIZE,
+        return_ids: bool = False,
+    ) -> Union[int, list[int]]:
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        ids = []
+        count = 0
+        for chunk in _chunks(_bulk_rows(entries), chunk_size):
+            async with self.engine.begin() as conn:
+                chunk_ids = await conn.run_sync(self._write_chunk, chunk)
+            if return_ids:
+                ids.extend(chunk_ids)
+            count += len(chunk)
+        return ids if return_ids else count
+
+    @instrumented
+    async def merge_entries(
+        self,
+        entries: Iterable[MergeEntry],
+        origin: str,
+        chunk_size: int = JournalRepoBase.BULK_CHUNK_SIZE,
+    ) -> int:
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        merged = 0
+        for chunk in _chunks(entries, chunk_size):
+            async with self.engine.begin() as conn:
+                merged += len(await conn.run_sync(self._merge_chunk, chunk, origin))
+        return merged
+
+    @instrumented
+    async def get_last_n_entries(self, number_to_retrieve: int) -> [Journal]:
+        return await self.get_entries_before(None, number_to_retrieve)
+
+    @instrumented
+    async def get_entries_before(
+        self, before_id: Optional[int], number_to_retrieve: int
+    ) -> [Journal]:
+        statement = self._page_statement([Journal], before_id, number_to_retrieve)
+        async with AsyncSession(self.engine) as session:
+            return (await session.scalars(statement)).all()
+
+    @instrumented
+    async def get_last_n_records(self, number_to_retrieve: int) -> [JournalRecord]:
+        return await self.get_records_before(None, number_to_retrieve)
+
+    @instrumented
+    async def get_records_before(
+        self, before_id: Optional[int], number_to_retrieve: int
+    ) -> [JournalRecord]:
+        statement = self._page_statement(
+            [Journal.id, Journal.ts, Journal.log], before_id, number_to_retrieve
+        )
+        async with self.engine.connect() as conn:
+            return _records(await conn.execute(statement))
+
+    @instrumented
+    async def get_records_after(
+        self, after_id: int, number_to_retrieve: int
+    ) -> [JournalRecord]:
+        statement = self._newer_page_statement(
+            [Journal.id, Journal.ts, Journal.log], after_id, number_to_retrieve
+        )
+        async with self.engine.connect() as conn:
+            return _records(await conn.execute(statement))
+
+    @instrumented
+    async def get_entries_for_range(
+        self, start, end, tags: Optional[Iterable[str]] = None
+    ) -> [Journal]:
+        entries = []
+        async with self.engine.connect() as conn:
+            batches = await conn.run_sync(self._archive_batches, start, end)
+            for since, until, years in batches:
+                statement = self._entries_statement(since, until, years, tags)
+                async with attached_async(conn, self.archive_dir, years):
+                    async with AsyncSession(bind=conn) as session:
+                        entries.extend(await session.scalars(statement))
+        return entries
+
+    @instrumented
+    async def get_records_for_range(
+        self, start, end, tags: Optional[Iterable[str]] = None
+    ) -> [JournalRecord]:
+        records = []
+        async with self.engine.connect() as conn:
+            batches = await conn.run_sync(self._archive_batches, start, end)
+            for since, until, years in batches:
+                statement = self._range_statement(since, until, years, tags=tags)
+                async with attached_async(conn, self.archive_dir, years):
+                    records.extend(_records(await conn.execute(statement)))
+        return records
+
+    @instrumented
+    async def iter_entries_for_range(
+        self,
+        start,
+        end,
+        batch_size: int = JournalRepoBase.STREAM_BATCH_SIZE,
+        tags: Optional[Iterable[str]] = None,
+    ) -> AsyncIterator[Journal]:
+        """
+        Streams Journal entries batch_size rows at a time.  The connection stays open
+        until the generator is exhausted or closed (aclose()).
+        """
+        async with self.engine.connect() as conn:
+            batches = await conn.run_sync(self._archive_batches, start, end)
+            for since, until, years in batches:
+                statement = self._entries_statement(since, until, years, tags)
+                async with attached_async(conn, self.archive_dir, years):
+                    async with AsyncSession(bind=conn) as session:
+                        result = await session.stream_scalars(
+                            statement, execution_options={"yield_per": batch_size}
+                        )
+                        try:
+                            async for entry in result:
+                                yield entry
+                        finally:
+                            # Archives can't be detached while a cursor is still open
+                            await result.close()
+
+    @instrumented
+    async def iter_rows_for_range(
+        self,
+        start,
+        end,
+        batch_size: int = JournalRepoBase.STREAM_BATCH_SIZE,
+        tags: Optional[Iterable[str]] = None,
+    ) -> AsyncIterator[Row]:
+        """
+        Streams Core (ts, log) rows batch_size at a time
+        """
+        async with self.engine.connect() as conn:
+            batches = await conn.run_sync(self._archive_batches, start, end)
+            for since, until, years in batches:
+                statement = self._range_statement(
+                    since, until, years, ("ts", "log"), tags
+                )
+                async with attached_async(conn, self.archive_dir, years):
+                    async with AsyncSession(bind=conn) as session:
+                        result = await session.stream(
+                            statement, execution_options={"yield_per": batch_size}
+                        )
+                        try:
+                            async for row in result:
+                                yield row
+                        finally:
+                            await result.close()
+
+    @instrumented
+    async def archive_before(self, cutoff: datetime) -> int:
+        async with self.engine.connect() as conn:
+            return await conn.run_sync(self._archive, cutoff)
+
+    @instrumented
+    async def search(
+        self,
+        query: str,
+        start=None,
+        end=None,
+        limit: int = JournalRepoBase.SEARCH_LIMIT,
+    ) -> [Journal]:
+        try:
+            async with AsyncSession(self.engine) as session:
+                return (
+                    await session.scalars(
+                        self._search_statement(query, start, end, limit)
+                    )
+                ).all()
+        except OperationalError as error:
+            if fts.is_query_error(error):
+                raise ValueError(f"Invalid search {query!r}: {error.orig}") from None
+            raise
+
+    @instrumented
+    async def get_tag_counts(self, start=None, end=None) -> [Row]:
+        async with self.engine.connect() as conn:
+            return await conn.run_sync(self._tag_counts, start, end)
+
+    @instrumented
+    async def get_summary(self, granularity: str, start, end) -> [JournalRollup]:
+        async with AsyncSession(self.engine) as session:
+            return (
+                await session.scalars(self._summary_statement(granularity, start, end))
+            ).all()
+
+    @instrumented
+    async def get_today_entries(self) -> [Journal]:
+        return await self.get_entries_for_range(
+            *timeframes.preset(timeframes.TIMEFRAME_TODAY)
+        )
+
+    @instrumented
+    async def get_yesterday_entries(self) -> [Journal]:
+        return await self.get_entries_for_range(
+            *timeframes.preset(timeframes.TIMEFRAME_YESTERDAY)
+        )
+
+    @instrumented
+    async def get_last_two_week_entries(self) -> [Journal]:
+        return await self.get_entries_for_range(
+            *timeframes.preset(timeframes.TIMEFRAME_TWO_WEEKS)
+        )
@@ -0,0 +1,108 @@
+"""
+This module lets long lived views of the journal tell when their data has gone stale
+without re-running their queries.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+from sqlalchemy import Connection, Engine
+
+
+class ChangeMonitor:
+    """
+    Watches a SQLite database for commits made by other connections, using
+    PRAGMA data_version.  The value only changes when some *other* connection commits,
+    so the monitor keeps one dedicated connection of its own for as long as it lives.
+    Other pooled connections of the same engine count as "other" too:  to write without
+    the write being reported, write inside writing(), on the monitor's own connection.
+    (Calling mark_seen() after writing elsewhere would also swallow whatever anybody
+    else committed in between.)
+
+    Thread safe.  Only a SQLite file can be written by anyone else; on other databases
+    there is no cheap equivalent, so has_changed() is always False.
+    """
+
+    def __init__(self, engine: Engine) -> None:
+        """
+        engine:  The engine of the database to watch
+        """
+        self.engine = engine
+        self.connection = None
+        self.version = None
+        # How many changes have been seen, see changes(), and how many of those
+        # has_changed() has reported
+        self.count = 0
+        self.seen = 0
+        # The connection is used from whichever thread polls or writes
+        self.lock = threading.RLock()
+        # On an in-memory database the monitor would share the one connection with
+        # everybody
+        if engine.dialect.name == "sqlite" and engine.url.database not in (
+            None,
+            "",
+            ":memory:",
+        ):
+            self.connection = engine.connect()
+            self.version = self._read_version()
+
+    def _read_version(self) -> int:
+        version = self.connection.exec_driver_sql("PRAGMA data_version").scalar()
+        # Don't sit in a transaction between polls
+        self.connection.rollback()
+        return version
+
+    def changes(self) -> int:
+        """
+        How many times commits by other connections have been seen so far.  Callers
+        keep the last count and compare, so any number of them can share the monitor.
+        """
+        with self.lock:
+            if self.connection is not None:
+                version = self._read_version()
+                if version != self.version:
+                    self.version = version
+                    self.count += 1
+            return self.count
+
+    def has_changed(self) -> bool:
+        """
+        True if the database has been written to by another connection since the last
+        call to has_changed or mark_seen
+        """
+        with self.lock:
+            count = self.changes()
+            changed = count != self.seen
+            self.seen = count
+            return changed
+
+    def mark_seen(self) -> None:
+        """
+        Accept everything committed so far as already known to has_changed
+        """
+        with self.lock:
+            self.seen = self.changes()
+
+    @contextmanager
+    def writing(self) -> Iterator[Connection]:
+        """
+        A transaction on the monitor's own connection, committed when the block ends
+        (rolled back if it raises).  A connection's own commits don't change its
+        data_version, so what is written here is never reported, while anything
+        committed elsewhere before or after it still is.  Polling waits for the block.
+        """
+        with self.lock:
+            if self.connection is None:
+                with self.engine.begin() as conn:
+                    yield conn
+            else:
+                with self.connection.begin():
+                    yield self.connection
+
+    def close(self) -> None:
+        """
+        Release the monitor's connection.  Writing afterwards goes through the engine.
+        """
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
@@ -1,41 +1,145 @@
-from . import Config
-from sqlalchemy import select
+import logging
+from typing import Any, Mapping
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from . import Base, Config
+from . import Config
+from .instrumentation import instrumented
+from .schema import ensure_schema
 
+logger = logging.getLogger("work_journal.config")
 
-class ConfigRepo:
+
+class ConfigRepoBase:
     """
-    Config Repository:  This houses all code for CRUD operations on the config table.
-    This repo stores key/value pairs in the database and also caches them in memory for
-    efficient access at runtime.  The number of key/value pairs in the database should be
-    minimal, so this caching will limit round trips to the database without affecting the
-    memory footprint too much.
+    What ConfigRepo and AsyncConfigRepo have in common:  the keys, the in-memory cache
+    and how values are stored
     """
 
     CONFIG_INIT = "INIT"
     CONFIG_HISTORY_LEN = "HISTORY_LEN"
     CONFIG_GEOMETRY = "GEOMETRY"
+    # Generated by JournalSync the first time this journal is synced
+    CONFIG_SYNC_NODE_ID = "SYNC_NODE_ID"
+
+    # Keys whose values are not plain strings, and the type to read them back as
+    CONFIG_TYPES = {CONFIG_HISTORY_LEN: int}
+
+    # Written on first run
+    CONFIG_DEFAULTS = {
+        CONFIG_INIT: "True",
+        CONFIG_HISTORY_LEN: 5,
+        CONFIG_GEOMETRY: "800x220",
+    }
 
     def __init__(self, engine) -> None:
         self.engine = engine
         self.config = dict()
-        Base.metadata.create_all(engine)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Typed value for key from the cache, or default if it is not set
+        """
+        return self.config.get(key, default)
+
+    def _update_statement(self, key: str, value: Any):
+        return (
+            update(Config)
+            .where(Config.key == key)
+            .values(value=self._dump(value))
+            .returning(Config)
+        )
+
+    def _set_rows(self, session: Session, rows: list[dict]) -> None:
+        """
+        Inserts or updates rows of key and value in session's transaction
+        """
+        dialect_name = self.engine.dialect.name
+        if dialect_name in ("sqlite", "postgresql"):
+            insert = sqlite.insert if dialect_name == "sqlite" else postgresql.insert
+            statement = insert(Config).values(rows)
+            session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[Config.key],
+                    set_={"value": statement.excluded.value},
+                )
+            )
+        else:
+            for row in rows:
+                updated = session.execute(
+                    update(Config)
+                    .where(Config.key == row["key"])
+                    .values(value=row["value"])
+                )
+                if updated.rowcount == 0:
+                    session.add(Config(**row))
+
+    def _missing_defaults(self) -> dict:
+        return {
+            key: value
+            for (key, value) in self.CONFIG_DEFAULTS.items()
+            if key not in self.config
+        }
+
+    def _load(self, key: str, value: str) -> Any:
+        """
+        Converts a stored string back to the type registered for key.  A value that
+        won't convert (edited by hand, say) is replaced by the key's default, with a
+        warning, rather than keeping the app from starting.
+        """
+        load = self.CONFIG_TYPES.get(key, str)
+        try:
+            return load(value)
+        except (TypeError, ValueError):
+            default = self.CONFIG_DEFAULTS.get(key)
+            logger.warning(
+                "Config %s=%r is not a valid %s, using %r",
+                key,
+                value,
+                load.__name__,
+                default,
+            )
+            return default
+
+    @staticmethod
+    def _dump(value: Any) -> str:
+        return str(value)
+
+
+class ConfigRepo(ConfigRepoBase):
+    """
+    Config Repository:  This houses all code for CRUD operations on the config table.
+    This repo stores key/value pairs in the database and also caches them in memory for
+    efficient access at runtime.  The number of key/value pairs in the database should be
+    minimal, so this caching will limit round trips to the database without affecting the
+    memory footprint too much.
+
+    The cache is write-through:  every write goes to the database in a single statement
+    and, once committed, to self.config as well, so reads never need the database.
+    Values are stored as strings; keys listed in CONFIG_TYPES are converted back to
+    their type when loaded, so self.config holds e.g. an int for HISTORY_LEN.
+    """
+
+    def __init__(self, engine) -> None:
+        super().__init__(engine)
+        ensure_schema(engine)
         for config in self.retrieve_all():
-            self.config[config.key] = config.value
+            self.config[config.key] = self._load(config.key, config.value)
 
-    def create_config(self, key: str, value: str) -> Config:
+    @instrumented
+    def create_config(self, key: str, value: Any) -> Config:
         """
         Create and save a Config object
-        key and value are strings, and do exactly what you think.
+        key and value do exactly what you think.  The value is stored as a string.
         """
-        result = Config(key=key, value=value)
+        result = Config(key=key, value=self._dump(value))
         with Session(bind=self.engine, expire_on_commit=False) as session:
             session.add(result)
             session.commit()
-        self.config[key] = value
+        self.config[key] = self._load(key, result.value)
         return result
 
+    @instrumented
     def retrieve_all(self) -> [Config]:
         """
         Retrieves all Config objects from database
@@ -43,6 +147,7 @@ class ConfigRepo:
         with Session(self.engine) as session:
             return session.scalars(select(Config)).all()
 
+    @instrumented
     def retrieve_by_key(self, key: str):
         """
         Retrieve a single Config record by key
@@ -50,29 +155,61 @@ class ConfigRepo:
         with Session(self.engine) as session:
             return session.scalar(select(Config).filter(Config.key == key))
 
-    def update(self, key: str, value: str) -> Config:
+    @instrumented
+    def update(self, key: str, value: Any) -> Config:
         """
-        Update a single Config record by key
+        Update a single Config record by key, raising KeyError if there is none
         """
-        config = self.retrieve_by_key(key)
-        if config:
-            config.value = value
-            with Session(bind=self.engine, expire_on_commit=False) as session:
-                session.add(config)
-                session.commit()
-                return config
-        else:
-            raise KeyError(f"{key} not found.")
+        statement = self._update_statement(key, value)
+        with Session(bind=self.engine, expire_on_commit=False) as session:
+            config = session.scalar(statement)
+            if config is None:
+                raise KeyError(f"{key} not found.")
+            session.commit()
+        self.config[key] = self._load(key, config.value)
+        return config
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Insert or update a single Config record by key
+        """
+        self.set_many({key: value})
+
+    @instrumented
+    def set_many(self, values: Mapping[str, Any]) -> None:
+        """
+        Insert or update several Config records in one statement and one transaction,
+        e.g. to save all of a window's settings at once
+        values:  key to value
+        """
+        if not values:
+            return
+        rows = [
+            {"key": key, "value": self._dump(value)} for (key, value) in values.items()
+        ]
+        with Session(self.engine) as session:
+            self._set_rows(session, rows)
+            session.commit()
+        for row in rows:
+            self.config[row["key"]] = self._load(row["key"], row["value"])
 
+    def seed_defaults(self) -> None:
+        """
+        Writes any CONFIG_DEFAULTS that are missing, all in one transaction.  A no-op,
+        without touching the database, once they are there.
+        """
+        self.set_many(self._missing_defaults())
+
+    @instrumented
     def delete(self, key: str) -> Config:
         """
-        Delete a single Config record by key
+        Delete a single Config record by key, raising KeyError if there is none
         """
-        config = self.retrieve_by_key(key)
-        if config:
-            with Session(bind=self.engine, expire_on_commit=False) as session:
-                session.delete(config)
-                session.commit()
-                return config
-        else:
-            raise KeyError(f"{key} not found.")
+        statement = delete(Config).where(Config.key == key).returning(Config)
+        with Session(bind=self.engine, expire_on_commit=False) as session:
+            config = session.scalar(statement)
+            if config is None:
+                raise KeyError(f"{key} not found.")
+            session.commit()
+        self.config.pop(key, None)
+        return config
@@ -4,17 +4,200 @@ This is to abstract the engine creation logic away from the configuration logic.
 This might turn out to be overkill, but I'd rather start this way than have to 
 unsnarl it later...
 """
-from sqlalchemy import create_engine
+import threading
+from typing import NamedTuple
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from .instrumentation import SLOW_QUERY_MS, QueryStats, instrument
+
+
+class EngineProfile(NamedTuple):
+    """
+    How a SQLite engine is tuned
+    pragmas:  PRAGMA name -> value, applied to every new connection
+    pool_size:  connections kept open for a file database
+    max_overflow:  connections opened on top of those while they are all in use, 0 to
+                   make callers wait for one of them instead
+    """
+
+    pragmas: dict
+    pool_size: int
+    max_overflow: int
+
+
+PROFILE_SAFE = "safe"
+PROFILE_BALANCED = "balanced"
+PROFILE_BULK = "bulk"
+
+PROFILES = {
+    # SQLite's own defaults:  rollback journal, synchronous=FULL (an fsync per commit),
+    # readers and writers block each other, so extra connections buy nothing.  Capped
+    # at one for the repositories and one for a ChangeMonitor, which keeps its own.
+    PROFILE_SAFE: EngineProfile(pragmas={}, pool_size=2, max_overflow=0),
+    # WAL:  readers no longer block the writer, and with synchronous=NORMAL a commit
+    # only appends to the WAL; the fsync happens at checkpoint.  Still crash safe, a
+    # power cut can at worst lose the last few commits.
+    PROFILE_BALANCED: EngineProfile(
+        pragmas={
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -64 * 1024,  # negative means KiB, so 64 MiB
+            "temp_store": "MEMORY",
+        },
+        pool_size=5,
+        max_overflow=10,
+    ),
+    # For imports and benchmarks:  no fsync at all.  An OS crash or power cut can lose
+    # recent commits, so don't use it for the everyday journal.
+    PROFILE_BULK: EngineProfile(
+        pragmas={
+            "journal_mode": "WAL",
+            "synchronous": "OFF",
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -256 * 1024,
+            "temp_store": "MEMORY",
+        },
+        # One writer at a time, capped like the safe profile
+        pool_size=2,
+        max_overflow=0,
+    ),
+}
 
 
 class DBManager:
     """
     Manages a singleton SQLAlchemy Engine instance
+
+    DBManager.get() hands out one DBManager per URL and profile, so several journals can
+    be open side by side and each is only ever given one engine and pool.  Constructing
+    a DBManager directly always builds a new engine, which is what tests want.
+
+    async_engine is an asyncio engine on the same database, for AsyncJournalRepo and
+    AsyncConfigRepo.  It is only built when first asked for.
     """
 
-    def __init__(self, db_url: str) -> None:
+    _registry: dict = {}
+    _registry_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, db_url: str, profile: str = PROFILE_BALANCED) -> "DBManager":
+        """
+        The registered DBManager for db_url and profile, created on first use.  Note that
+        every sqlite:// (in memory) caller gets the same database this way.
+        """
+        key = (make_url(db_url).render_as_string(hide_password=False), profile)
+        with cls._registry_lock:
+            manager = cls._registry.get(key)
+            if manager is None:
+                manager = cls._registry[key] = cls(db_url, profile)
+            return manager
+
+    @classmethod
+    def dispose_all(cls) -> None:
+        """
+        Closes the pools of, and forgets, every registered DBManager
+        """
+        with cls._registry_lock:
+            managers = list(cls._registry.values())
+            cls._registry.clear()
+        for manager in managers:
+            manager.engine.dispose()
+            if manager._async_engine is not None:
+                # Closing its connections takes an event loop, they go with the pool
+                manager._async_engine.sync_engine.dispose(close=False)
+
+    def __init__(
+        self,
+        db_url: str,
+        profile: str = PROFILE_BALANCED,
+        slow_query_ms: float = SLOW_QUERY_MS,
+    ) -> None:
         """
         db_url: SQLAlchemy database URL
         For details see: https://docs.sqlalchemy.org/en/20/core/engines.html#database-urls
+        profile:  one of PROFILES, how to tune the engine if db_url is a SQLite database
+        slow_query_ms:  statements slower than this are logged, see instrumentation.py.
+                        Can be changed later through stats.slow_query_ms.
+        """
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown engine profile: {profile}")
+        self.profile = PROFILES[profile]
+        self.db_url = db_url
+        self.engine = self._create_engine(db_url)
+        # Query timings per repository method, see stats.snapshot()
+        self.stats = QueryStats(slow_query_ms)
+        instrument(self.engine, self.stats)
+        self._async_engine = None
+        self._async_lock = threading.Lock()
+
+    @property
+    def async_engine(self):
+        """
+        AsyncEngine for the same database, tuned and instrumented like engine.  SQLite
+        goes through aiosqlite, which must be installed; any other database's URL must
+        name an asyncio driver, e.g. postgresql+asyncpg.  Note that a sqlite:// (in
+        memory) journal is a separate database for each engine.
         """
-        self.engine = create_engine(db_url)
+        with self._async_lock:
+            if self._async_engine is None:
+                self._async_engine = self._create_async_engine(self.db_url)
+                instrument(self._async_engine.sync_engine, self.stats)
+            return self._async_engine
+
+    def _create_engine(self, db_url: str):
+        url = make_url(db_url)
+        if url.get_backend_name() != "sqlite":
+            return create_engine(db_url)
+
+        if url.database in (None, "", ":memory:"):
+            # Every connection to :memory: is a new, empty database, so there must only
+            # ever be the one connection.  Other threads (the background worker, the
+            # journal writer) may use it too, but the pool hands it to one at a time.
+            engine = create_engine(
+                db_url,
+                poolclass=QueuePool,
+                pool_size=1,
+                max_overflow=0,
+                connect_args={"check_same_thread": False},
+            )
+        else:
+            engine = create_engine(
+                db_url,
+                pool_size=self.profile.pool_size,
+                max_overflow=self.profile.max_overflow,
+            )
+        event.listen(engine, "connect", self._apply_pragmas)
+        return engine
+
+    def _create_async_engine(self, db_url: str):
+        from sqlalchemy.ext.asyncio import create_async_engine
+        from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+        url = make_url(db_url)
+        if url.get_backend_name() != "sqlite":
+            return create_async_engine(url)
+
+        url = url.set(drivername="sqlite+aiosqlite")
+        if url.database in (None, "", ":memory:"):
+            # The one connection again, one task at a time
+            engine = create_async_engine(
+                url, poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0
+            )
+        else:
+            # aiosqlite would otherwise open a new connection for every session
+            engine = create_async_engine(
+                url,
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=self.profile.pool_size,
+                max_overflow=self.profile.max_overflow,
+            )
+        event.listen(engine.sync_engine, "connect", self._apply_pragmas)
+        return engine
+
+    def _apply_pragmas(self, dbapi_connection, _) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in self.profile.pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
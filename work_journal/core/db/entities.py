@@ -2,11 +2,20 @@
 This module contains all database entities for the application
 """
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import date, datetime
+from typing import NamedTuple, Optional
+from secrets import token_hex
+from time import time_ns
+from sqlalchemy import Index
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from work_journal.core.app_config import db
+from . import fts
 
-engine = db.engine
+
+def new_uuid() -> str:
+    # 32 hex digits like uuid4().hex, but led by the time in milliseconds (as in a
+    # UUIDv7) and then 80 random bits.  New uuids then land at the end of the uuid
+    # indexes rather than all over them, which is what bulk loads spend their time on.
+    return f"{time_ns() // 1_000_000:012x}{token_hex(10)}"
 
 
 class Base(DeclarativeBase):
@@ -28,11 +37,109 @@ class Journal(Base):
     __tablename__ = "journal"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    ts: Mapped[datetime]
+    # Identifies the entry across synced journals, where ids differ
+    uuid: Mapped[str] = mapped_column(unique=True, index=True, default=new_uuid)
+    # Indexed so that report ranges are answered with an index range scan
+    ts: Mapped[datetime] = mapped_column(index=True)
     # Not giving log a string length, might need to change this for a different dbms
     log: Mapped[str]
 
 
+fts.install(Journal.__table__)
+
+
+class JournalRecord(NamedTuple):
+    """
+    Read-only journal entry returned by JournalRepo's *_records methods.  A plain tuple
+    built straight from a Core row:  a fraction of the memory of a Journal and no
+    session, identity map or attribute instrumentation behind it.  Has the same id, ts
+    and log attributes, so code that only reads entries can take either.
+    """
+
+    id: Optional[int]
+    ts: datetime
+    log: str
+
+
+@dataclass
+class JournalTag(Base):
+    """
+    The #tags of each journal entry (see tags.py), one row per entry and tag.  Written
+    by JournalRepo along with the entry.  There is no foreign key to journal:  archived
+    entries keep their tags, as their ids are never reused.
+    """
+
+    __tablename__ = "journal_tag"
+    # Entries by tag, without touching the table
+    __table_args__ = (Index("ix_journal_tag_tag", "tag", "journal_id"),)
+
+    journal_id: Mapped[int] = mapped_column(primary_key=True)
+    tag: Mapped[str] = mapped_column(primary_key=True)
+
+
+@dataclass
+class JournalRollup(Base):
+    """
+    Precomputed journal activity per day, ISO week and month.  Kept up to date by
+    JournalRepo as it writes, see rollup.py.
+    """
+
+    __tablename__ = "journal_rollup"
+
+    granularity: Mapped[str] = mapped_column(primary_key=True)
+    period_start: Mapped[date] = mapped_column(primary_key=True)
+    entry_count: Mapped[int]
+    first_ts: Mapped[datetime]
+    last_ts: Mapped[datetime]
+
+
+@dataclass
+class JournalArchive(Base):
+    """
+    One row per archive file, i.e. per year with entries moved out of journal by
+    JournalRepo.archive_before.  Lets range queries tell which archives they need to
+    attach without opening any of them.
+    """
+
+    __tablename__ = "journal_archive"
+
+    year: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    entry_count: Mapped[int]
+    first_ts: Mapped[datetime]
+    last_ts: Mapped[datetime]
+
+
+@dataclass
+class JournalChange(Base):
+    """
+    The sync change log:  one row per entry this journal has ever held, numbered in the
+    order they arrived.  Entries written here are logged by the repositories as they
+    write them (see sync_log.py) with origin NULL, entries merged from a peer by the merge itself, with
+    the peer's node id.  Rows outlive archiving, so the uuids of every entry ever seen
+    stay known and merging the same entry twice is a no-op.
+    """
+
+    __tablename__ = "journal_change"
+
+    seq: Mapped[int] = mapped_column(primary_key=True)
+    uuid: Mapped[str] = mapped_column(unique=True, index=True)
+    origin: Mapped[Optional[str]]
+
+
+@dataclass
+class SyncPeer(Base):
+    """
+    High-water mark per sync peer:  the last of its change log seqs merged into this
+    journal, so only newer delta files are read on the next sync
+    """
+
+    __tablename__ = "sync_peer"
+
+    node_id: Mapped[str] = mapped_column(primary_key=True)
+    received_seq: Mapped[int]
+    synced_at: Mapped[datetime]
+
+
 @dataclass
 class Config(Base):
     """
@@ -41,5 +148,6 @@ class Config(Base):
 
     __tablename__ = "config"
     id: Mapped[int] = mapped_column(primary_key=True)
-    key: Mapped[str]
+    # Unique, so lookups and upserts by key go through an index
+    key: Mapped[str] = mapped_column(unique=True, index=True)
     value: Mapped[str]
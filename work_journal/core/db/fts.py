@@ -0,0 +1,90 @@
+"""
+This module contains the SQLite FTS5 full text index over journal.log.
+
+journal_fts is an external content FTS5 table:  it stores only the index and reads the
+text back out of journal, keyed by journal.id.  Triggers on journal take deleted and
+changed entries out of it, but new entries are indexed by the repositories, with
+INDEX_STATEMENT once per batch written:  an insert trigger runs once per row, which made
+bulk loads several times slower.  None of this is part of the ORM metadata (SQLAlchemy
+can't describe a virtual table), so it is attached to the journal table's create/drop
+events instead.
+"""
+import re
+from sqlalchemy import DDL, Table, column, event, table, text
+from sqlalchemy.exc import OperationalError
+
+FTS_TABLE = "journal_fts"
+
+# A word of a query, on its own or at the edge of a group, with an optional prefix *
+WORD = re.compile(r'(?<![^\s(,])([^\s"(),:^]+?)(\*?)(?![^\s),])')
+# How SQLite starts its complaints about a MATCH query it can't parse
+QUERY_ERRORS = ("fts5: ", "no such column: ", "unterminated string", "unknown special")
+
+# Lightweight handle for building queries against the virtual table.  rank is FTS5's
+# bm25() score for the current MATCH, lower is better.
+journal_fts = table(FTS_TABLE, column("rowid"), column("rank"), column(FTS_TABLE))
+
+CREATE_STATEMENTS = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        log, content='journal', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON journal BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, log) VALUES ('delete', old.id, old.log);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF log ON journal BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, log) VALUES ('delete', old.id, old.log);
+        INSERT INTO {FTS_TABLE}(rowid, log) VALUES (new.id, new.log);
+    END
+    """,
+]
+
+DROP_STATEMENTS = [f"DROP TABLE IF EXISTS {FTS_TABLE}"]
+
+# Indexes the journal rows with ids first_id..last_id, just written
+INDEX_STATEMENT = text(
+    f"INSERT INTO {FTS_TABLE}(rowid, log) "
+    "SELECT id, log FROM journal WHERE id BETWEEN :first_id AND :last_id"
+)
+
+
+def install(journal: Table) -> None:
+    """
+    Have metadata.create_all/drop_all manage the FTS index along with journal.
+    SQLite only, other dialects simply don't get the index.
+    """
+    for statement in CREATE_STATEMENTS:
+        event.listen(
+            journal, "after_create", DDL(statement).execute_if(dialect="sqlite")
+        )
+    for statement in DROP_STATEMENTS:
+        event.listen(
+            journal, "before_drop", DDL(statement).execute_if(dialect="sqlite")
+        )
+
+
+def quote_words(query: str) -> str:
+    """
+    query with the words FTS5 would take for syntax, like foo-bar, v1.2 or don't,
+    quoted as phrases, so they find what they say.  Phrases, groups, column filters and
+    operators are left alone.
+    """
+    return WORD.sub(_quote_word, query)
+
+
+def _quote_word(match: re.Match) -> str:
+    (word, prefix) = match.groups()
+    if word == "+" or re.fullmatch(r"\w+", word):
+        return match.group()
+    return f'"{word}"{prefix}'
+
+
+def is_query_error(error: OperationalError) -> bool:
+    """
+    Whether error is SQLite rejecting the syntax of a MATCH query
+    """
+    return str(error.orig).startswith(QUERY_ERRORS)
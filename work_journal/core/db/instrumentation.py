@@ -0,0 +1,304 @@
+"""
+This module measures where the database time goes.
+
+Repository methods are wrapped with @instrumented, which times each call and counts the
+rows it returned, and names the operation in a context variable.  DBManager hooks
+QueryStats up to its engine's before_/after_cursor_execute and pool checkout events,
+which charge every SQL statement and connection checkout to the operation running at
+the time (or to OTHER_OPERATION outside any repository method).  Statements slower than
+slow_query_ms are logged to the "work_journal.sql" logger.
+
+Engines that were not built by DBManager are simply not instrumented, @instrumented
+costs nothing more than a dictionary lookup on them.  An asyncio engine reports through
+its sync_engine, and @instrumented times coroutines and async generators as well.
+"""
+import functools
+import inspect
+import logging
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Engine, event
+
+logger = logging.getLogger("work_journal.sql")
+# Silent unless the app configures logging, rather than falling back to stderr
+logger.addHandler(logging.NullHandler())
+
+OTHER_OPERATION = "other"
+
+# Upper bounds (ms) of the latency histogram buckets, the last one catches the rest
+HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+SLOW_QUERY_MS = 100.0
+SLOW_QUERY_LOG_LEN = 50
+
+_operation: ContextVar[str] = ContextVar(
+    "work_journal_operation", default=OTHER_OPERATION
+)
+_stats_by_engine = weakref.WeakKeyDictionary()
+
+
+class OperationStats:
+    """
+    Running totals for one repository method
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.queries = 0
+        self.query_ms = 0.0
+        self.sessions = 0
+
+    def as_dict(self) -> dict:
+        buckets = [f"<={bound}ms" for bound in HISTOGRAM_BOUNDS_MS]
+        buckets.append(f">{HISTOGRAM_BOUNDS_MS[-1]}ms")
+        return {
+            "calls": self.calls,
+            "total_ms": self.total_ms,
+            "mean_ms": self.total_ms / self.calls if self.calls else 0.0,
+            "max_ms": self.max_ms,
+            "rows": self.rows,
+            "queries": self.queries,
+            "query_ms": self.query_ms,
+            "sessions": self.sessions,
+            "histogram": dict(zip(buckets, self.histogram)),
+        }
+
+
+class QueryStats:
+    """
+    Per operation latency, row, query and session counts for one engine, plus a log of
+    recent slow statements.  Thread safe.
+    """
+
+    def __init__(self, slow_query_ms: float = SLOW_QUERY_MS) -> None:
+        """
+        slow_query_ms:  statements taking longer than this are logged
+        """
+        self.slow_query_ms = slow_query_ms
+        self.operations: dict[str, OperationStats] = {}
+        self.slow_queries = deque(maxlen=SLOW_QUERY_LOG_LEN)
+        self.lock = threading.Lock()
+
+    def _operation_stats(self, operation: str) -> OperationStats:
+        stats = self.operations.get(operation)
+        if stats is None:
+            stats = self.operations[operation] = OperationStats()
+        return stats
+
+    def record_call(self, operation: str, elapsed_ms: float, rows: int) -> None:
+        with self.lock:
+            stats = self._operation_stats(operation)
+            stats.calls += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.rows += rows
+            stats.histogram[bisect_left(HISTOGRAM_BOUNDS_MS, elapsed_ms)] += 1
+
+    def record_query(self, elapsed_ms: float, statement: str) -> None:
+        operation = _operation.get()
+        with self.lock:
+            stats = self._operation_stats(operation)
+            stats.queries += 1
+            stats.query_ms += elapsed_ms
+            if elapsed_ms > self.slow_query_ms:
+                self.slow_queries.append(
+                    {
+                        "at": datetime.now().isoformat(timespec="seconds"),
+                        "operation": operation,
+                        "ms": elapsed_ms,
+                        "statement": statement,
+                    }
+                )
+        if elapsed_ms > self.slow_query_ms:
+            logger.warning(
+                "slow query (%.1f ms) in %s: %s", elapsed_ms, operation, statement
+            )
+
+    def record_session(self) -> None:
+        with self.lock:
+            self._operation_stats(_operation.get()).sessions += 1
+
+    def snapshot(self) -> dict:
+        """
+        A copy of the numbers so far:
+        {"operations": {name: OperationStats.as_dict()}, "slow_queries": [...]}
+        """
+        with self.lock:
+            return {
+                "operations": {
+                    name: stats.as_dict()
+                    for (name, stats) in sorted(self.operations.items())
+                },
+                "slow_queries": list(self.slow_queries),
+            }
+
+    def reset(self) -> None:
+        with self.lock:
+            self.operations.clear()
+            self.slow_queries.clear()
+
+
+def instrument(engine: Engine, stats: QueryStats) -> None:
+    """
+    Starts feeding engine's statements and connection checkouts into stats
+    """
+    _stats_by_engine[engine] = stats
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        stats.record_query((time.perf_counter() - started) * 1000, statement)
+
+    @event.listens_for(engine, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.record_session()
+
+
+def stats_for(engine: Engine) -> Optional[QueryStats]:
+    """
+    The QueryStats engine (or an AsyncEngine) reports to, None if it isn't instrumented
+    """
+    return _stats_by_engine.get(getattr(engine, "sync_engine", engine))
+
+
+def instrumented(method):
+    """
+    Decorator for repository methods (of anything with an engine attribute):  times
+    each call, counts the rows returned (the length of a list, or the items yielded by
+    a generator) and charges the SQL run meanwhile to "Class.method".
+    """
+    operation = method.__qualname__
+
+    if inspect.isasyncgenfunction(method):
+
+        @functools.wraps(method)
+        async def async_generator_wrapper(self, *args, **kwargs):
+            stats = stats_for(self.engine)
+            # Unlike yield from, async for doesn't pass aclose() on, and the
+            # generator's connection must be released while the loop still runs
+            iterator = method(self, *args, **kwargs)
+            if stats is None:
+                try:
+                    async for item in iterator:
+                        yield item
+                finally:
+                    await iterator.aclose()
+                return
+            # See generator_wrapper
+            started = time.perf_counter()
+            rows = 0
+            try:
+                while True:
+                    token = _operation.set(operation)
+                    try:
+                        item = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    finally:
+                        _operation.reset(token)
+                    rows += 1
+                    yield item
+            finally:
+                await iterator.aclose()
+                stats.record_call(
+                    operation, (time.perf_counter() - started) * 1000, rows
+                )
+
+        return async_generator_wrapper
+
+    if inspect.iscoroutinefunction(method):
+
+        @functools.wraps(method)
+        async def coroutine_wrapper(self, *args, **kwargs):
+            stats = stats_for(self.engine)
+            if stats is None:
+                return await method(self, *args, **kwargs)
+            token = _operation.set(operation)
+            started = time.perf_counter()
+            try:
+                result = await method(self, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                _operation.reset(token)
+            stats.record_call(operation, elapsed * 1000, _count_rows(result))
+            return result
+
+        return coroutine_wrapper
+
+    if inspect.isgeneratorfunction(method):
+
+        @functools.wraps(method)
+        def generator_wrapper(self, *args, **kwargs):
+            stats = _stats_by_engine.get(self.engine)
+            if stats is None:
+                yield from method(self, *args, **kwargs)
+                return
+            # Timed from the first row asked for to the last, consumer included:
+            # timing each row separately would cost more than fetching it.  The
+            # operation is only set while the generator runs, though, so what the
+            # consumer does between rows isn't charged to it.
+            iterator = method(self, *args, **kwargs)
+            started = time.perf_counter()
+            rows = 0
+            try:
+                while True:
+                    token = _operation.set(operation)
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        break
+                    finally:
+                        _operation.reset(token)
+                    rows += 1
+                    yield item
+            finally:
+                # Unlike yield from, the loop doesn't pass close() on
+                iterator.close()
+                stats.record_call(
+                    operation, (time.perf_counter() - started) * 1000, rows
+                )
+
+        return generator_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        stats = _stats_by_engine.get(self.engine)
+        if stats is None:
+            return method(self, *args, **kwargs)
+        token = _operation.set(operation)
+        started = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            _operation.reset(token)
+        stats.record_call(operation, elapsed * 1000, _count_rows(result))
+        return result
+
+    return wrapper
+
+
+def _count_rows(result) -> int:
+    """
+    Rows returned (or for a count, written) by a repository method
+    """
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    return int(result is not None)
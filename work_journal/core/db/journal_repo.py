@@ -1,29 +1,552 @@
-from datetime import datetime, timedelta
-from sqlalchemy import select
+import os
+from collections import Counter
+from itertools import islice
+from datetime import datetime, time, timedelta
+from typing import Iterable, Iterator, Optional, Tuple, Union
+from sqlalchemy import (
+    Row,
+    delete,
+    func,
+    insert,
+    literal_column,
+    null,
+    select,
+    union_all,
+)
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
-from . import Base, Journal
+from work_journal.core import timeframes
+from work_journal.core.timeframes import Timeframe
+from . import (
+    Journal,
+    JournalArchive,
+    JournalChange,
+    JournalRecord,
+    JournalRollup,
+    JournalTag,
+)
+from . import fts, sync_log
+from .archive import archive_table, attached, year_batches
+from .change_monitor import ChangeMonitor
+from .entities import new_uuid
+from .fts import journal_fts
+from .instrumentation import instrumented
+from .result_cache import EVERYTHING, ResultCache, cached
+from .rollup import period_end, period_start, rollup_upsert
+from .schema import ensure_schema
+from .tags import extract_tags, normalize_tags
 
+# An entry for bulk ingestion:  either the string to log (timestamped now) or a
+# (timestamp, string) pair when importing entries from elsewhere
+BulkEntry = Union[str, Tuple[datetime, str]]
+# An entry from a sync peer:  (uuid, timestamp, string)
+MergeEntry = Tuple[str, datetime, str]
 
-class JournalRepo:
+ENTRY_COLUMNS = ("id", "ts", "log")
+
+# The SQLite insert of bulk writes, which goes straight to the driver with the rows
+# already as SQLite stores them:  SQLAlchemy's handling of each row's parameters took
+# about as long as the insert itself
+SQLITE_INSERT = "INSERT INTO journal (uuid, ts, log) VALUES (?, ?, ?)"
+
+
+# Spans of the cached read methods' results, see result_cache.py
+
+
+def _newest_span(**_) -> Timeframe:
+    # New entries get the highest ids, so they change any page of the newest
+    return EVERYTHING
+
+
+def _page_span(before_id: Optional[int], **_) -> Optional[Timeframe]:
+    # ... and never a page of older entries
+    return EVERYTHING if before_id is None else None
+
+
+def _range_span(start=None, end=None, **_) -> Timeframe:
+    return Timeframe(start or datetime.min, end or datetime.max)
+
+
+def _summary_span(granularity: str, start, end) -> Timeframe:
+    # A new entry changes the rollup of its whole period
+    last_day = (end - timedelta(microseconds=1)).date()
+    return Timeframe(
+        datetime.combine(period_start(granularity, start.date()), time()),
+        datetime.combine(period_end(granularity, last_day), time()),
+    )
+
+
+class JournalRepoBase:
     """
-    Journal Repository:  This houses all code for CRUD operations on the journal table.
+    What JournalRepo and AsyncJournalRepo have in common:  the statements they run, and
+    the steps of a write that take a (synchronous) connection, which AsyncJournalRepo
+    runs through run_sync.
     """
 
-    def __init__(self, engine) -> None:
+    BULK_CHUNK_SIZE = 10_000
+    STREAM_BATCH_SIZE = 1_000
+    SEARCH_LIMIT = 50
+
+    def __init__(self, engine, archive_dir: Optional[str] = None) -> None:
+        """
+        engine:  SQLAlchemy engine for the journal database
+        archive_dir:  where archive_before puts its per year files.  Defaults to a
+                      directory next to a SQLite journal file, named after it; other
+                      databases can't be archived.
+        """
         self.engine = engine
-        Base.metadata.create_all(engine)
+        self.archive_dir = archive_dir
+        database = engine.url.database
+        if (
+            archive_dir is None
+            and engine.dialect.name == "sqlite"
+            and database not in (None, "", ":memory:")
+        ):
+            self.archive_dir = (
+                os.path.splitext(os.path.abspath(database))[0] + "_archive"
+            )
+
+    def _add_entry(self, session: Session, entry: str) -> Journal:
+        """
+        Adds a journal entry, with its tags, rollups, search index and change log rows,
+        to session's transaction
+        """
+        journal = Journal(log=entry, ts=datetime.now())
+        session.add(journal)
+        session.flush()
+        if "#" in entry:
+            self._add_tags(session, [journal.id], [entry])
+        self._update_rollups(session, [journal.ts])
+        self._log_written(session, journal.id, journal.id)
+        return journal
+
+    def _write_chunk(self, conn, chunk: list[dict]) -> list[int]:
+        """
+        Inserts chunk inside conn's transaction, with its tags, search index and change
+        log rows, and folds it into the rollups.  Returns the new ids, in chunk's order.
+        """
+        if self.engine.dialect.name == "sqlite":
+            conn.exec_driver_sql(
+                SQLITE_INSERT,
+                [(row["uuid"], _sqlite_ts(row["ts"]), row["log"]) for row in chunk],
+            )
+            # SQLite numbers new rows on from the highest id, and the transaction holds
+            # the write lock, so the chunk took the ids up to the last one inserted, in
+            # order.  Asking for them with RETURNING costs nearly as much as the insert.
+            last_id = conn.scalar(select(func.last_insert_rowid()))
+            ids = list(range(last_id - len(chunk) + 1, last_id + 1))
+        else:
+            statement = insert(Journal).returning(
+                Journal.id, sort_by_parameter_order=True
+            )
+            ids = conn.execute(statement, chunk).scalars().all()
+        self._log_written(conn, ids[0], ids[-1])
+        if any("#" in row["log"] for row in chunk):
+            self._add_tags(conn, ids, [row["log"] for row in chunk])
+        self._update_rollups(conn, [row["ts"] for row in chunk])
+        return ids
+
+    def _log_written(self, conn, first_id: int, last_id: int) -> None:
+        """
+        Adds the entries with ids first_id..last_id, just inserted in conn's
+        transaction, to the search index and the sync change log.  One statement each
+        for the whole batch, where insert triggers would run once per row.
+        """
+        if self.engine.dialect.name != "sqlite":
+            return
+        ids = {"first_id": first_id, "last_id": last_id}
+        conn.execute(fts.INDEX_STATEMENT, ids)
+        conn.execute(sync_log.LOG_STATEMENT, ids)
+
+    def _add_tags(self, conn, ids: list[int], logs: list[str]) -> None:
+        """
+        Writes the tags of new entries to journal_tag, inside the caller's transaction
+        conn:  the Connection or Session doing the write
+        """
+        rows = [
+            {"journal_id": journal_id, "tag": tag}
+            for (journal_id, log) in zip(ids, logs)
+            for tag in extract_tags(log)
+        ]
+        if rows:
+            conn.execute(insert(JournalTag), rows)
+
+    def _merge_chunk(self, conn, chunk: list[MergeEntry], origin: str) -> list[dict]:
+        """
+        Writes the entries of chunk not seen before inside conn's transaction, and
+        returns them
+        """
+        log_change = (
+            insert(JournalChange).prefix_with("OR IGNORE").returning(JournalChange.uuid)
+        )
+        # Only the uuids not seen before come back, duplicates included
+        new = set(
+            conn.execute(
+                log_change,
+                [{"uuid": uuid, "origin": origin} for (uuid, _, _) in chunk],
+            ).scalars()
+        )
+        rows = []
+        for uuid, ts, log in chunk:
+            if uuid in new:
+                new.discard(uuid)
+                rows.append({"uuid": uuid, "ts": ts, "log": log})
+        if rows:
+            self._write_chunk(conn, rows)
+        return rows
+
+    def _update_rollups(self, conn, timestamps: list[datetime]) -> None:
+        """
+        Folds newly written entries into journal_rollup, inside the caller's transaction
+        conn:  the Connection or Session doing the write
+        """
+        statement = rollup_upsert(self.engine.dialect.name, timestamps)
+        if statement is not None:
+            conn.execute(statement)
+
+    def _page_statement(self, columns, before_id: Optional[int], number: int):
+        """
+        Up to number entries with ids below before_id (None:  the newest), newest first
+        """
+        statement = select(*columns).order_by(Journal.id.desc()).limit(number)
+        if before_id is not None:
+            statement = statement.where(Journal.id < before_id)
+        return statement
+
+    def _newer_page_statement(self, columns, after_id: int, number: int):
+        """
+        Up to number entries with ids above after_id, oldest first
+        """
+        return (
+            select(*columns)
+            .where(Journal.id > after_id)
+            .order_by(Journal.id)
+            .limit(number)
+        )
+
+    def _entries_statement(
+        self, start, end, years: list[int], tags: Optional[Iterable[str]] = None
+    ):
+        """
+        ORM version of _range_statement, selecting Journal entities
+        """
+        if not years:
+            return (
+                select(Journal)
+                .where(*_range_filter(Journal.__table__, start, end, tags))
+                .order_by(Journal.ts)
+            )
+        return select(Journal).from_statement(
+            self._range_statement(start, end, years, ("id", "uuid", "ts", "log"), tags)
+        )
+
+    def _range_statement(
+        self,
+        start,
+        end,
+        years: list[int],
+        columns: Tuple[str, ...] = ENTRY_COLUMNS,
+        tags: Optional[Iterable[str]] = None,
+        ordered: bool = True,
+    ):
+        """
+        Entries between start and end, oldest first, from the journal table plus the
+        archives for years, which must be attached
+        start:  datetime, start of range (included)
+        end: datetime, end of range (excluded)
+        years:  archived years to include
+        columns:  names of the columns to select.  Archives only have id, ts and log,
+                  anything else is NULL for archived entries.
+        tags:  only entries with any of these tags
+        ordered:  False to leave out the ORDER BY, e.g. for a subquery
+        """
+        statements = []
+        for source in [Journal.__table__] + [archive_table(year) for year in years]:
+            selected = [
+                source.c[name] if name in source.c else null().label(name)
+                for name in columns
+            ]
+            statements.append(
+                select(*selected).where(*_range_filter(source, start, end, tags))
+            )
+        if len(statements) == 1:
+            return statements[0].order_by(Journal.ts) if ordered else statements[0]
+        statement = union_all(*statements)
+        return statement.order_by(literal_column("ts")) if ordered else statement
+
+    def _archived_years(self, conn, start, end) -> list[int]:
+        """
+        Years whose archive holds entries between start and end.  Only costs a lookup in
+        the (tiny) journal_archive table, and nothing at all if there is no archive.
+        """
+        if self.archive_dir is None:
+            return []
+        return conn.scalars(
+            select(JournalArchive.year)
+            .where(JournalArchive.first_ts < end)
+            .where(JournalArchive.last_ts >= start)
+            .order_by(JournalArchive.year)
+        ).all()
+
+    def _archive_batches(self, conn, start, end) -> list[tuple]:
+        """
+        The range start..end as windows to read one after the other, each with the
+        archived years to attach for it, see archive.year_batches
+        """
+        return list(year_batches(start, end, self._archived_years(conn, start, end)))
+
+    def _archive(self, conn, cutoff: datetime) -> int:
+        """
+        The work of archive_before, on conn
+        """
+        if self.archive_dir is None:
+            raise ValueError("Only a SQLite file database can be archived")
+        os.makedirs(self.archive_dir, exist_ok=True)
+
+        (first_ts, last_ts) = conn.execute(
+            select(func.min(Journal.ts), func.max(Journal.ts)).where(
+                Journal.ts < cutoff
+            )
+        ).one()
+        newest_id = conn.scalar(select(func.max(Journal.id)))
+        if first_ts is None:
+            return 0
+        return sum(
+            self._archive_year(conn, year, cutoff, newest_id)
+            for year in range(first_ts.year, last_ts.year + 1)
+        )
+
+    def _archive_year(self, conn, year: int, cutoff: datetime, newest_id: int) -> int:
+        """
+        Moves one year's entries before cutoff into that year's archive
+        """
+        archive = archive_table(year)
+        moving = (
+            (Journal.ts >= datetime(year, 1, 1))
+            & (Journal.ts < min(datetime(year + 1, 1, 1), cutoff))
+            & (Journal.id < newest_id)
+        )
+        with attached(conn, self.archive_dir, [year]):
+            archive.create(conn, checkfirst=True)
+            conn.execute(
+                insert(archive)
+                .prefix_with("OR IGNORE")
+                .from_select(
+                    ["id", "ts", "log"],
+                    select(Journal.id, Journal.ts, Journal.log).where(moving),
+                )
+            )
+            # In WAL mode a transaction across attached databases is only atomic for
+            # each of them, so the copy is committed before anything is deleted.  Cut
+            # off in between, the entries are left in both, for the next run to finish.
+            conn.commit()
+            moved = conn.execute(delete(Journal).where(moving)).rowcount
+            (count, first_ts, last_ts) = conn.execute(
+                select(func.count(), func.min(archive.c.ts), func.max(archive.c.ts))
+            ).one()
+            if count:
+                statement = sqlite.insert(JournalArchive).values(
+                    year=year, entry_count=count, first_ts=first_ts, last_ts=last_ts
+                )
+                conn.execute(
+                    statement.on_conflict_do_update(
+                        index_elements=[JournalArchive.year],
+                        set_={
+                            "entry_count": statement.excluded.entry_count,
+                            "first_ts": statement.excluded.first_ts,
+                            "last_ts": statement.excluded.last_ts,
+                        },
+                    )
+                )
+            conn.commit()
+        return moved
+
+    def _search_statement(self, query: str, start, end, limit: int):
+        statement = (
+            select(Journal)
+            .join(journal_fts, journal_fts.c.rowid == Journal.id)
+            .where(journal_fts.c.journal_fts.op("MATCH")(fts.quote_words(query)))
+        )
+        if start is not None:
+            statement = statement.where(Journal.ts >= start)
+        if end is not None:
+            statement = statement.where(Journal.ts < end)
+        return statement.order_by(journal_fts.c.rank).limit(limit)
+
+    def _tag_counts(self, conn, start, end) -> [Row]:
+        """
+        The work of get_tag_counts, on conn
+        """
+        count = func.count().label("count")
+        statement = (
+            select(JournalTag.tag, count)
+            .group_by(JournalTag.tag)
+            .order_by(count.desc(), JournalTag.tag)
+        )
+        if start is None and end is None:
+            return conn.execute(statement).all()
+        (start, end) = (start or datetime.min, end or datetime.max)
+        counts = Counter()
+        for since, until, years in self._archive_batches(conn, start, end):
+            entries = self._range_statement(
+                since, until, years, ("id",), ordered=False
+            ).subquery()
+            with attached(conn, self.archive_dir, years):
+                rows = conn.execute(
+                    statement.join(entries, entries.c.id == JournalTag.journal_id)
+                )
+                counts.update(dict(rows.all()))
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+
+    def _summary_statement(self, granularity: str, start, end):
+        last_day = (end - timedelta(microseconds=1)).date()
+        return (
+            select(JournalRollup)
+            .where(JournalRollup.granularity == granularity)
+            .where(
+                JournalRollup.period_start.between(
+                    period_start(granularity, start.date()), last_day
+                )
+            )
+            .order_by(JournalRollup.period_start)
+        )
+
+
+class JournalRepo(JournalRepoBase):
+    """
+    Journal Repository:  This houses all code for CRUD operations on the journal table.
+    """
+
+    CACHE_SIZE = 128
+    CACHE_TTL = 300.0
+
+    def __init__(
+        self,
+        engine,
+        archive_dir: Optional[str] = None,
+        cache_size: int = 0,
+        cache_ttl: float = CACHE_TTL,
+    ) -> None:
+        """
+        engine:  SQLAlchemy engine for the journal database
+        archive_dir:  where archive_before puts its per year files.  Defaults to a
+                      directory next to a SQLite journal file, named after it; other
+                      databases can't be archived.
+        cache_size:  how many read results to cache (see result_cache.py), 0 for none
+        cache_ttl:  seconds a cached result is served for at most
+        """
+        super().__init__(engine, archive_dir)
+        ensure_schema(engine)
+        self.monitor = None
+        self.cache = None
+        if cache_size:
+            self.cache = ResultCache(
+                engine, cache_size, cache_ttl, monitor=self.watch()
+            )
+
+    def watch(self) -> ChangeMonitor:
+        """
+        The repo's ChangeMonitor, which tells when something else has written to the
+        journal.  Created on first use; from then on the repo writes on the monitor's
+        connection (see ChangeMonitor.writing), so its own writes are not reported.
+        """
+        if self.monitor is None:
+            self.monitor = ChangeMonitor(self.engine)
+        return self.monitor
+
+    def _begin(self):
+        """
+        A write transaction, through the change monitor once the repo is watched
+        """
+        if self.monitor is not None:
+            return self.monitor.writing()
+        return self.engine.begin()
 
+    @instrumented
     def create_journal_entry(self, entry: str) -> Journal:
         """
         Create a journal entry
         entry: The string to log
         """
-        with Session(bind=self.engine, expire_on_commit=False) as session:
-            journal = Journal(log=entry, ts=datetime.now())
-            session.add(journal)
-            session.commit()
-            return journal
+        with self._begin() as conn:
+            with Session(bind=conn, expire_on_commit=False) as session:
+                journal = self._add_entry(session, entry)
+                session.commit()
+        self._written([journal.ts])
+        return journal
+
+    @instrumented
+    def create_journal_entries(
+        self,
+        entries: Iterable[BulkEntry],
+        chunk_size: int = JournalRepoBase.BULK_CHUNK_SIZE,
+        return_ids: bool = False,
+    ) -> Union[int, list[int]]:
+        """
+        Bulk load journal entries.  Rather than one ORM object and one commit per entry,
+        entries are sent as executemany Core inserts, committing once per chunk.
+        entries:  iterable of log strings or (timestamp, log string) pairs
+        chunk_size:  how many entries to write per transaction
+        return_ids:  if True, return the new ids in input order instead of a count
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
 
+        ids = []
+        count = 0
+        for chunk in _chunks(_bulk_rows(entries), chunk_size):
+            chunk_ids = self._insert_chunk(chunk)
+            if return_ids:
+                ids.extend(chunk_ids)
+            count += len(chunk)
+        return ids if return_ids else count
+
+    def _insert_chunk(self, chunk: list[dict]) -> list[int]:
+        """
+        Writes one chunk of create_journal_entries in its own transaction
+        """
+        with self._begin() as conn:
+            ids = self._write_chunk(conn, chunk)
+        self._written([row["ts"] for row in chunk])
+        return ids
+
+    @instrumented
+    def merge_entries(
+        self,
+        entries: Iterable[MergeEntry],
+        origin: str,
+        chunk_size: int = JournalRepoBase.BULK_CHUNK_SIZE,
+    ) -> int:
+        """
+        Adds entries from another journal, skipping any whose uuid this journal has
+        already seen (in journal_change, so archived entries count), and returns how
+        many were new.  Merging the same entries again is therefore harmless.  The
+        new entries are logged with origin, so they are not sent back out as this
+        journal's own.
+        entries:  iterable of (uuid, timestamp, log string)
+        origin:  node id of the journal they came from
+        chunk_size:  how many entries to write per transaction
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        merged = 0
+        for chunk in _chunks(entries, chunk_size):
+            with self._begin() as conn:
+                rows = self._merge_chunk(conn, chunk, origin)
+            self._written([row["ts"] for row in rows])
+            merged += len(rows)
+        return merged
+
+    def _written(self, timestamps: list[datetime]) -> None:
+        """
+        Evicts the cached results that newly committed entries change
+        """
+        if self.cache is not None:
+            self.cache.written(timestamps)
+
+    @instrumented
+    @cached(_newest_span)
     def get_last_n_entries(self, number_to_retrieve: int) -> [Journal]:
         """
         Retrieve last n journal entries
@@ -31,93 +554,332 @@ class JournalRepo:
         """
         with Session(self.engine) as session:
             return session.scalars(
-                select(Journal).order_by(Journal.id.desc()).limit(number_to_retrieve)
+                self._page_statement([Journal], None, number_to_retrieve)
             ).all()
 
-    def _get_today_range(self) -> (datetime, datetime):
-        """
-        Utility method to abstract out getting the start and end of today
-        Returns a tuple of datetimes (start_of_day, end_of_day):
-        start_of_day = today's date, time of 00:00:00
-        end_of_day = today's date, time of 23:59:59
-        """
-        today = datetime.now()
-        today_start = datetime(
-            year=today.year,
-            month=today.month,
-            day=today.day,
-            hour=0,
-            minute=0,
-            second=0,
+    @instrumented
+    @cached(_page_span)
+    def get_entries_before(
+        self, before_id: Optional[int], number_to_retrieve: int
+    ) -> [Journal]:
+        """
+        Keyset pagination over the journal, newest first.  Returns up to
+        number_to_retrieve entries with ids below before_id, so fetching the next page
+        is a primary key range scan no matter how deep into the history it is, unlike
+        OFFSET which has to walk every skipped row.
+        before_id:  id of the oldest entry already seen, None to start from the newest
+        number_to_retrieve:  page size
+        """
+        statement = self._page_statement([Journal], before_id, number_to_retrieve)
+        with Session(self.engine) as session:
+            return session.scalars(statement).all()
+
+    @instrumented
+    def get_last_n_records(self, number_to_retrieve: int) -> [JournalRecord]:
+        """
+        Read-only version of get_last_n_entries, returning JournalRecords
+        number_to_retrieve: limits results to this many
+        """
+        return self.get_records_before(None, number_to_retrieve)
+
+    @instrumented
+    @cached(_page_span)
+    def get_records_before(
+        self, before_id: Optional[int], number_to_retrieve: int
+    ) -> [JournalRecord]:
+        """
+        Read-only version of get_entries_before, returning JournalRecords.  This is what
+        the history view pages through.
+        before_id:  id of the oldest entry already seen, None to start from the newest
+        number_to_retrieve:  page size
+        """
+        statement = self._page_statement(
+            [Journal.id, Journal.ts, Journal.log], before_id, number_to_retrieve
         )
+        with self.engine.connect() as conn:
+            return _records(conn.execute(statement))
 
-        today_end = datetime(
-            year=today.year,
-            month=today.month,
-            day=today.day,
-            hour=23,
-            minute=59,
-            second=59,
+    @instrumented
+    @cached(_newest_span)
+    def get_records_after(
+        self, after_id: int, number_to_retrieve: int
+    ) -> [JournalRecord]:
+        """
+        The other direction of get_records_before:  JournalRecords with ids above
+        after_id, oldest first, for the history view scrolling back up to entries it
+        let go of
+        after_id:  id of the newest entry already seen
+        number_to_retrieve:  page size
+        """
+        statement = self._newer_page_statement(
+            [Journal.id, Journal.ts, Journal.log], after_id, number_to_retrieve
         )
-        return (today_start, today_end)
+        with self.engine.connect() as conn:
+            return _records(conn.execute(statement))
 
-    def _get_yesterday_range(self):
+    @instrumented
+    @cached(_range_span)
+    def get_entries_for_range(
+        self, start, end, tags: Optional[Iterable[str]] = None
+    ) -> [Journal]:
         """
-        Utility method to abstract out getting the start and end of yesterday
-        Returns a tuple of datetimes (start_of_day, end_of_day):
-        start_of_day = yesterday's date, time of 00:00:00
-        end_of_day = yesterday's date, time of 23:59:59
+        Given two datetime objects, return all Journal entries falling in that range,
+        oldest first.  Both the filter and the ordering are satisfied by the index on
+        journal.ts, so this is a single index range scan with no sort step.  Ranges are
+        half-open, see work_journal.core.timeframes.
+        start:  datetime, start of range (included)
+        end: datetime, end of range (excluded)
+        tags:  only entries with any of these tags (with or without the #)
         """
-        (today_start, today_end) = self._get_today_range()
-        delta = timedelta(days=-1)
-        return (today_start + delta, today_end + delta)
 
-    def _get_date_range_this_week(self):
+        entries = []
+        with self.engine.connect() as conn:
+            for since, until, years in self._archive_batches(conn, start, end):
+                statement = self._entries_statement(since, until, years, tags)
+                with attached(conn, self.archive_dir, years):
+                    with Session(bind=conn) as session:
+                        entries.extend(session.scalars(statement))
+        return entries
+
+    @instrumented
+    @cached(_range_span)
+    def get_records_for_range(
+        self, start, end, tags: Optional[Iterable[str]] = None
+    ) -> [JournalRecord]:
         """
-        Utility method to abstract out getting the start and end of the current week
-        Returns a tuple of datetimes (start_of_day, end_of_day):
-        start_of_day = Monday's date, time of 00:00:00
-        end_of_day = Sunday's date, time of 23:59:59
+        Read-only version of get_entries_for_range, returning JournalRecords built from
+        Core rows rather than ORM objects.  Several times quicker to build and a
+        fraction of the memory for big ranges, see benchmarks/bench_records.py.
+        start:  datetime, start of range (included)
+        end: datetime, end of range (excluded)
+        tags:  only entries with any of these tags (with or without the #)
         """
-        (today_start, today_end) = self._get_today_range()
-        delta_to_start_of_week = timedelta(days=(-1 * today_start.weekday()))
-        delta_to_end_of_week = timedelta(days=6 - today_start.weekday())
-        start_of_week = today_start + delta_to_start_of_week
-        end_of_week = today_end + delta_to_end_of_week
-        return (start_of_week, end_of_week)
+        records = []
+        with self.engine.connect() as conn:
+            for since, until, years in self._archive_batches(conn, start, end):
+                statement = self._range_statement(since, until, years, tags=tags)
+                with attached(conn, self.archive_dir, years):
+                    records.extend(_records(conn.execute(statement)))
+        return records
 
-    def get_entries_for_range(self, start, end):
+    @instrumented
+    def iter_entries_for_range(
+        self,
+        start,
+        end,
+        batch_size: int = JournalRepoBase.STREAM_BATCH_SIZE,
+        tags: Optional[Iterable[str]] = None,
+    ) -> Iterator[Journal]:
         """
-        Given two datetime objects, return all Journal entries falling in that range
-        start:  datetime, start of range
-        end: datetime, end of range
+        Streaming version of get_entries_for_range for large ranges.  Rows are fetched
+        from the cursor batch_size at a time (yield_per), so only one batch of Journal
+        objects is alive at once no matter how big the range is.  The session stays
+        open until the generator is exhausted or closed.
+        start:  datetime, start of range (included)
+        end: datetime, end of range (excluded)
+        batch_size:  how many rows to fetch per round trip
+        tags:  only entries with any of these tags (with or without the #)
         """
+        with self.engine.connect() as conn:
+            for since, until, years in self._archive_batches(conn, start, end):
+                statement = self._entries_statement(
+                    since, until, years, tags
+                ).execution_options(yield_per=batch_size)
+                with attached(conn, self.archive_dir, years):
+                    with Session(bind=conn) as session:
+                        result = session.scalars(statement)
+                        try:
+                            yield from result
+                        finally:
+                            # Archives can't be detached while a cursor is open on them
+                            result.close()
 
+    @instrumented
+    def iter_rows_for_range(
+        self,
+        start,
+        end,
+        batch_size: int = JournalRepoBase.STREAM_BATCH_SIZE,
+        tags: Optional[Iterable[str]] = None,
+    ) -> Iterator[Row]:
+        """
+        Like iter_entries_for_range, but yields plain Core (ts, log) rows instead of ORM
+        objects.  This is the feed for the exporters in work_journal.core.export.
+        start:  datetime, start of range (included)
+        end: datetime, end of range (excluded)
+        batch_size:  how many rows to fetch per round trip
+        tags:  only entries with any of these tags (with or without the #)
+        """
+        with self.engine.connect() as conn:
+            for since, until, years in self._archive_batches(conn, start, end):
+                statement = self._range_statement(
+                    since, until, years, ("ts", "log"), tags
+                )
+                with attached(conn, self.archive_dir, years):
+                    result = conn.execute(
+                        statement, execution_options={"yield_per": batch_size}
+                    )
+                    try:
+                        yield from result
+                    finally:
+                        result.close()
+
+    @instrumented
+    def archive_before(self, cutoff: datetime) -> int:
+        """
+        Moves entries older than cutoff out of the journal table into one SQLite file
+        per year in archive_dir, and returns how many were moved.  The range queries
+        still find them, but the history, last n and search only see the journal table.
+
+        Each year is copied with INSERT OR IGNORE and committed, then deleted in a
+        second transaction, so an interrupted run is finished by running it again.
+        The newest entry always stays behind, so SQLite never hands out an archived id
+        again.
+        cutoff:  datetime, entries before this are archived
+        """
+        with self.engine.connect() as conn:
+            moved = self._archive(conn, cutoff)
+        # Archived entries drop out of the history and search, and lose their uuid
+        if self.cache is not None:
+            self.cache.clear()
+        return moved
+
+    @instrumented
+    @cached(_range_span)
+    def search(
+        self,
+        query: str,
+        start=None,
+        end=None,
+        limit: int = JournalRepoBase.SEARCH_LIMIT,
+    ) -> [Journal]:
+        """
+        Full text search of journal logs through the journal_fts index, best matches
+        first (bm25).  Words are stemmed, so "deploy" also finds "deployed".
+        query:  an FTS5 query, e.g. 'release', 'deploy*', 'bug NOT flaky', '"code review"'
+                Words with punctuation in them, like foo-bar, are searched as phrases.
+                Raises ValueError for a query FTS5 can't parse.
+        start:  optional datetime, only entries at or after this time
+        end:  optional datetime, only entries before this time
+        limit:  maximum number of entries to return
+        """
+        try:
+            with Session(self.engine) as session:
+                return session.scalars(
+                    self._search_statement(query, start, end, limit)
+                ).all()
+        except OperationalError as error:
+            if fts.is_query_error(error):
+                raise ValueError(f"Invalid search {query!r}: {error.orig}") from None
+            raise
+
+    @instrumented
+    @cached(_range_span)
+    def get_tag_counts(self, start=None, end=None) -> [Row]:
+        """
+        How many entries carry each tag, most used first, as (tag, count) rows.  Without
+        a range this is answered from the journal_tag index alone; with one, only the
+        entries in the range (found through the index on journal.ts) are looked up in
+        journal_tag.
+        start:  optional datetime, only entries at or after this time
+        end:  optional datetime, only entries before this time
+        """
+        with self.engine.connect() as conn:
+            return self._tag_counts(conn, start, end)
+
+    @instrumented
+    @cached(_summary_span)
+    def get_summary(self, granularity: str, start, end) -> [JournalRollup]:
+        """
+        Activity summary from the precomputed rollup table:  one JournalRollup (entry
+        count, first and last timestamp) per day, week or month with any entries, oldest
+        first.  Answered without touching the journal table at all.
+        granularity:  rollup.GRANULARITY_DAY, GRANULARITY_WEEK or GRANULARITY_MONTH
+        start:  datetime, the period containing start is the first one returned
+        end: datetime, the period containing the moment before end is the last one
+             returned, so the periods are those overlapping the half-open [start, end)
+        """
         with Session(self.engine) as session:
             return session.scalars(
-                select(Journal).where(Journal.ts.between(start, end))
+                self._summary_statement(granularity, start, end)
             ).all()
 
+    @instrumented
     def get_today_entries(self) -> [Journal]:
         """
         Uses get_entries_for_range to return all Journal entries with today's date
         """
-        (start, end) = self._get_today_range()
-        return self.get_entries_for_range(start, end)
+        return self.get_entries_for_range(
+            *timeframes.preset(timeframes.TIMEFRAME_TODAY)
+        )
 
+    @instrumented
     def get_yesterday_entries(self) -> [Journal]:
         """
         Uses get_entries_for_range to return all Journal entries with yesterday's date
         """
-        (start, end) = self._get_yesterday_range()
-        print(start)
-        print(end)
-        return self.get_entries_for_range(start, end)
+        return self.get_entries_for_range(
+            *timeframes.preset(timeframes.TIMEFRAME_YESTERDAY)
+        )
 
+    @instrumented
     def get_last_two_week_entries(self) -> [Journal]:
         """
-        Uses get_entries_for_range to return all Journal entries for the prior two weeks
+        Uses get_entries_for_range to return all Journal entries for this week and the
+        one before
         """
-        (start_of_week, end_of_period) = self._get_date_range_this_week()
-        start_of_period = start_of_week + timedelta(days=-7)
-        return self.get_entries_for_range(start_of_period, end_of_period)
+        return self.get_entries_for_range(
+            *timeframes.preset(timeframes.TIMEFRAME_TWO_WEEKS)
+        )
+
+
+def _records(result) -> [JournalRecord]:
+    """
+    JournalRecords from a result of (id, ts, log) rows
+    """
+    return list(map(JournalRecord._make, result))
+
+
+def _sqlite_ts(ts: datetime) -> str:
+    """
+    ts the way SQLAlchemy's DateTime stores it in SQLite, 2024-05-01 09:30:00.000000
+    """
+    return ts.replace(tzinfo=None).isoformat(" ", "microseconds")
+
+
+def _bulk_rows(entries: Iterable[BulkEntry]) -> Iterator[dict]:
+    """
+    Insert parameters for bulk entries
+    """
+    for entry in entries:
+        if isinstance(entry, str):
+            yield {"uuid": new_uuid(), "ts": datetime.now(), "log": entry}
+        else:
+            (ts, log) = entry
+            yield {"uuid": new_uuid(), "ts": ts, "log": log}
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    """
+    items in lists of up to size
+    """
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _range_filter(source, start, end, tags: Optional[Iterable[str]]) -> list:
+    """
+    WHERE clauses for the entries of source (journal or an archive) between start and
+    end with any of tags.  The tags are looked up through ix_journal_tag_tag.
+    """
+    clauses = [source.c.ts >= start, source.c.ts < end]
+    if tags is not None:
+        clauses.append(
+            source.c.id.in_(
+                select(JournalTag.journal_id).where(
+                    JournalTag.tag.in_(normalize_tags(tags))
+                )
+            )
+        )
+    return clauses
@@ -0,0 +1,171 @@
+"""
+This module contains a write-behind front end for JournalRepo, for callers that log
+entries faster than one transaction (and one fsync) per entry can keep up with.
+"""
+import atexit
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Optional
+from . import Journal, JournalRepo
+
+
+class BufferedJournalWriter:
+    """
+    Group commit for journal entries.  write() only queues the entry in memory and
+    returns at once; a background thread flushes the queue in a single transaction
+    whenever it holds max_entries entries or the oldest entry has waited max_delay
+    seconds, whichever comes first.  So a burst of N entries costs one commit instead of
+    N, and throughput grows with the burst size rather than being capped by fsyncs.
+
+    Entries still in memory are lost if the process dies, so call close() (or use the
+    writer as a context manager) on the way out.  As a last resort close() is also
+    registered with atexit.
+    """
+
+    MAX_ENTRIES = 500
+    MAX_DELAY = 0.25
+
+    def __init__(
+        self,
+        repo: JournalRepo,
+        max_entries: int = MAX_ENTRIES,
+        max_delay: float = MAX_DELAY,
+        on_flush: Optional[Callable[[list[Journal], list[int]], None]] = None,
+    ) -> None:
+        """
+        repo:  The journal repo to write through
+        max_entries:  flush as soon as this many entries are queued
+        max_delay:  seconds an entry may wait before it is flushed
+        on_flush:  called with each batch of Journals and their new ids once they are
+                   committed, on the flushing thread, in commit order.  Must not block.
+        """
+        self.repo = repo
+        self.max_entries = max_entries
+        self.max_delay = max_delay
+        self.on_flush = on_flush
+        self.pending: list[Journal] = []
+        self.first_pending_at = None
+        self.queued = 0
+        self.committed = 0
+        self.error: Optional[BaseException] = None
+        self.closed = False
+        self.condition = threading.Condition()
+        # Held for the whole of a flush, so batches are committed in the order queued
+        self.flush_lock = threading.Lock()
+        self.flusher = threading.Thread(
+            target=self._run, name="journal_writer", daemon=True
+        )
+        self.flusher.start()
+        atexit.register(self.close)
+
+    def write(self, entry: str, ts: Optional[datetime] = None) -> Journal:
+        """
+        Queue a journal entry.  The returned Journal gets its id once it is flushed.
+        entry:  The string to log
+        ts:  optional timestamp, defaults to now
+        """
+        journal = Journal(log=entry, ts=ts or datetime.now())
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("BufferedJournalWriter is closed")
+            if not self.pending:
+                self.first_pending_at = time.monotonic()
+            self.pending.append(journal)
+            self.queued += 1
+            if len(self.pending) == 1 or len(self.pending) >= self.max_entries:
+                self.condition.notify_all()
+        return journal
+
+    def sync(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every entry queued so far has been committed.  Concurrent callers
+        share the same flush, which is what makes this a group commit.  Returns False on
+        timeout, raises if the last flush failed.
+        """
+        with self.condition:
+            target = self.queued
+            done = self.condition.wait_for(
+                lambda: self.committed >= target or self.error is not None, timeout
+            )
+            if self.error is not None:
+                raise self.error
+            return done
+
+    def flush(self) -> int:
+        """
+        Write everything queued right now, on the calling thread.  Returns how many
+        entries were written.
+        """
+        with self.flush_lock:
+            with self.condition:
+                batch = self.pending
+                self.pending = []
+            if not batch:
+                return 0
+            try:
+                ids = self.repo.create_journal_entries(
+                    ((journal.ts, journal.log) for journal in batch),
+                    chunk_size=len(batch),
+                    return_ids=True,
+                )
+            except Exception as error:
+                with self.condition:
+                    # Put the batch back in front of anything queued since
+                    self.pending[:0] = batch
+                    self.error = error
+                    self.condition.notify_all()
+                raise
+            for journal, new_id in zip(batch, ids):
+                journal.id = new_id
+            with self.condition:
+                self.committed += len(batch)
+                self.error = None
+                self.condition.notify_all()
+            if self.on_flush is not None:
+                self.on_flush(batch, ids)
+            return len(batch)
+
+    def close(self) -> None:
+        """
+        Flush whatever is queued and stop the background thread.  Safe to call twice.
+        """
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            self.condition.notify_all()
+        self.flusher.join()
+        atexit.unregister(self.close)
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def _run(self) -> None:
+        """
+        Background thread:  waits for a size or time threshold, then flushes
+        """
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or self.closed)
+                if self.closed:
+                    return
+                while len(self.pending) < self.max_entries and not self.closed:
+                    remaining = (
+                        self.first_pending_at + self.max_delay - time.monotonic()
+                    )
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                if self.closed:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                # Kept in self.error for sync() callers; try again after a pause
+                with self.condition:
+                    self.condition.wait_for(lambda: self.closed, self.max_delay)
@@ -0,0 +1,217 @@
+"""
+This module caches the results of JournalRepo's read methods, for views that ask the
+same question over and over:  the history after every save, re-running a report.
+
+Every cached result records the span of journal timestamps it depends on, so a write
+only evicts the results whose span contains one of the new entries' timestamps, and a
+cached "Last Two Weeks" survives importing last year's entries.  A result that depends
+on the newest entries rather than on a period (the first page of the history) spans
+every timestamp; one that new entries can't change (an older page) spans none.
+
+Writes by anything else (another process, another JournalRepo) are caught through
+PRAGMA data_version, see ChangeMonitor, and clear the whole cache.  The repo's own
+writes are made in transactions on the monitor's connection, whose data_version is what
+every later check compares against, and a connection's own commits leave it alone.  So
+they never count as foreign, while a foreign commit landing right before or after one
+of them still does.  The time to live bounds how long a result is served where nothing
+can be watched (databases other than a SQLite file).
+
+Cached results are shared by every caller, so treat them as read-only.  Lists are
+copied on the way out, the objects in them are not.
+"""
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Hashable, Iterable, Optional
+from sqlalchemy import Engine
+from work_journal.core.timeframes import Timeframe
+from .change_monitor import ChangeMonitor
+
+# The span of a result that any new entry can change
+EVERYTHING = Timeframe(datetime.min, datetime.max)
+
+
+class ResultCache:
+    """
+    LRU cache of query results for one journal, bounded by size and age.  Thread safe.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        max_entries: int = 128,
+        ttl: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+        monitor: Optional[ChangeMonitor] = None,
+    ) -> None:
+        """
+        engine:  engine of the journal, watched for writes made elsewhere
+        max_entries:  most results kept, the least recently used goes first
+        ttl:  seconds a result is served for at most
+        clock:  seconds, for tests
+        monitor:  the ChangeMonitor the repository writes through (see
+                  ChangeMonitor.writing), by default one of the cache's own
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        # key -> (expires at, span, value)
+        self.entries = OrderedDict()
+        # Bumped by every invalidation, so a result read before a write isn't stored
+        # after it
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.invalidated = 0
+        self.expired = 0
+        self.monitor = monitor if monitor is not None else ChangeMonitor(engine)
+        # The monitor's count of changes made elsewhere when the cache was last cleared
+        self.changes = self.monitor.changes()
+
+    def get_or_load(
+        self, key: Hashable, span: Optional[Timeframe], load: Callable[[], Any]
+    ) -> Any:
+        """
+        The cached result for key, or else load()'s, which is cached
+        span:  timestamps whose entries the result depends on, None if new entries
+               can't change it
+        """
+        # Outside the lock, as the check waits for a write in progress on the monitor
+        changes = self.monitor.changes()
+        with self.lock:
+            if changes > self.changes:
+                self.changes = changes
+                self._clear()
+            cached = self.entries.get(key)
+            if cached is not None:
+                (expires, _, value) = cached
+                if expires > self.clock():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return _copy(value)
+                del self.entries[key]
+                self.expired += 1
+            self.misses += 1
+            generation = self.generation
+
+        value = load()
+        with self.lock:
+            if generation == self.generation:
+                self.entries[key] = (self.clock() + self.ttl, span, value)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    self.evicted += 1
+        return _copy(value)
+
+    def written(self, timestamps: Iterable[datetime]) -> None:
+        """
+        Evicts the results that entries with these timestamps, just committed, change
+        """
+        timestamps = sorted(timestamps)
+        if not timestamps:
+            return
+        with self.lock:
+            self.generation += 1
+            stale = [
+                key
+                for (key, (_, span, _)) in self.entries.items()
+                if span is not None and _any_within(timestamps, span)
+            ]
+            for key in stale:
+                del self.entries[key]
+            self.invalidated += len(stale)
+
+    def clear(self) -> None:
+        """
+        Evicts everything, e.g. after entries were moved or removed
+        """
+        with self.lock:
+            self._clear()
+
+    def _clear(self) -> None:
+        self.generation += 1
+        self.invalidated += len(self.entries)
+        self.entries.clear()
+
+    def snapshot(self) -> dict:
+        """
+        A copy of the counters:  {"hits", "misses", "hit_rate", "entries", "evicted"
+        (least recently used), "invalidated" (by writes), "expired" (ttl)}
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.entries),
+                "evicted": self.evicted,
+                "invalidated": self.invalidated,
+                "expired": self.expired,
+            }
+
+    def close(self) -> None:
+        """
+        Release the connection used to watch for writes made elsewhere
+        """
+        self.monitor.close()
+
+
+def cached(span: Callable[..., Optional[Timeframe]]):
+    """
+    Decorator for read methods of a repository with a cache attribute (a ResultCache,
+    or None for no caching).  Results are cached per method and arguments, defaults
+    filled in and collections (e.g. tags) as sorted tuples, so equivalent calls share
+    a result.
+    span:  called with the method's arguments, returns the span of the result
+    """
+
+    def decorate(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.cache is None:
+                return method(self, *args, **kwargs)
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = {
+                name: _hashable(value)
+                for (name, value) in list(bound.arguments.items())[1:]
+            }
+            return self.cache.get_or_load(
+                (method.__name__, *arguments.values()),
+                span(**arguments),
+                lambda: method(self, **arguments),
+            )
+
+        return wrapper
+
+    return decorate
+
+
+def _hashable(value):
+    if isinstance(value, (str, bytes)) or not isinstance(value, Iterable):
+        return value
+    return tuple(sorted(set(value)))
+
+
+def _any_within(timestamps: list[datetime], span: Timeframe) -> bool:
+    """
+    Whether any of the sorted timestamps falls in span
+    """
+    position = bisect_left(timestamps, span.start)
+    return position < len(timestamps) and span.contains(timestamps[position])
+
+
+def _copy(value):
+    return list(value) if isinstance(value, list) else value
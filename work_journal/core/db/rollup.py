@@ -0,0 +1,103 @@
+"""
+This module maintains journal_rollup, the per day/week/month activity summary that
+backs JournalRepo.get_summary.
+
+JournalRepo folds every batch it writes into the rollup in the same transaction, one
+upsert per period touched rather than per entry, so a bulk load of a year of entries
+costs a few hundred extra rows of work.  Rollups count entries ever written through the
+repo; deletes (e.g. moving old entries to an archive) deliberately leave them alone.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from . import JournalRollup
+
+GRANULARITY_DAY = "day"
+GRANULARITY_WEEK = "week"
+GRANULARITY_MONTH = "month"
+GRANULARITIES = (GRANULARITY_DAY, GRANULARITY_WEEK, GRANULARITY_MONTH)
+
+
+def period_start(granularity: str, day: date) -> date:
+    """
+    The first day of the period containing day.  Weeks are ISO weeks, starting Monday.
+    """
+    if granularity == GRANULARITY_DAY:
+        return day
+    if granularity == GRANULARITY_WEEK:
+        return day - timedelta(days=day.weekday())
+    if granularity == GRANULARITY_MONTH:
+        return day.replace(day=1)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def period_end(granularity: str, day: date) -> date:
+    """
+    The first day of the period after the one containing day
+    """
+    start = period_start(granularity, day)
+    if granularity == GRANULARITY_DAY:
+        return start + timedelta(days=1)
+    if granularity == GRANULARITY_WEEK:
+        return start + timedelta(days=7)
+    return (start + timedelta(days=31)).replace(day=1)
+
+
+def rollup_upsert(dialect_name: str, timestamps: Iterable[datetime]):
+    """
+    Builds the statement adding a batch of new entries, given by their timestamps, to
+    journal_rollup.  Returns None for an empty batch, or for a database without an
+    upsert we know how to write, in which case there simply are no rollups.
+    """
+    if dialect_name == "sqlite":
+        (insert, least, greatest) = (sqlite.insert, func.min, func.max)
+    elif dialect_name == "postgresql":
+        (insert, least, greatest) = (postgresql.insert, func.least, func.greatest)
+    else:
+        return None
+
+    # One pass over the entries to get per day totals, then roll the days up
+    days = {}
+    for ts in timestamps:
+        day = days.get(ts.date())
+        if day is None:
+            days[ts.date()] = [1, ts, ts]
+        else:
+            day[0] += 1
+            if ts < day[1]:
+                day[1] = ts
+            elif ts > day[2]:
+                day[2] = ts
+    if not days:
+        return None
+
+    periods = defaultdict(lambda: [0, None, None])
+    for day, (count, first_ts, last_ts) in days.items():
+        for granularity in GRANULARITIES:
+            period = periods[(granularity, period_start(granularity, day))]
+            period[0] += count
+            period[1] = first_ts if period[1] is None else min(period[1], first_ts)
+            period[2] = last_ts if period[2] is None else max(period[2], last_ts)
+
+    statement = insert(JournalRollup).values(
+        [
+            {
+                "granularity": granularity,
+                "period_start": start,
+                "entry_count": count,
+                "first_ts": first_ts,
+                "last_ts": last_ts,
+            }
+            for ((granularity, start), (count, first_ts, last_ts)) in periods.items()
+        ]
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[JournalRollup.granularity, JournalRollup.period_start],
+        set_={
+            "entry_count": JournalRollup.entry_count + statement.excluded.entry_count,
+            "first_ts": least(JournalRollup.first_ts, statement.excluded.first_ts),
+            "last_ts": greatest(JournalRollup.last_ts, statement.excluded.last_ts),
+        },
+    )
@@ -0,0 +1,145 @@
+"""
+This module makes sure a database has the application's tables, without paying for
+Base.metadata.create_all on every start.
+
+create_all reflects every table (and the FTS table) before deciding there is nothing to
+do.  Instead a SQLite database records SCHEMA_VERSION in PRAGMA user_version once its
+schema is in place, so a warm start costs a single PRAGMA read, and each engine is only
+checked once per process however many repos are built on it.  ensure_schema_async does
+the same for an asyncio engine.
+
+create_all only adds missing tables, though, never the columns, indexes and triggers the
+migrations add to existing ones.  So an existing database is only brought up to
+SCHEMA_VERSION if it already has all of those, and otherwise refused with
+SchemaOutOfDate rather than opened with half a schema.  migrate then runs the alembic
+migrations on it, for the app, whose users have no alembic to run.
+"""
+import os
+import weakref
+from sqlalchemy import inspect
+from . import Base, fts
+
+# The number of alembic migrations, bump alongside every new one.  migrate relies on it
+# to tell which revision a database built by create_all is at.
+SCHEMA_VERSION = 8
+# What a database created before there were migrations has to be stamped with
+INITIAL_REVISION = "e535a77e6718"
+# The alembic scripts, next to the work_journal package both in a checkout and in the
+# PyInstaller bundle (see work_journal.spec)
+MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    os.pardir,
+    os.pardir,
+    "alembic",
+)
+
+_checked = weakref.WeakSet()
+
+
+class SchemaOutOfDate(Exception):
+    """
+    Raised by ensure_schema for an existing database that needs `alembic upgrade head`,
+    or migrate
+    """
+
+
+def ensure_schema(engine) -> None:
+    """
+    Creates the tables of a new database, unless this database is already known to be
+    up to date.  Raises SchemaOutOfDate if an existing one is missing migrations.
+    """
+    if engine in _checked:
+        return
+    with engine.begin() as conn:
+        _create_schema(conn)
+    _checked.add(engine)
+
+
+async def ensure_schema_async(engine) -> None:
+    """
+    ensure_schema for an AsyncEngine
+    """
+    if engine.sync_engine in _checked:
+        return
+    async with engine.begin() as conn:
+        await conn.run_sync(_create_schema)
+    _checked.add(engine.sync_engine)
+
+
+def migrate(engine) -> None:
+    """
+    Brings the database up to date the way `alembic upgrade head` does.  One without
+    alembic_version is stamped first, with the revision create_all built it at
+    (SCHEMA_VERSION counts the migrations, so its user_version says which), or
+    INITIAL_REVISION if it is from before there were migrations.
+    """
+    # Only needed for the odd upgrade, so it stays out of the app's startup
+    from alembic import command
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config()
+    config.set_main_option("script_location", os.path.normpath(MIGRATIONS_DIR))
+    with engine.begin() as conn:
+        # alembic/env.py migrates this connection, inside this transaction
+        config.attributes["connection"] = conn
+        if not inspect(conn).has_table("alembic_version"):
+            revision = INITIAL_REVISION
+            if conn.dialect.name == "sqlite":
+                built = conn.exec_driver_sql("PRAGMA user_version").scalar()
+                revisions = list(ScriptDirectory.from_config(config).walk_revisions())
+                if 0 < built <= len(revisions):
+                    # walk_revisions goes from head back to the first migration
+                    revision = revisions[-built].revision
+            command.stamp(config, revision)
+        command.upgrade(config, "head")
+
+
+def _create_schema(conn) -> None:
+    sqlite = conn.dialect.name == "sqlite"
+    if sqlite:
+        if conn.exec_driver_sql("PRAGMA user_version").scalar() >= SCHEMA_VERSION:
+            return
+    _check_migrated(conn)
+    Base.metadata.create_all(conn)
+    if sqlite:
+        conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def _check_migrated(conn) -> None:
+    """
+    Raises SchemaOutOfDate unless the database is new (create_all builds all of it) or
+    has every table, column and index of the metadata, plus the FTS index
+    """
+    inspector = inspect(conn)
+    existing = set(inspector.get_table_names())
+    if not existing & set(Base.metadata.tables):
+        return
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            missing.append(table.name)
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing += [
+            f"{table.name}.{column.name}"
+            for column in table.columns
+            if column.name not in columns
+        ]
+        missing += [index.name for index in table.indexes if index.name not in indexes]
+    if conn.dialect.name == "sqlite":
+        names = set(conn.exec_driver_sql("SELECT name FROM sqlite_master").scalars())
+        if fts.FTS_TABLE not in names:
+            missing.append(fts.FTS_TABLE)
+    if missing:
+        if "alembic_version" in existing:
+            command = "alembic upgrade head"
+        else:
+            # Created with create_all before there were migrations
+            command = f"alembic stamp {INITIAL_REVISION} && alembic upgrade head"
+        raise SchemaOutOfDate(
+            f"The database schema is out of date (missing {', '.join(missing)}), "
+            f"run `{command}` to migrate it"
+        )
@@ -0,0 +1,188 @@
+"""
+This module syncs journals kept on several machines through a shared directory (a
+network share, or a folder synced by Dropbox, Syncthing and the like).
+
+Every journal has a node id, and owns the subdirectory of the shared directory named
+after it.  Exporting writes the entries logged on this machine since its last export
+to a new delta file there, so each file only holds what is new.  Merging reads the
+files of every other node newer than that node's high-water mark in sync_peer, and
+merges them through JournalRepo.merge_entries, which skips entries it has seen before.
+Sync cost therefore scales with what changed, not with the size of the journal, and
+syncing again, or merging a file twice after an interruption, does no harm.
+
+Delta files are JSON lines, one {"seq", "uuid", "ts", "log"} object per entry, named
+after the first and last change log seq they cover.  They are written under a temporary
+name and renamed into place, so a peer never reads half a file.
+
+Entries are synced as they were logged:  later edits, deletes and archived entries that
+were never exported are not.
+"""
+import json
+import os
+import re
+from datetime import datetime
+from typing import Iterator, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.dialects import sqlite
+from . import Journal, JournalChange, SyncPeer
+from .config_repo import ConfigRepo
+from .entities import new_uuid
+from .instrumentation import instrumented
+from .journal_repo import JournalRepo, MergeEntry
+
+DELTA_FILE = "{first:012d}-{last:012d}.jsonl"
+DELTA_PATTERN = re.compile(r"^(\d{12})-(\d{12})\.jsonl$")
+
+
+class JournalSync:
+    """
+    Syncs the journal behind repo with its peers through shared_dir
+    """
+
+    EXPORT_BATCH_SIZE = 1_000
+
+    def __init__(
+        self,
+        repo: JournalRepo,
+        shared_dir: str,
+        config_repo: Optional[ConfigRepo] = None,
+    ) -> None:
+        """
+        repo:  the journal to sync
+        shared_dir:  directory shared by all the machines' journals
+        config_repo:  where the node id is kept, defaults to one on repo's engine
+        """
+        if repo.engine.dialect.name != "sqlite":
+            raise ValueError("Only a SQLite journal can be synced")
+        self.repo = repo
+        self.engine = repo.engine
+        self.shared_dir = shared_dir
+        config_repo = config_repo or ConfigRepo(repo.engine)
+        self.node_id = config_repo.get(ConfigRepo.CONFIG_SYNC_NODE_ID)
+        if self.node_id is None:
+            self.node_id = new_uuid()
+            config_repo.set(ConfigRepo.CONFIG_SYNC_NODE_ID, self.node_id)
+
+    def sync(self) -> Tuple[int, int]:
+        """
+        Exports this journal's new entries, then merges everyone else's.  Returns
+        (entries exported, entries merged).
+        """
+        return (self.export(), self.merge())
+
+    @instrumented
+    def export(self) -> int:
+        """
+        Writes the entries logged here since the last export to a new delta file, and
+        returns how many there were
+        """
+        directory = os.path.join(self.shared_dir, self.node_id)
+        os.makedirs(directory, exist_ok=True)
+        # The files already there say how far previous exports got
+        exported = max((last for (_, last, _) in _delta_files(directory)), default=0)
+
+        with self.engine.connect() as conn:
+            result = conn.execute(
+                select(JournalChange.seq, Journal.uuid, Journal.ts, Journal.log)
+                .join(Journal, Journal.uuid == JournalChange.uuid)
+                .where(JournalChange.seq > exported, JournalChange.origin.is_(None))
+                .order_by(JournalChange.seq),
+                execution_options={"yield_per": self.EXPORT_BATCH_SIZE},
+            )
+            temporary = os.path.join(directory, f".{new_uuid()}.tmp")
+            count = 0
+            try:
+                with open(temporary, "w", encoding="utf-8", newline="\n") as fh:
+                    for seq, uuid, ts, log in result:
+                        if not count:
+                            first = seq
+                        entry = {
+                            "seq": seq,
+                            "uuid": uuid,
+                            "ts": ts.isoformat(),
+                            "log": log,
+                        }
+                        fh.write(json.dumps(entry) + "\n")
+                        count += 1
+                        last = seq
+                if count:
+                    os.replace(
+                        temporary,
+                        os.path.join(
+                            directory, DELTA_FILE.format(first=first, last=last)
+                        ),
+                    )
+            finally:
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+        return count
+
+    @instrumented
+    def merge(self) -> int:
+        """
+        Merges the delta files of every other node that are newer than its high-water
+        mark, and returns how many entries were new to this journal
+        """
+        if not os.path.isdir(self.shared_dir):
+            return 0
+        with self.engine.connect() as conn:
+            received = dict(
+                conn.execute(select(SyncPeer.node_id, SyncPeer.received_seq)).all()
+            )
+
+        merged = 0
+        for node_id in sorted(os.listdir(self.shared_dir)):
+            directory = os.path.join(self.shared_dir, node_id)
+            if node_id == self.node_id or not os.path.isdir(directory):
+                continue
+            for _, last, path in _delta_files(directory):
+                if last <= received.get(node_id, 0):
+                    continue
+                merged += self.repo.merge_entries(_read_delta(path), origin=node_id)
+                # Only once the whole file is in, so an interrupted merge is redone
+                self._received(node_id, last)
+        return merged
+
+    def _received(self, node_id: str, seq: int) -> None:
+        """
+        Raises node_id's high-water mark to seq
+        """
+        statement = sqlite.insert(SyncPeer).values(
+            node_id=node_id, received_seq=seq, synced_at=datetime.now()
+        )
+        with self.engine.begin() as conn:
+            conn.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[SyncPeer.node_id],
+                    set_={
+                        "received_seq": func.max(
+                            SyncPeer.received_seq, statement.excluded.received_seq
+                        ),
+                        "synced_at": statement.excluded.synced_at,
+                    },
+                )
+            )
+
+
+def _delta_files(directory: str) -> list[Tuple[int, int, str]]:
+    """
+    (first seq, last seq, path) of the delta files in directory, oldest first
+    """
+    files = []
+    for name in os.listdir(directory):
+        match = DELTA_PATTERN.match(name)
+        if match:
+            (first, last) = (int(match[1]), int(match[2]))
+            files.append((first, last, os.path.join(directory, name)))
+    return sorted(files)
+
+
+def _read_delta(path: str) -> Iterator[MergeEntry]:
+    """
+    Streams the entries of a delta file
+    """
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                entry = json.loads(line)
+                yield (entry["uuid"], datetime.fromisoformat(entry["ts"]), entry["log"])
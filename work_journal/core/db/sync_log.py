@@ -0,0 +1,18 @@
+"""
+This module keeps the sync change log (journal_change) up to date for entries written
+to this journal.
+
+The repositories log the uuids of the entries they write with LOG_STATEMENT, once per
+batch, in the same transaction as the entries themselves.  Merges from a sync peer log
+their entries first, with the peer as origin, which the statement's OR IGNORE then
+leaves alone.  Like the FTS index this is SQLite only.
+"""
+from sqlalchemy import text
+
+CHANGE_TABLE = "journal_change"
+
+# Logs the journal rows with ids first_id..last_id, just written, in id order
+LOG_STATEMENT = text(
+    f"INSERT OR IGNORE INTO {CHANGE_TABLE} (uuid) "
+    "SELECT uuid FROM journal WHERE id BETWEEN :first_id AND :last_id ORDER BY id"
+)
@@ -0,0 +1,32 @@
+"""
+This module finds the #tags in journal entries.
+
+A tag is a # followed by a letter or underscore and then any letters, digits,
+underscores or hyphens, e.g. #project-x or #oncall.  "#123" is a ticket number rather
+than a tag, and a # in the middle of a word (C#, a URL fragment) doesn't start one.
+Tags are case insensitive:  they are stored, and looked up, casefolded.
+"""
+import re
+from typing import Iterable
+
+TAG_PATTERN = re.compile(r"(?<![\w#&/])#([^\W\d][\w-]*)")
+
+
+def extract_tags(log: str) -> set[str]:
+    """
+    The normalized tags in an entry's log
+    """
+    if "#" not in log:
+        return set()
+    return {normalize_tag(tag) for tag in TAG_PATTERN.findall(log)}
+
+
+def normalize_tag(tag: str) -> str:
+    """
+    The stored form of a tag, with or without its #
+    """
+    return tag.strip().lstrip("#").rstrip("-").casefold()
+
+
+def normalize_tags(tags: Iterable[str]) -> list[str]:
+    return sorted({normalize_tag(tag) for tag in tags if normalize_tag(tag)})
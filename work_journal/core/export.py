@@ -0,0 +1,221 @@
+"""
+This module contains the report exporters, kept out of the UI so that anything holding a
+JournalRepo can produce a report.
+
+Every format is a writer function registered in WRITERS.  A writer takes an open file
+handle and an iterable of (timestamp, log) rows, such as the Core rows produced by
+JournalRepo.iter_rows_for_range, and streams them out without building a list.
+"""
+import csv
+import json
+import os
+from datetime import datetime
+from importlib.util import find_spec
+from threading import Event
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+EXPORT_CSV = "csv"
+EXPORT_MARKDOWN = "md"
+EXPORT_JSONL = "jsonl"
+EXPORT_PARQUET = "parquet"
+
+# Write buffer for exports, so streamed rows hit the disk in large chunks
+EXPORT_BUFFER_SIZE = 1 << 16
+
+# Rows handed to the columnar writer per record batch
+PARQUET_BATCH_SIZE = 50_000
+
+# How many rows go by between progress reports and cancellation checks
+PROGRESS_INTERVAL = 5_000
+
+Row = Tuple[datetime, str]
+
+
+class ExportFormat(NamedTuple):
+    """
+    A registered export format
+    name:  registry key, also used as the file extension
+    label:  human readable name for the UI
+    binary:  whether the writer expects a binary file handle
+    writer:  callable(fh, rows) that does the work
+    """
+
+    name: str
+    label: str
+    binary: bool
+    writer: Callable[..., None]
+
+
+WRITERS: dict[str, ExportFormat] = {}
+
+
+class ExportCancelled(Exception):
+    """
+    Raised out of export() when its cancel event is set part way through
+    """
+
+
+def register_writer(name: str, label: str, binary: bool = False):
+    """
+    Decorator adding a writer function to the WRITERS registry
+    """
+
+    def decorator(writer):
+        WRITERS[name] = ExportFormat(name, label, binary, writer)
+        return writer
+
+    return decorator
+
+
+def export(
+    filename,
+    rows: Iterable[Row],
+    file_format: str,
+    progress: Optional[Callable[[int], None]] = None,
+    cancel: Optional[Event] = None,
+) -> int:
+    """
+    Export rows to filename using the registered writer for file_format.
+    Returns the number of rows written.
+    filename:  path to the file to export to
+    rows:  iterable of (timestamp, log) rows, consumed lazily
+    file_format:  a key of WRITERS
+    progress:  optional callable, given the running row count every PROGRESS_INTERVAL rows
+    cancel:  optional Event; if it gets set the partial file is removed and
+             ExportCancelled is raised
+    """
+    export_format = get_format(file_format)
+    counter = _Counter(rows, progress, cancel)
+    try:
+        if export_format.binary:
+            with open(filename, "wb", buffering=EXPORT_BUFFER_SIZE) as fh:
+                export_format.writer(fh, counter)
+        else:
+            with open(
+                filename,
+                "w",
+                newline="",
+                encoding="utf-8",
+                buffering=EXPORT_BUFFER_SIZE,
+            ) as fh:
+                export_format.writer(fh, counter)
+    except ExportCancelled:
+        os.remove(filename)
+        raise
+    if progress is not None:
+        progress(counter.count)
+    return counter.count
+
+
+def export_to(fh, rows: Iterable[Row], file_format: str) -> int:
+    """
+    Export rows to an already open file handle, e.g. stdout.  It must be a binary
+    handle for binary formats (see ExportFormat.binary).  Returns the number of rows
+    written.
+    fh:  file handle to write to
+    rows:  iterable of (timestamp, log) rows, consumed lazily
+    file_format:  a key of WRITERS
+    """
+    counter = _Counter(rows, None, None)
+    get_format(file_format).writer(fh, counter)
+    return counter.count
+
+
+def get_format(file_format: str) -> ExportFormat:
+    """
+    The registered ExportFormat for file_format, ValueError if there is none
+    """
+    export_format = WRITERS.get(file_format)
+    if export_format is None:
+        raise ValueError(f"Unknown export format: {file_format}")
+    return export_format
+
+
+class _Counter:
+    """
+    Wraps the rows going into a writer to count them, report progress and check for
+    cancellation, without adding any per row work beyond the count
+    """
+
+    def __init__(self, rows: Iterable[Row], progress, cancel: Optional[Event]) -> None:
+        self.rows = rows
+        self.progress = progress
+        self.cancel = cancel
+        self.count = 0
+
+    def __iter__(self) -> Iterator[Row]:
+        for row in self.rows:
+            self.count += 1
+            if self.count % PROGRESS_INTERVAL == 0:
+                if self.cancel is not None and self.cancel.is_set():
+                    raise ExportCancelled()
+                if self.progress is not None:
+                    self.progress(self.count)
+            yield row
+
+
+@register_writer(EXPORT_CSV, "CSV")
+def write_csv(fh, rows: Iterable[Row]) -> None:
+    """
+    RFC 4180 CSV, quoted by the csv module so commas and newlines in logs are safe
+    """
+    writer = csv.writer(fh)
+    writer.writerow(("timestamp", "log_entry"))
+    writer.writerows(rows)
+
+
+def _escape_md(log: str) -> str:
+    """
+    Keeps a log entry inside its markdown table cell
+    """
+    return log.replace("|", "\\|").replace("\r", "").replace("\n", "<br>")
+
+
+@register_writer(EXPORT_MARKDOWN, "Markdown")
+def write_md(fh, rows: Iterable[Row]) -> None:
+    """
+    Markdown table
+    """
+    fh.write("# Journal Entries\n")
+    fh.write("| Timestamp | Log Entry |\n")
+    fh.write("| --- | --- |\n")
+    fh.writelines(f"|{ts}|{_escape_md(log)}|\n" for (ts, log) in rows)
+
+
+@register_writer(EXPORT_JSONL, "JSON Lines")
+def write_jsonl(fh, rows: Iterable[Row]) -> None:
+    """
+    One JSON object per line, with ISO 8601 timestamps
+    """
+    dumps = json.JSONEncoder(ensure_ascii=False).encode
+    fh.writelines(
+        dumps({"timestamp": ts.isoformat(), "log": log}) + "\n" for (ts, log) in rows
+    )
+
+
+def write_parquet(fh, rows: Iterable[Row]) -> None:
+    """
+    Parquet via pyarrow, written one record batch at a time so memory use is bounded
+    by PARQUET_BATCH_SIZE rather than the size of the report
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([("timestamp", pa.timestamp("us")), ("log", pa.string())])
+    with pq.ParquetWriter(fh, schema) as writer:
+        timestamps = []
+        logs = []
+        for ts, log in rows:
+            timestamps.append(ts)
+            logs.append(log)
+            if len(logs) >= PARQUET_BATCH_SIZE:
+                writer.write_batch(pa.record_batch([timestamps, logs], schema=schema))
+                timestamps = []
+                logs = []
+        if logs:
+            writer.write_batch(pa.record_batch([timestamps, logs], schema=schema))
+
+
+# pyarrow is an optional dependency, only offer Parquet when it is installed
+if find_spec("pyarrow") is not None:
+    register_writer(EXPORT_PARQUET, "Parquet", binary=True)(write_parquet)
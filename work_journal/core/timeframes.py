@@ -0,0 +1,152 @@
+"""
+This module computes report timeframes:  the named ranges offered by the reports window
+and the command line (today, this week, ...) as well as custom ones.
+
+Every timeframe is half-open, [start, end) with end the start of the next period, so an
+entry logged in the last moments of a day still belongs to it and no entry belongs to
+two adjacent timeframes.  JournalRepo's range methods take the same half-open
+(start, end), which the index on journal.ts answers with a plain range scan.
+
+Journal timestamps are naive local times (datetime.now()), and so are timeframes.  Pass
+an aware `now` to compute the calendar boundaries in its time zone instead, e.g. a day
+as seen from another office; they are converted to local time for the query.
+"""
+from datetime import date, datetime, time, timedelta, tzinfo
+from functools import lru_cache
+from typing import NamedTuple, Optional, Union
+
+TIMEFRAME_TODAY = "today"
+TIMEFRAME_YESTERDAY = "yesterday"
+TIMEFRAME_WEEK = "week"
+TIMEFRAME_TWO_WEEKS = "two-weeks"
+TIMEFRAME_MONTH = "month"
+TIMEFRAME_QUARTER = "quarter"
+TIMEFRAME_YEAR = "year"
+TIMEFRAME_PAST_YEAR = "past-year"
+TIMEFRAME_CUSTOM = "custom"
+
+# Named timeframes computed from the current date, with their labels for the UI.  Custom
+# timeframes have explicit bounds, see custom().
+PRESETS = {
+    TIMEFRAME_TODAY: "Today",
+    TIMEFRAME_YESTERDAY: "Yesterday",
+    TIMEFRAME_WEEK: "This Week",
+    TIMEFRAME_TWO_WEEKS: "Last Two Weeks",
+    TIMEFRAME_MONTH: "This Month",
+    TIMEFRAME_QUARTER: "This Quarter",
+    TIMEFRAME_YEAR: "This Year",
+    TIMEFRAME_PAST_YEAR: "Past 365 Days",
+}
+
+# A bound for custom():  a datetime, a date (a whole day), an ISO string of either, or
+# None for unbounded
+Bound = Union[datetime, date, str, None]
+
+
+class Timeframe(NamedTuple):
+    """
+    A half-open range of journal timestamps, [start, end)
+    """
+
+    start: datetime
+    end: datetime
+
+    def contains(self, ts: datetime) -> bool:
+        return self.start <= ts < self.end
+
+
+def preset(name: str, now: Optional[datetime] = None) -> Timeframe:
+    """
+    The named timeframe (one of PRESETS) containing now
+    name:  e.g. TIMEFRAME_TODAY
+    now:  defaults to the current local time.  If aware, days start at midnight in its
+          time zone.
+    """
+    now = now or datetime.now()
+    return _preset(name, now.date(), now.tzinfo)
+
+
+@lru_cache(maxsize=64)
+def _preset(name: str, today: date, tz: Optional[tzinfo]) -> Timeframe:
+    """
+    Cached, as a preset only changes once a day
+    """
+    if name == TIMEFRAME_TODAY:
+        (first, last) = (today, today + timedelta(days=1))
+    elif name == TIMEFRAME_YESTERDAY:
+        (first, last) = (today - timedelta(days=1), today)
+    elif name in (TIMEFRAME_WEEK, TIMEFRAME_TWO_WEEKS):
+        # Weeks run Monday to Sunday, two weeks is this one and the one before
+        monday = today - timedelta(days=today.weekday())
+        first = monday - timedelta(days=7 if name == TIMEFRAME_TWO_WEEKS else 0)
+        last = monday + timedelta(days=7)
+    elif name == TIMEFRAME_MONTH:
+        first = today.replace(day=1)
+        last = _add_months(first, 1)
+    elif name == TIMEFRAME_QUARTER:
+        first = date(today.year, 3 * ((today.month - 1) // 3) + 1, 1)
+        last = _add_months(first, 3)
+    elif name == TIMEFRAME_YEAR:
+        (first, last) = (date(today.year, 1, 1), date(today.year + 1, 1, 1))
+    elif name == TIMEFRAME_PAST_YEAR:
+        (first, last) = (today - timedelta(days=365), today + timedelta(days=1))
+    else:
+        raise ValueError(f"Unknown timeframe: {name}")
+    return Timeframe(_midnight(first, tz), _midnight(last, tz))
+
+
+def custom(start: Bound = None, end: Bound = None) -> Timeframe:
+    """
+    A timeframe with explicit bounds.  A date (or an ISO date string) as the end
+    includes that whole day, so custom("2024-03-01", "2024-03-31") is all of March.
+    start:  first moment included, None for the beginning of the journal
+    end:  first moment no longer included, None for no limit
+    """
+    start = _bound(start, end=False) or datetime.min
+    end = _bound(end, end=True) or datetime.max
+    if end < start:
+        raise ValueError(f"Timeframe ends before it starts: {start} - {end}")
+    return Timeframe(start, end)
+
+
+def _bound(value: Bound, end: bool) -> Optional[datetime]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = (
+            date.fromisoformat(value)
+            if len(value) == len("YYYY-MM-DD")
+            else datetime.fromisoformat(value)
+        )
+    if isinstance(value, datetime):
+        return _local(value)
+    if end:
+        if value == date.max:
+            # No day comes after it, so no limit at all
+            return datetime.max
+        value += timedelta(days=1)
+    return _midnight(value, None)
+
+
+def _midnight(day: date, tz: Optional[tzinfo]) -> datetime:
+    """
+    Local time at which day starts in tz (None:  local time already)
+    """
+    return _local(datetime.combine(day, time(), tz))
+
+
+def _local(when: datetime) -> datetime:
+    """
+    when as a naive local time, like the journal's timestamps
+    """
+    if when.tzinfo is None:
+        return when
+    return when.astimezone().replace(tzinfo=None)
+
+
+def _add_months(first: date, months: int) -> date:
+    """
+    The first of the month months after first's month
+    """
+    (years, month) = divmod(first.month - 1 + months, 12)
+    return date(first.year + years, month + 1, 1)
@@ -0,0 +1,355 @@
+"""
+Local HTTP/JSON service, for logging from IDE plugins, git hooks and CI jobs on the
+same machine without starting the GUI or a Python interpreter per entry.
+
+    work_journal serve --port 8765
+    curl -d '{"log": "Fixed the flaky build"}' localhost:8765/entries
+    curl -d '[{"log": "one"}, {"log": "two"}]' localhost:8765/entries
+    curl 'localhost:8765/entries?last=20'
+    curl 'localhost:8765/entries?range=week&tag=oncall'
+    curl 'localhost:8765/search?q=deploy*'
+
+POST /entries takes an entry object, {"log", optionally "timestamp"}, or a list of them,
+and answers {"ids": [...]} once they are committed.  Entries go through a
+BufferedJournalWriter, so the entries of every request arriving within BATCH_DELAY of
+each other are committed in one transaction:  concurrent requests share the cost of
+the commit instead of queueing up behind one another's.  If the commit fails or takes
+longer than COMMIT_TIMEOUT the answer is 202 Accepted, {"queued": N}:  the writer keeps
+the entries and commits them once it can, so sending them again would log them twice.
+
+The GET endpoints answer in JSON lines, one {"id", "timestamp", "log"} object per entry
+("id" is left out of range results), streamed in chunks as they are read, so a year's
+report doesn't have to fit in memory:
+
+    /entries?last=N[&before=ID]  the newest N entries (at most MAX_PAGE), newest first,
+                                 or those before entry ID, to page back through history
+    /entries?range=NAME          a timeframe (today, week, ...), or start and end as for
+             &start=&end=&tag=   the report command, and tag any number of times
+    /search?q=&start=&end=&limit=
+                                 full text search, best matches first (at most
+                                 MAX_PAGE)
+
+There is no authentication, so the service only listens on localhost unless told
+otherwise.
+"""
+import itertools
+import json
+import logging
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterable, Optional
+from urllib.parse import parse_qs, urlsplit
+from work_journal.core import timeframes
+from work_journal.core.db import BufferedJournalWriter, JournalRepo
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Seconds the first entry of a batch waits for more, see BufferedJournalWriter
+BATCH_DELAY = 0.005
+# Seconds a POST waits for its entries to be committed before answering 202
+COMMIT_TIMEOUT = 30.0
+
+DEFAULT_PAGE = 20
+MAX_PAGE = 1_000
+# Largest request body accepted
+MAX_BODY = 1 << 20
+# Streamed responses are sent in chunks of about this many bytes
+STREAM_CHUNK_SIZE = 1 << 16
+
+logger = logging.getLogger("work_journal.server")
+
+
+class BadRequest(Exception):
+    """
+    Raised by the handlers for a request they can't make sense of, answered with 400
+    """
+
+
+class JournalServer(ThreadingHTTPServer):
+    """
+    HTTP server with a thread per connection, in front of repo.  Entries are written
+    through writer, which close() closes.
+    """
+
+    daemon_threads = True
+    # Connections waiting to be accepted; socketserver's 5 resets bursts of clients
+    request_queue_size = 128
+
+    def __init__(
+        self,
+        repo: JournalRepo,
+        address: tuple = (DEFAULT_HOST, DEFAULT_PORT),
+        batch_delay: float = BATCH_DELAY,
+    ) -> None:
+        """
+        repo:  the journal to serve
+        address:  (host, port) to listen on, port 0 for any free port
+        batch_delay:  seconds to wait for more entries before committing
+        """
+        self.repo = repo
+        self.writer = BufferedJournalWriter(repo, max_delay=batch_delay)
+        super().__init__(address, JournalRequestHandler)
+
+    @property
+    def url(self) -> str:
+        (host, port) = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.writer.close()
+
+
+class JournalRequestHandler(BaseHTTPRequestHandler):
+    """
+    Answers one connection's requests, see the module docstring for the endpoints
+    """
+
+    # Keep-alive, so a client logging entry after entry reuses its connection
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; don't let them wait for a delayed ACK
+    disable_nagle_algorithm = True
+    server: JournalServer
+
+    def do_POST(self) -> None:
+        (path, _) = self._route()
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # Can't tell where the body ends, so the connection can't be reused
+            self.close_connection = True
+            self._send_error(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+            return
+        if length > MAX_BODY:
+            # Not worth reading, so the connection can't be reused either
+            self.close_connection = True
+            self._send_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Body too large")
+            return
+        body = self.rfile.read(length)
+        if path != "/entries":
+            self._send_error(HTTPStatus.NOT_FOUND, f"Not found: {path}")
+            return
+        self._answer(self._post_entries, body)
+
+    def do_GET(self) -> None:
+        (path, query) = self._route()
+        if path == "/entries" and ("last" in query or "before" in query):
+            self._answer(self._get_page, query)
+        elif path == "/entries":
+            self._answer(self._get_range, query)
+        elif path == "/search":
+            self._answer(self._get_search, query)
+        else:
+            self._send_error(HTTPStatus.NOT_FOUND, f"Not found: {path}")
+
+    def _post_entries(self, body: bytes) -> None:
+        writer = self.server.writer
+        journals = [writer.write(log, ts) for (ts, log) in _parse_entries(body)]
+        try:
+            committed = writer.sync(timeout=COMMIT_TIMEOUT)
+        except Exception:
+            # The writer keeps the batch and tries again
+            logger.exception("Committing %d entries failed", len(journals))
+            committed = False
+        if not committed:
+            self._send_json(HTTPStatus.ACCEPTED, {"queued": len(journals)})
+            return
+        self._send_json(HTTPStatus.CREATED, {"ids": [j.id for j in journals]})
+
+    def _get_page(self, query: dict) -> None:
+        number = _int(query, "last", DEFAULT_PAGE)
+        if not 0 < number <= MAX_PAGE:
+            raise BadRequest(f"last must be between 1 and {MAX_PAGE}")
+        records = self.server.repo.get_records_before(_int(query, "before"), number)
+        self._send_stream(records, _record_line)
+
+    def _get_range(self, query: dict) -> None:
+        rows = self.server.repo.iter_rows_for_range(
+            *_timeframe(query), tags=query.get("tag")
+        )
+        self._send_stream(rows, _row_line)
+
+    def _get_search(self, query: dict) -> None:
+        repo = self.server.repo
+        if not _str(query, "q"):
+            raise BadRequest("q is required")
+        limit = _int(query, "limit", repo.SEARCH_LIMIT)
+        if not 0 < limit <= MAX_PAGE:
+            raise BadRequest(f"limit must be between 1 and {MAX_PAGE}")
+        (start, end) = timeframes.custom(_str(query, "start"), _str(query, "end"))
+        entries = repo.search(_str(query, "q"), start=start, end=end, limit=limit)
+        self._send_stream(entries, _record_line)
+
+    def _answer(self, handler, argument) -> None:
+        """
+        Runs handler(argument), answering 400 for a bad request and 500 for anything
+        else going wrong before the response is under way
+        """
+        try:
+            handler(argument)
+        except (BadRequest, ValueError) as error:
+            self._send_error(HTTPStatus.BAD_REQUEST, str(error))
+        except Exception:
+            logger.exception("%s %s failed", self.command, self.path)
+            self._send_error(HTTPStatus.INTERNAL_SERVER_ERROR, "Internal error")
+
+    def log_message(self, format, *args) -> None:
+        # Quiet:  a busy git hook would flood the terminal
+        pass
+
+    def _route(self) -> tuple[str, dict]:
+        url = urlsplit(self.path)
+        return (url.path.rstrip("/") or "/", parse_qs(url.query))
+
+    def _send_json(self, status: HTTPStatus, value) -> None:
+        body = json.dumps(value).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: HTTPStatus, message: str) -> None:
+        self._send_json(status, {"error": message})
+
+    def _send_stream(self, items: Iterable, to_line: Callable[..., str]) -> None:
+        """
+        Streams items as lines of JSON with chunked transfer encoding, about
+        STREAM_CHUNK_SIZE bytes at a time.  The first item is read before the headers
+        go out, so an error up to there still gets a proper error response.
+        """
+        iterator = iter(items)
+        try:
+            buffer = [to_line(item) for item in itertools.islice(iterator, 1)]
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                size = sum(map(len, buffer))
+                for item in iterator:
+                    line = to_line(item)
+                    buffer.append(line)
+                    size += len(line)
+                    if size >= STREAM_CHUNK_SIZE:
+                        self._write_chunk(buffer)
+                        (buffer, size) = ([], 0)
+                self._write_chunk(buffer)
+                self.wfile.write(b"0\r\n\r\n")
+            except OSError:
+                # The client went away
+                self.close_connection = True
+            except Exception:
+                # Too late for an error status; a truncated stream tells the client
+                logger.exception("%s %s failed part way", self.command, self.path)
+                self.close_connection = True
+        finally:
+            # Releases the connection of a range stream right away
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def _write_chunk(self, lines: list[str]) -> None:
+        if lines:
+            data = "".join(lines).encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+
+def serve(
+    repo: JournalRepo,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    ready: Optional[Callable[[JournalServer], None]] = None,
+) -> None:
+    """
+    Serves repo until interrupted (Ctrl+C), then commits whatever is still queued
+    ready:  called with the server once it listens, e.g. to print its URL
+    """
+    server = JournalServer(repo, (host, port))
+    try:
+        if ready is not None:
+            ready(server)
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def _parse_entries(body: bytes) -> list[tuple[Optional[datetime], str]]:
+    """
+    (timestamp, log) for each entry in a POST body
+    """
+    try:
+        value = json.loads(body)
+    except ValueError as error:
+        raise BadRequest(f"Invalid JSON: {error}")
+    if isinstance(value, dict):
+        value = [value]
+    if not isinstance(value, list) or not value:
+        raise BadRequest("Expected an entry object or a non-empty list of them")
+    entries = []
+    for entry in value:
+        if not isinstance(entry, dict) or not isinstance(entry.get("log"), str):
+            raise BadRequest('Every entry needs a "log" string')
+        ts = entry.get("timestamp")
+        if ts is not None:
+            try:
+                ts = datetime.fromisoformat(ts)
+            except (TypeError, ValueError):
+                raise BadRequest(f"Invalid timestamp: {ts}")
+            if ts.tzinfo is not None:
+                # Journal timestamps are naive local times
+                ts = ts.astimezone().replace(tzinfo=None)
+        entries.append((ts, entry["log"]))
+    return entries
+
+
+def _timeframe(query: dict) -> timeframes.Timeframe:
+    """
+    The timeframe given by start/end, or else by range, as for the report command
+    """
+    (start, end) = (_str(query, "start"), _str(query, "end"))
+    if start or end:
+        return timeframes.custom(start, end)
+    return timeframes.preset(_str(query, "range") or timeframes.TIMEFRAME_TODAY)
+
+
+def _str(query: dict, name: str) -> Optional[str]:
+    values = query.get(name)
+    return values[-1] if values else None
+
+
+def _int(query: dict, name: str, default: Optional[int] = None) -> Optional[int]:
+    value = _str(query, name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise BadRequest(f"{name} must be a whole number")
+
+
+_dumps = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def _record_line(record) -> str:
+    """
+    A JournalRecord or Journal as a line of JSON
+    """
+    return (
+        _dumps({"id": record.id, "timestamp": record.ts.isoformat(), "log": record.log})
+        + "\n"
+    )
+
+
+def _row_line(row) -> str:
+    """
+    A (ts, log) row as a line of JSON, like the jsonl export
+    """
+    (ts, log) = row
+    return _dumps({"timestamp": ts.isoformat(), "log": log}) + "\n"
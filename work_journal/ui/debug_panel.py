@@ -0,0 +1,140 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import Optional
+from work_journal.core.db import QueryStats, ResultCache
+
+STICKY_ALL = [tk.W, tk.N, tk.E, tk.S]
+
+# How often (ms) the panel re-reads the stats
+REFRESH_MS = 1000
+
+COLUMNS = (
+    ("calls", "Calls", 60),
+    ("mean_ms", "Mean ms", 80),
+    ("max_ms", "Max ms", 80),
+    ("rows", "Rows", 80),
+    ("queries", "Queries", 70),
+    ("query_ms", "SQL ms", 80),
+    ("sessions", "Sessions", 70),
+)
+
+
+class DebugPanel(tk.Toplevel):
+    """
+    Live view of the database instrumentation:  per repository method timings and the
+    most recent slow queries, and the journal's result cache.  Only reads QueryStats and
+    ResultCache snapshots, which are cheap and thread safe, so it never touches the
+    database itself.
+    deregister_callback:  callable.  Allows the parent window to react to this one being closed
+    stats:  The QueryStats of the journal's engine
+    cache:  The journal repo's ResultCache, if it has one
+    """
+
+    def __init__(
+        self,
+        deregister_callback: callable,
+        stats: QueryStats,
+        cache: Optional[ResultCache] = None,
+    ) -> None:
+        super().__init__()
+        self.stats = stats
+        self.cache = cache
+        self.deregister_callback = deregister_callback
+        self.title("Work Journal: Database Stats")
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.operations = ttk.Treeview(self, columns=[name for (name, _, _) in COLUMNS])
+        self.operations.heading("#0", text="Operation")
+        self.operations.column("#0", width=260)
+        for name, heading, width in COLUMNS:
+            self.operations.heading(name, text=heading)
+            self.operations.column(name, width=width, anchor=tk.E)
+        self.operations.grid(row=0, column=0, columnspan=3, sticky=STICKY_ALL)
+
+        ttk.Label(self, text="Slow queries").grid(row=1, column=0, sticky=tk.W, padx=5)
+        self.cache_status = tk.StringVar()
+        ttk.Label(self, textvariable=self.cache_status).grid(
+            row=1, column=1, columnspan=2, sticky=tk.E, padx=5
+        )
+        self.slow_queries = tk.Text(self, height=8, wrap=tk.NONE, state=tk.DISABLED)
+        self.slow_queries.grid(row=2, column=0, columnspan=3, sticky=STICKY_ALL)
+
+        ttk.Label(self, text="Log queries slower than (ms):").grid(
+            row=3, column=0, sticky=tk.E, padx=5, pady=5
+        )
+        self.threshold = tk.StringVar(value=f"{stats.slow_query_ms:g}")
+        threshold = ttk.Spinbox(
+            self,
+            from_=0,
+            to=10_000,
+            increment=10,
+            width=8,
+            textvariable=self.threshold,
+            command=self.set_threshold,
+        )
+        threshold.bind("<Return>", self.set_threshold)
+        threshold.grid(row=3, column=1, sticky=tk.W, pady=5)
+        ttk.Button(self, text="Reset", command=self.reset).grid(
+            row=3, column=2, sticky=tk.E, padx=5, pady=5
+        )
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.refresh()
+
+    def refresh(self):
+        """
+        Redraws both tables from a fresh snapshot, then schedules the next refresh
+        """
+        snapshot = self.stats.snapshot()
+
+        self.operations.delete(*self.operations.get_children())
+        for operation, numbers in snapshot["operations"].items():
+            self.operations.insert(
+                "",
+                tk.END,
+                text=operation,
+                values=[
+                    f"{numbers[name]:.2f}" if name.endswith("_ms") else numbers[name]
+                    for (name, _, _) in COLUMNS
+                ],
+            )
+
+        self.slow_queries.configure(state=tk.NORMAL)
+        self.slow_queries.delete("1.0", tk.END)
+        for query in reversed(snapshot["slow_queries"]):
+            statement = " ".join(query["statement"].split())
+            self.slow_queries.insert(
+                tk.END,
+                f"{query['at']}  {query['ms']:8.1f} ms  {query['operation']}:  "
+                f"{statement}\n",
+            )
+        self.slow_queries.configure(state=tk.DISABLED)
+
+        if self.cache is None:
+            self.cache_status.set("Result cache off")
+        else:
+            cache = self.cache.snapshot()
+            self.cache_status.set(
+                f"Result cache:  {cache['hits']} hits, {cache['misses']} misses "
+                f"({cache['hit_rate']:.0%}), {cache['entries']} cached, "
+                f"{cache['invalidated']} invalidated"
+            )
+
+        self.after_id = self.after(REFRESH_MS, self.refresh)
+
+    def set_threshold(self, *_):
+        try:
+            self.stats.slow_query_ms = float(self.threshold.get())
+        except ValueError:
+            self.threshold.set(f"{self.stats.slow_query_ms:g}")
+
+    def reset(self):
+        self.stats.reset()
+        self.after_cancel(self.after_id)
+        self.refresh()
+
+    def close(self):
+        self.after_cancel(self.after_id)
+        self.deregister_callback()
+        self.destroy()
@@ -1,70 +1,180 @@
+from __future__ import annotations
+
+from collections import deque
+from functools import partial
+from itertools import islice, zip_longest
+from typing import TYPE_CHECKING, Callable, Tuple
 import tkinter as tk
 import tkinter.ttk as ttk
 
-from work_journal.core.db import JournalRepo, ConfigRepo
-from .reports_window import ReportsWindow
+from .worker import BackgroundWorker
+
+# The database layer (and SQLAlchemy with it) is only imported once the window is up
+if TYPE_CHECKING:
+    from work_journal.core.db import (
+        BufferedJournalWriter,
+        ChangeMonitor,
+        Journal,
+        JournalRecord,
+        JournalRepo,
+        ConfigRepo,
+    )
 
 STICKY_X = [tk.W, tk.E]
 STICKY_ALL = [tk.W, tk.N, tk.E, tk.S]
 
+# How many older entries the history fetches at a time as it is scrolled
+HISTORY_PAGE_SIZE = 50
+# Padding and border width around the history rows
+HISTORY_PADDING = 10
+HISTORY_BORDER = 1
+# Upper bound on how many entries the history keeps in memory.  Scrolling further back
+# lets go of the newest ones, which are fetched again on the way back up.
+HISTORY_CACHE_LEN = 1000
+# How often (ms) to check whether something else has written to the journal
+HISTORY_POLL_MS = 2000
+# Window size until the configured geometry has been read from the database
+STARTUP_GEOMETRY = "800x220"
+
 
 class MainWindow(tk.Tk):
     """
     Application main window
+
+    The window paints straight away with a placeholder, while the database is opened on
+    the background worker; the journal frames are built once it is ready.
     """
 
-    def __init__(self, journal_repo: JournalRepo, config_repo: ConfigRepo) -> None:
+    def __init__(
+        self, open_database: Callable[[], Tuple[JournalRepo, ConfigRepo]]
+    ) -> None:
         """
-        journal_repo:  The configured journal table repo for this app
-        config_repo:  The configured config table repo for this app
+        open_database:  Returns the journal and config table repos for this app.  Runs
+                        on the background worker, so it may do slow imports and I/O.
         """
         super().__init__()
-        self.geometry(config_repo.config[ConfigRepo.CONFIG_GEOMETRY])
+        self.geometry(STARTUP_GEOMETRY)
         self.title("Work Journal")
         self.resizable(False, False)
-        self.repo = journal_repo
-        self.config_repo = config_repo
+        self.repo = None
+        self.config_repo = None
+        self.writer = None
+        self.change_monitor = None
+
+        # All database work happens on the worker, never on the Tk thread
+        self.worker = BackgroundWorker(self)
 
         self.master_frame = ttk.Frame(padding=(20, 20))
+        self.placeholder = ttk.Label(self.master_frame, text="Opening journal...")
+        self.placeholder.grid(row=0, column=0)
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+        self.master_frame.columnconfigure(0, weight=1)
+        self.master_frame.grid(sticky=STICKY_ALL)
+
+        self.can_open_reports = True
+        self.reports_window = None
+        self.debug_panel = None
+        self.bind("<Destroy>", self.on_destroy)
+
+        self.worker.submit(
+            open_database, on_done=self.database_ready, on_error=self.database_failed
+        )
 
+    def database_ready(self, repos: Tuple[JournalRepo, ConfigRepo]):
+        """
+        Builds the journal frames once open_database has finished
+        """
+        from work_journal.core.db import BufferedJournalWriter, ConfigRepo
+
+        (self.repo, self.config_repo) = repos
+        self.geometry(self.config_repo.config[ConfigRepo.CONFIG_GEOMETRY])
+        # New entries are group committed by the writer's own thread
+        # Watched before the writer starts, so none of its commits count as a change
+        self.change_monitor = self.repo.watch()
+        self.writer = BufferedJournalWriter(self.repo, on_flush=self.entries_flushed)
+
+        self.placeholder.destroy()
         self.history_frame = JournalHistoryFrame(
             root=self.master_frame,
             repo=self.repo,
-            history_length=config_repo.config[ConfigRepo.CONFIG_HISTORY_LEN],
+            history_length=self.config_repo.config[ConfigRepo.CONFIG_HISTORY_LEN],
+            change_monitor=self.change_monitor,
+            worker=self.worker,
         )
-        self.history_frame.grid(row=1, column=0, sticky=STICKY_X)
+        # The history gets whatever height the other rows leave
+        self.master_frame.rowconfigure(1, weight=1)
+        self.history_frame.grid(row=1, column=0, sticky=STICKY_ALL)
 
-        JournalEntryFrame(self.master_frame, self.repo, self.refresh_view).grid(
+        JournalEntryFrame(self.master_frame, self.writer, self.entry_saved).grid(
             row=0, column=0, sticky=STICKY_X
         )
-        self.columnconfigure(0, weight=1)
         ttk.Button(self.master_frame, text="Reports", command=self.load_reports).grid(
             row=2, column=0, sticky=tk.E, pady=10
         )
-        self.master_frame.columnconfigure(0, weight=1)
-        self.master_frame.grid(sticky=STICKY_ALL)
-
-        self.can_open_reports = True
+        self.bind("<F12>", self.load_debug_panel)
 
-        self.refresh_view()
+    def database_failed(self, error: BaseException):
+        """
+        open_database raised:  say why in place of the placeholder, since the packaged
+        app has no console for a traceback to go to
+        """
+        self.placeholder.configure(
+            text=f"Could not open the journal:\n{error}",
+            wraplength=self.winfo_width() - 40,
+        )
 
     def refresh_view(self):
         """
-        Called when the history window needs to be refreshed.  Passed as a callback into the
-        journal entry frame.
+        Called when the history window needs to be reloaded from the database.
         """
         self.history_frame.refresh_view()
 
+    def entry_saved(self, entry: Journal):
+        """
+        Passed as a callback into the journal entry frame.  The new entry goes straight
+        into the history, no need to query for it.  It may not have been flushed to the
+        database yet, see entries_flushed.
+        """
+        self.history_frame.push_entry(entry)
+
+    def entries_flushed(self, batch: [Journal], ids: [int]):
+        """
+        Passed as the writer's on_flush:  runs on the writer's thread, so hands the
+        committed entries to the history on the Tk thread
+        """
+        self.worker.post(self.history_frame.entries_flushed, batch, ids)
+
+    def on_destroy(self, event):
+        """
+        When the window goes away, flushes entries the writer is still holding and lets
+        queued database work finish, then releases the connections of the change monitor
+        and the result cache
+        """
+        if event.widget is self:
+            if self.reports_window is not None:
+                self.reports_window.cancel_export.set()
+            if self.writer is not None:
+                self.writer.close()
+            if self.change_monitor is not None:
+                self.worker.submit(self.change_monitor.close)
+            if self.repo is not None and self.repo.cache is not None:
+                self.worker.submit(self.repo.cache.close)
+            self.worker.shutdown()
+
     def load_reports(self):
         """
         Handles the button which loads the report window
         """
         if self.can_open_reports:
-            ReportsWindow(
+            from .reports_window import ReportsWindow
+
+            self.reports_window = ReportsWindow(
                 deregister_callback=self.close_reports_callback,
                 repo=self.repo,
                 config_repo=self.config_repo,
                 parent_geometry=self.geometry(),
+                worker=self.worker,
             )
             self.can_open_reports = False
 
@@ -73,6 +183,24 @@ class MainWindow(tk.Tk):
         Passed into the reports window.  Unlocks the reports button for further use.
         """
         self.can_open_reports = True
+        self.reports_window = None
+
+    def load_debug_panel(self, event=None):
+        """
+        F12 opens the database stats panel, if the journal's engine is instrumented
+        """
+        from work_journal.core.db import stats_for
+
+        stats = stats_for(self.repo.engine)
+        if self.debug_panel is None and stats is not None:
+            from .debug_panel import DebugPanel
+
+            self.debug_panel = DebugPanel(
+                self.close_debug_panel_callback, stats, self.repo.cache
+            )
+
+    def close_debug_panel_callback(self):
+        self.debug_panel = None
 
 
 class JournalEntryFrame(ttk.Frame):
@@ -80,58 +208,335 @@ class JournalEntryFrame(ttk.Frame):
     This Frame contains the journal entry input field.
     """
 
-    def __init__(self, root, repo: JournalRepo, refresh_callback: callable) -> None:
+    def __init__(
+        self, root, writer: BufferedJournalWriter, saved_callback: callable
+    ) -> None:
         """
         root:  The parent container
-        repo:  The journal table repo configured for this app.
-        refresh_callback:  Called to indicate that the journal table has been updated
+        writer:  Queues new journal entries for writing.  Never blocks.
+        saved_callback:  Called with the new Journal entry once it has been queued
         """
         super().__init__(root, padding=(0, 10))
-        self.repo = repo
+        self.writer = writer
         self.columnconfigure(1, weight=1)
         ttk.Label(self, text="Journal Entry: ").grid(row=0, column=0)
         self.journal_entry = tk.StringVar("")
         self.input = ttk.Entry(self, textvariable=self.journal_entry)
         self.input.grid(row=0, column=1, sticky=STICKY_X)
         self.input.bind("<Return>", self.save_journal)
-        self.refresh_callback = refresh_callback
+        self.saved_callback = saved_callback
 
     def save_journal(self, _):
         """
-        Stores the journal enty, clears the input field, and calls for a history refresh
+        Stores the journal enty, clears the input field, and hands the new entry on
         """
-        self.repo.create_journal_entry(self.journal_entry.get())
+        entry = self.writer.write(self.journal_entry.get())
         self.journal_entry.set("")
-        self.refresh_callback()
+        self.saved_callback(entry)
 
 
 class JournalHistoryFrame(ttk.Frame):
     """
-    This frame displays the most recent N journal entries
+    This frame displays the most recent N journal entries, and scrolls back through the
+    rest of the journal.  It is virtualized:  only as many label rows exist as fit the
+    frame (up to history_length) no matter how much history is loaded, and older
+    entries are fetched a page at a time (keyset pagination) as the user scrolls
+    towards the end of what has been loaded.
+
+    Loaded entries are kept in a bounded deque, newest first, as JournalRecords (entries
+    saved by this app are pushed onto the front of it directly, as Journals, and kept
+    track of until the writer reports them committed).  The database is only re-read
+    when the change monitor reports that something else has written to it.
+
+    Queries run on the background worker.  Each reload bumps a generation counter, so a
+    page that arrives after the history was reloaded underneath it is dropped.
     """
 
-    def __init__(self, root, repo: JournalRepo, history_length: int):
+    def __init__(
+        self,
+        root,
+        repo: JournalRepo,
+        history_length: int,
+        change_monitor: ChangeMonitor,
+        worker: BackgroundWorker,
+    ):
         """
         root:  The parent container
         repo:  The journal table repo configured for this app
-        history_length:  How many journal entries to display
+        history_length:  Most journal entries to display at once, fewer if fewer fit
+        change_monitor:  Tells the history when the journal was changed externally
+        worker:  Runs the history queries off the Tk thread
         """
-        super().__init__(root, padding=(10, 10), relief="groove", borderwidth=1)
+        super().__init__(
+            root,
+            padding=(HISTORY_PADDING, HISTORY_PADDING),
+            relief="groove",
+            borderwidth=HISTORY_BORDER,
+        )
         self.repo = repo
-        self.history_length = history_length
-        self.history = tk.StringVar()
-        self.display_label = ttk.Label(self, textvariable=self.history)
+        self.history_length = int(history_length)
+        # The first page fills every row the history can show
+        self.first_page_size = min(
+            max(HISTORY_PAGE_SIZE, self.history_length), HISTORY_CACHE_LEN
+        )
+        self.change_monitor = change_monitor
+        self.worker = worker
+        self.entries = deque(maxlen=HISTORY_CACHE_LEN)
+        # Pushed entries the writer hasn't reported committed yet, newest first
+        self.unsaved = []
+        self.offset = 0
+        self.exhausted = False
+        # Whether the newest entries were let go of to make room for older ones
+        self.newer_dropped = False
+        self.loading = False
+        self.checking = False
+        self.generation = 0
+
         self.columnconfigure(0, weight=1)
-        self.display_label.grid(row=0, column=0, sticky=STICKY_ALL)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.lines = []
+        self.labels = []
+        # One row to measure, the rest are made once the frame's height is known
+        self._set_rows(1)
+        self.row_height = max(self.labels[0].winfo_reqheight(), 1)
+        self.bind("<Configure>", self.on_resize)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.bind_all(sequence, self.on_mousewheel, add="+")
+
         self.refresh_view()
+        self.after(HISTORY_POLL_MS, self.poll_for_changes)
 
     def refresh_view(self):
         """
-        Refreshes the most recent journal entries
+        Drops whatever has been loaded and shows the most recent journal entries
+        """
+        self.generation += 1
+        self.loading = True
+        self.worker.submit(
+            self._fetch_latest,
+            on_done=partial(self._replace_entries, self.generation),
+            on_error=self._query_failed,
+        )
+
+    def _fetch_latest(self) -> [JournalRecord]:
+        """
+        Worker thread:  first page of the history
+        """
+        self.change_monitor.mark_seen()
+        return self.repo.get_records_before(None, self.first_page_size)
+
+    def _replace_entries(self, generation: int, page: [JournalRecord]):
+        if generation != self.generation:
+            return
+        self.loading = False
+        # Keep entries the writer has not reported flushed yet.  The page may contain
+        # some of them after all, entries_flushed drops those copies.
+        self.entries.clear()
+        self.entries.extend(self.unsaved)
+        self.entries.extend(page)
+        self.exhausted = len(page) < self.first_page_size
+        self.newer_dropped = False
+        self.offset = 0
+        self.render()
+
+    def push_entry(self, entry: Journal):
+        """
+        Adds a newly saved entry to the top of the history and scrolls up to it.  If the
+        cache is full the oldest entry drops off; it will be fetched again if needed.
+        """
+        self.unsaved.insert(0, entry)
+        if self.newer_dropped:
+            # Scrolled too far back to put it on top, start over from the newest
+            self.refresh_view()
+            return
+        if len(self.entries) == self.entries.maxlen:
+            self.exhausted = False
+            if self.loading:
+                # The page in flight was asked for relative to the entry being dropped
+                self.generation += 1
+                self.loading = False
+        self.entries.appendleft(entry)
+        self.offset = 0
+        self.render()
+
+    def entries_flushed(self, batch: [Journal], ids: [int]):
+        """
+        The writer committed batch, pushed earlier, under ids.  A page loaded since may
+        already have them, as records, in which case the pushed copies are dropped.
         """
-        history = self.repo.get_last_n_entries(self.history_length)
-        result = ""
-        for entry in history:
-            result += f"{entry.ts.strftime('%Y-%m-%d %H:%M'):<15}: {entry.log}\n"
+        # Journals compare by value, so they are told apart by identity
+        flushed = {id(journal) for journal in batch}
+        pushed = {id(entry) for entry in self.unsaved}
+        loaded = {entry.id for entry in self.entries if id(entry) not in pushed}
+        duplicates = {
+            id(journal) for (journal, new_id) in zip(batch, ids) if new_id in loaded
+        }
+        self.unsaved = [entry for entry in self.unsaved if id(entry) not in flushed]
+        if duplicates:
+            remaining = [entry for entry in self.entries if id(entry) not in duplicates]
+            self.entries.clear()
+            self.entries.extend(remaining)
+            self.render()
+
+    def poll_for_changes(self):
+        """
+        Reloads the history if the journal was written to by anything but this app
+        """
+        if not self.checking:
+            self.checking = True
+            self.worker.submit(
+                self.change_monitor.has_changed,
+                on_done=self._checked,
+                on_error=self._query_failed,
+            )
+        self.after(HISTORY_POLL_MS, self.poll_for_changes)
+
+    def _checked(self, changed: bool):
+        self.checking = False
+        if changed:
+            self.refresh_view()
+
+    def _query_failed(self, error: BaseException):
+        """
+        A history query failed (e.g. the database is locked):  report it and let the
+        next scroll or poll try again
+        """
+        self.loading = False
+        self.checking = False
+        self.report_callback_exception(type(error), error, error.__traceback__)
+
+    def load_older(self):
+        """
+        Fetches the next page of older entries for the loaded history
+        """
+        if self.loading:
+            return
+        if self.entries and self.entries[-1] in self.unsaved:
+            # Nothing loaded from the database yet besides unsaved entries
+            return
+        self.loading = True
+        before_id = self.entries[-1].id if self.entries else None
+        self.worker.submit(
+            self.repo.get_records_before,
+            before_id,
+            HISTORY_PAGE_SIZE,
+            on_done=partial(self._append_entries, self.generation),
+            on_error=self._query_failed,
+        )
+
+    def _append_entries(self, generation: int, page: [JournalRecord]):
+        if generation != self.generation:
+            return
+        self.loading = False
+        # A full deque lets go of as many of the newest entries
+        dropped = max(len(self.entries) + len(page) - self.entries.maxlen, 0)
+        self.entries.extend(page)
+        if dropped:
+            self.newer_dropped = True
+            self.offset = max(self.offset - dropped, 0)
+        self.exhausted = len(page) < HISTORY_PAGE_SIZE
+        self.render()
+
+    def load_newer(self):
+        """
+        Fetches the page of entries just newer than the loaded history, after older
+        pages made room by letting go of them
+        """
+        if self.loading:
+            return
+        if self.unsaved:
+            # Saved meanwhile and maybe not committed yet, start over from the newest
+            self.refresh_view()
+            return
+        self.loading = True
+        self.worker.submit(
+            self.repo.get_records_after,
+            self.entries[0].id,
+            HISTORY_PAGE_SIZE,
+            on_done=partial(self._prepend_entries, self.generation),
+            on_error=self._query_failed,
+        )
+
+    def _prepend_entries(self, generation: int, page: [JournalRecord]):
+        if generation != self.generation:
+            return
+        self.loading = False
+        # page is oldest first, and a full deque lets go of as many of the oldest
+        if len(self.entries) + len(page) > self.entries.maxlen:
+            self.exhausted = False
+        self.entries.extendleft(page)
+        self.offset += len(page)
+        self.newer_dropped = len(page) == HISTORY_PAGE_SIZE
+        self.render()
+
+    def scroll_to(self, offset: int):
+        """
+        Moves the window of visible entries, fetching more history if it gets close to
+        either end of what is loaded
+        """
+        rows = len(self.lines)
+        if not self.exhausted and offset + 2 * rows >= len(self.entries):
+            self.load_older()
+        if self.newer_dropped and offset < rows:
+            self.load_newer()
+        max_offset = max(len(self.entries) - rows, 0)
+        self.offset = min(max(offset, 0), max_offset)
+        self.render()
+
+    def yview(self, *args):
+        """
+        Scrollbar command, see the Tk scrollbar documentation for the protocol
+        """
+        if args[0] == tk.MOVETO:
+            self.scroll_to(round(float(args[1]) * len(self.entries)))
+        elif args[0] == tk.SCROLL:
+            step = len(self.lines) if args[2] == tk.PAGES else 1
+            self.scroll_to(self.offset + int(args[1]) * step)
+
+    def on_mousewheel(self, event):
+        """
+        Scrolls a line at a time while the pointer is over the history
+        """
+        if not str(event.widget).startswith(str(self)):
+            return
+        if event.num == 4 or event.delta > 0:
+            self.scroll_to(self.offset - 1)
+        elif event.num == 5 or event.delta < 0:
+            self.scroll_to(self.offset + 1)
+
+    def on_resize(self, event):
+        """
+        Keeps as many label rows as fit the frame's height, up to history_length
+        """
+        fit = (event.height - 2 * (HISTORY_PADDING + HISTORY_BORDER)) // self.row_height
+        rows = min(max(fit, 1), self.history_length)
+        if rows != len(self.lines):
+            self._set_rows(rows)
+            self.scroll_to(self.offset)
+
+    def _set_rows(self, rows: int):
+        while len(self.lines) < rows:
+            line = tk.StringVar()
+            label = ttk.Label(self, textvariable=line)
+            label.grid(row=len(self.lines), column=0, sticky=STICKY_X)
+            self.lines.append(line)
+            self.labels.append(label)
+        while len(self.lines) > rows:
+            self.labels.pop().destroy()
+            self.lines.pop()
+        self.scrollbar.grid(row=0, column=1, rowspan=rows, sticky=STICKY_ALL)
+
+    def render(self):
+        """
+        Formats only the visible entries into the label rows
+        """
+        visible = list(islice(self.entries, self.offset, self.offset + len(self.lines)))
+        for line, entry in zip_longest(self.lines, visible):
+            line.set(
+                f"{entry.ts.strftime('%Y-%m-%d %H:%M'):<15}: {entry.log}"
+                if entry
+                else ""
+            )
 
-        self.history.set(result)
+        total = max(len(self.entries), 1)
+        self.scrollbar.set(self.offset / total, (self.offset + len(visible)) / total)
@@ -1,15 +1,12 @@
-from datetime import datetime, timedelta
+from threading import Event
+from typing import Optional
 import tkinter as tk
-from tkinter import ttk, filedialog
-from work_journal.core.db import Journal, JournalRepo, ConfigRepo
-
-TF_RADIO_TODAY = "today"
-TF_RADIO_YESTERDAY = "yesterday"
-TF_RADIO_LASTTWO = "last_two"
-TF_RADIO_LAST_YEAR = "year"
-
-EXPORT_CSV = "csv"
-EXPORT_MARKDOWN = "md"
+from tkinter import ttk, filedialog, messagebox
+from work_journal.core import timeframes
+from work_journal.core.db import JournalRepo, ConfigRepo
+from work_journal.core.export import EXPORT_CSV, WRITERS, ExportCancelled, export
+from work_journal.core.timeframes import Timeframe
+from .worker import BackgroundWorker
 
 STICKY_ALL = [tk.W, tk.N, tk.E, tk.S]
 
@@ -21,6 +18,7 @@ class ReportsWindow(tk.Toplevel):
     repo:  The journal table repo
     config_repo:  The config table repo.  Currently not used by this window but just in case
     parent_geometry:  Passed in as a string so that this window matches its parent.
+    worker:  Runs the export off the Tk thread.
     """
 
     def __init__(
@@ -29,10 +27,14 @@ class ReportsWindow(tk.Toplevel):
         repo: JournalRepo,
         config_repo: ConfigRepo,
         parent_geometry: str,
+        worker: BackgroundWorker,
     ) -> None:
         super().__init__()
         self.repo = repo
         self.config_repo = config_repo
+        self.worker = worker
+        self.cancel_export = Event()
+        self.closed = False
         self.title("Work Journal: Reports")
         self.kill = self.create_deregister_callback(deregister_callback)
         self.protocol("WM_DELETE_WINDOW", self.kill)
@@ -40,118 +42,159 @@ class ReportsWindow(tk.Toplevel):
         self.resizable(False, False)
 
         # Form Variables
-        self.timeframe = tk.StringVar(value=TF_RADIO_TODAY)
+        self.timeframe = tk.StringVar(value=timeframes.TIMEFRAME_TODAY)
+        self.custom_start = tk.StringVar()
+        self.custom_end = tk.StringVar()
         self.report_format = tk.StringVar(value=EXPORT_CSV)
+        self.tag = tk.StringVar()
 
         # Top Frame:  Report timeframe selector
         top_frame = ttk.Frame(self, padding=(10, 10), relief="groove", borderwidth=1)
-        ttk.Radiobutton(
-            top_frame, text="Today", variable=self.timeframe, value=TF_RADIO_TODAY
-        ).grid(sticky=tk.W)
-        ttk.Radiobutton(
-            top_frame,
-            text="Yesterday",
-            variable=self.timeframe,
-            value=TF_RADIO_YESTERDAY,
-        ).grid(sticky=tk.W)
-        ttk.Radiobutton(
-            top_frame,
-            text="Last Two Weeks",
-            variable=self.timeframe,
-            value=TF_RADIO_LASTTWO,
-        ).grid(sticky=tk.W)
+        for name, label in timeframes.PRESETS.items():
+            ttk.Radiobutton(
+                top_frame, text=label, variable=self.timeframe, value=name
+            ).grid(columnspan=4, sticky=tk.W)
+        custom_row = len(timeframes.PRESETS)
         ttk.Radiobutton(
             top_frame,
-            text="Full Year",
+            text="From",
             variable=self.timeframe,
-            value=TF_RADIO_LAST_YEAR,
-        ).grid(sticky=tk.W)
+            value=timeframes.TIMEFRAME_CUSTOM,
+        ).grid(row=custom_row, column=0, sticky=tk.W)
+        ttk.Entry(top_frame, textvariable=self.custom_start, width=12).grid(
+            row=custom_row, column=1
+        )
+        ttk.Label(top_frame, text=" to ").grid(row=custom_row, column=2)
+        ttk.Entry(top_frame, textvariable=self.custom_end, width=12).grid(
+            row=custom_row, column=3
+        )
+        ttk.Label(top_frame, text="Tag").grid(row=custom_row + 1, column=0, sticky=tk.W)
+        self.tag_choice = ttk.Combobox(top_frame, textvariable=self.tag, width=27)
+        self.tag_choice.grid(row=custom_row + 1, column=1, columnspan=3, sticky=tk.W)
         top_frame.grid(column=0, row=0, sticky=STICKY_ALL, padx=10, pady=10)
 
         # Bottom frame:  File format and export button
         bottom_frame = ttk.Frame(self, padding=(10, 10), relief="groove", borderwidth=1)
-        ttk.Radiobutton(
-            bottom_frame, text="CSV", variable=self.report_format, value=EXPORT_CSV
-        ).grid(row=0, column=0, sticky=tk.W)
-        ttk.Radiobutton(
+        for column, export_format in enumerate(WRITERS.values()):
+            ttk.Radiobutton(
+                bottom_frame,
+                text=export_format.label,
+                variable=self.report_format,
+                value=export_format.name,
+            ).grid(row=0, column=column, sticky=tk.W)
+        self.export_button = ttk.Button(
+            bottom_frame, text="Export", command=self.perform_export
+        )
+        self.export_button.grid(row=0, column=len(WRITERS), sticky=tk.E)
+        self.status = tk.StringVar()
+        ttk.Label(bottom_frame, textvariable=self.status).grid(
+            row=1, column=0, columnspan=len(WRITERS), sticky=tk.W
+        )
+        self.cancel_button = ttk.Button(
             bottom_frame,
-            text="Markdown",
-            variable=self.report_format,
-            value=EXPORT_MARKDOWN,
-        ).grid(row=0, column=1, sticky=tk.W)
-        ttk.Button(bottom_frame, text="Export", command=self.perform_export).grid(
-            row=0, column=2, sticky=tk.E
+            text="Cancel",
+            command=self.cancel_export.set,
+            state=tk.DISABLED,
         )
+        self.cancel_button.grid(row=1, column=len(WRITERS), sticky=tk.E)
         bottom_frame.grid(column=0, row=1, sticky=STICKY_ALL, padx=10, pady=10)
         self.columnconfigure(0, weight=1)
 
+        # Offer the journal's tags, most used first, once the worker has counted them
+        self.worker.submit(self.repo.get_tag_counts, on_done=self.show_tags)
+
+    def show_tags(self, tag_counts):
+        if not self.closed:
+            self.tag_choice.configure(values=[tag for (tag, _) in tag_counts])
+
     def perform_export(self):
         """
-        Takes the current configured export and runs it.
+        Takes the current configured export and starts it on the worker.  The window
+        stays responsive, shows progress and can cancel the export while it runs.
         """
-        timeframe = self.timeframe.get()
+        try:
+            timeframe = self.selected_timeframe()
+        except ValueError as error:
+            messagebox.showerror("Invalid dates", str(error), parent=self)
+            return
         file_format = self.report_format.get()
+        tags = self.selected_tags()
         filename = filedialog.asksaveasfilename(defaultextension=file_format)
+        if not filename:
+            return
+
+        self.cancel_export.clear()
+        self.export_button.configure(state=tk.DISABLED)
+        self.cancel_button.configure(state=tk.NORMAL)
+        self.status.set("Exporting...")
+        self.worker.submit(
+            self.run_export,
+            timeframe,
+            filename,
+            file_format,
+            tags,
+            on_done=self.export_finished,
+            on_error=self.export_failed,
+        )
 
-        data = []
-        if timeframe == TF_RADIO_TODAY:
-            data = self.repo.get_today_entries()
-        elif timeframe == TF_RADIO_YESTERDAY:
-            data = self.repo.get_yesterday_entries()
-        elif timeframe == TF_RADIO_LASTTWO:
-            data = self.repo.get_last_two_week_entries
-        elif timeframe == TF_RADIO_LAST_YEAR:
-            today = datetime.now()
-            today_start = datetime(
-                year=today.year,
-                month=today.month,
-                day=today.day,
-                hour=0,
-                minute=0,
-                second=0,
-            )
-
-            today_end = datetime(
-                year=today.year,
-                month=today.month,
-                day=today.day,
-                hour=23,
-                minute=59,
-                second=59,
+    def selected_timeframe(self) -> Timeframe:
+        """
+        The timeframe picked in the form.  Custom bounds are ISO dates (the end date is
+        included) or datetimes, either may be left blank.
+        """
+        name = self.timeframe.get()
+        if name == timeframes.TIMEFRAME_CUSTOM:
+            return timeframes.custom(
+                self.custom_start.get().strip(), self.custom_end.get().strip()
             )
-            start_time = today_start + timedelta(days=-365)
-            end_time = today_end
-            data = self.repo.get_entries_for_range(start_time, end_time)
-
-        if file_format == EXPORT_CSV:
-            self.export_csv(filename, data)
-        elif file_format == EXPORT_MARKDOWN:
-            self.export_md(filename, data)
-
-        self.kill()
+        return timeframes.preset(name)
 
-    def export_csv(self, filename, data: [Journal]):
+    def selected_tags(self) -> Optional[list[str]]:
         """
-        Handles the CSV export logic.  A candidate to be broken out into a separate module.
-        filename:  path to the file to export to
-        data:  a list of Journal objects to be exported.
+        The tags to filter on:  those typed or picked in the form, separated by spaces or
+        commas, or None for every entry
         """
-        with open(filename, "w") as fh:
-            fh.write("timestamp,log_entry\n")
-            for entry in data:
-                fh.write(f"{entry.ts},{entry.log}\n")
+        tags = self.tag.get().replace(",", " ").split()
+        return tags or None
 
-    def export_md(self, filename, data: [Journal]):
+    def run_export(
+        self,
+        timeframe: Timeframe,
+        filename: str,
+        file_format: str,
+        tags: Optional[list[str]] = None,
+    ) -> int:
         """
-        Handles the markdown export logic.  A candidate to be broken out into a separate module.
-        filename:  path to the file to export to
-        data:  a list of Journal objects to be exported.
+        Worker thread:  queries the timeframe and writes the report.  Must not touch
+        any widgets, progress goes back to the Tk thread through the worker.
         """
-        with open(filename, "w") as fh:
-            fh.write("# Journal Entries\n")
-            fh.write("| Timestamp | Log Entry |\n")
-            for entry in data:
-                fh.write(f"|{entry.ts}|{entry.log}|\n")
+        # Stream plain rows whatever the timeframe, a custom one may be very large
+        return export(
+            filename,
+            self.repo.iter_rows_for_range(*timeframe, tags=tags),
+            file_format,
+            progress=lambda count: self.worker.post(self.show_progress, count),
+            cancel=self.cancel_export,
+        )
+
+    def show_progress(self, count: int):
+        if not self.closed:
+            self.status.set(f"Exporting... {count:,} entries written")
+
+    def export_finished(self, _):
+        if not self.closed:
+            self.kill()
+
+    def export_failed(self, error: BaseException):
+        if self.closed:
+            return
+        self.export_button.configure(state=tk.NORMAL)
+        self.cancel_button.configure(state=tk.DISABLED)
+        if isinstance(error, ExportCancelled):
+            self.status.set("Export cancelled")
+        else:
+            self.status.set("")
+            messagebox.showerror("Export failed", str(error), parent=self)
 
     def create_deregister_callback(self, callback: callable):
         """
@@ -160,6 +203,9 @@ class ReportsWindow(tk.Toplevel):
         """
 
         def new_callback():
+            # Stop any export still running for a window that is going away
+            self.cancel_export.set()
+            self.closed = True
             callback()
             self.destroy()
 
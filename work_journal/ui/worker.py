@@ -0,0 +1,126 @@
+"""
+This module keeps blocking work (database calls, exports) off the Tk event loop.
+
+Tk is single threaded:  widgets may only be touched from the thread running mainloop.
+So jobs run on a ThreadPoolExecutor, and everything that has to come back to the UI
+(results, errors, progress) is put on a queue that the Tk thread drains with after().
+"""
+import queue
+import tkinter as tk
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+# How often (ms) the Tk thread checks for finished jobs while any are outstanding
+POLL_MS = 25
+# How often (ms) it checks for posted callbacks otherwise
+IDLE_POLL_MS = 100
+
+
+class BackgroundWorker:
+    """
+    Runs callables off the Tk thread and hands their outcome back on it.
+
+    There is a single worker thread by default, so jobs run one at a time in the order
+    they were submitted and their callbacks fire in that same order.  That keeps SQLite
+    access serialized and means the UI never sees results out of order.
+    """
+
+    def __init__(self, root: tk.Misc, max_workers: int = 1) -> None:
+        """
+        root:  Any widget of the app, used to schedule polling on the Tk thread
+        max_workers:  Number of worker threads
+        """
+        self.root = root
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="work_journal"
+        )
+        self.messages = queue.SimpleQueue()
+        self.outstanding = 0
+        self.polling = False
+        self.closed = False
+        self.root.after(IDLE_POLL_MS, self._idle_poll)
+
+    def submit(
+        self,
+        job: Callable,
+        *args,
+        on_done: Optional[Callable] = None,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+        **kwargs,
+    ) -> Future:
+        """
+        Runs job(*args, **kwargs) on the worker thread.
+        on_done:  called on the Tk thread with the job's return value
+        on_error:  called on the Tk thread with the exception if the job raised.  Defaults
+                   to Tk's report_callback_exception.
+        """
+        future = self.executor.submit(job, *args, **kwargs)
+        self.outstanding += 1
+        future.add_done_callback(
+            lambda done: self.messages.put((self._finish, (done, on_done, on_error)))
+        )
+        self._start_polling()
+        return future
+
+    def post(self, callback: Callable, *args) -> None:
+        """
+        Thread safe:  schedules callback(*args) on the Tk thread.  For jobs reporting
+        progress while they run, and other threads handing results back.  Polling
+        can't be started from here (only the Tk thread may call Tk), so with no job
+        outstanding the callback waits for the next idle poll.
+        """
+        self.messages.put((callback, args))
+
+    def shutdown(self) -> None:
+        """
+        Drops queued jobs and lets the running one finish in the background
+        """
+        self.closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _finish(self, future: Future, on_done, on_error) -> None:
+        self.outstanding -= 1
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            if on_error is not None:
+                on_error(error)
+            else:
+                self.root.report_callback_exception(
+                    type(error), error, error.__traceback__
+                )
+        elif on_done is not None:
+            on_done(future.result())
+
+    def _idle_poll(self) -> None:
+        """
+        Standing check on the Tk thread for callbacks posted while nothing is polling
+        """
+        if self.closed:
+            return
+        if not self.messages.empty():
+            self._start_polling()
+        self.root.after(IDLE_POLL_MS, self._idle_poll)
+
+    def _start_polling(self) -> None:
+        if not self.polling:
+            self.polling = True
+            self.root.after(POLL_MS, self._poll)
+
+    def _poll(self) -> None:
+        """
+        Drains the message queue on the Tk thread, and keeps polling while jobs are
+        outstanding
+        """
+        while True:
+            try:
+                (callback, args) = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            callback(*args)
+
+        if self.outstanding > 0:
+            self.root.after(POLL_MS, self._poll)
+        else:
+            self.polling = False